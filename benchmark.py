@@ -0,0 +1,292 @@
+"""
+Headless benchmark of the engine hot paths, no window, GL context or GPU needed.
+
+Generates chunks with TerrainGenerator.generate_chunk_blocks for fixed seeds and
+times terrain generation, cave carving (exact against interpolated noise),
+light initialization, meshing (the GL-free mesher core, both meshers and greedy
+meshing), save.Save chunk save/load and water ticks. Results are written as JSON so runs of different versions can be
+compared:
+
+	python benchmark.py --chunks 64 --seeds 1 2 3 --output benchmark.json
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import numpy as np
+
+import chunk
+import headless
+import mesher
+import save
+import subchunk
+import terrain_generator
+
+SUBCHUNK_SHAPE = (subchunk.SUBCHUNK_WIDTH, subchunk.SUBCHUNK_HEIGHT, subchunk.SUBCHUNK_LENGTH)
+
+
+def chunk_positions(generator, count):
+	# a square of columns around the origin, four chunks high around sea level
+	layers = range(generator.sea_level // 16 - 1, generator.sea_level // 16 + 3)
+	columns = math.ceil(math.sqrt(count / len(layers)))
+
+	positions = [
+		(x - columns // 2, y, z - columns // 2)
+		for x in range(columns)
+		for z in range(columns)
+		for y in layers
+	]
+
+	return positions[:count]
+
+
+def timed(function, *args):
+	start = time.perf_counter()
+	result = function(*args)
+	return time.perf_counter() - start, result
+
+
+def bench_generation(world, generator, positions):
+	def generate():
+		for position in positions:
+			new_chunk = chunk.Chunk(world, position)
+			new_chunk.set_blocks(generator.generate_chunk_blocks(position))
+			world.chunks[position] = new_chunk
+
+	seconds, _ = timed(generate)
+	return {"seconds": seconds, "chunks_per_second": len(positions) / seconds}
+
+
+def bench_caves(seed, positions):
+	# exact per-block cave noise against the interpolated lattice of new worlds, on the same chunks
+	exact = terrain_generator.TerrainGenerator(seed=seed, cave_sample_spacing=1)
+	coarse = terrain_generator.TerrainGenerator(seed=seed)
+
+	def carve(generator):
+		carved = []
+		for position in positions:
+			blocks = chunk.new_blocks(1) # all stone, so every block in range can be carved
+			generator.generate_caves(blocks, position, position[1] * chunk.CHUNK_HEIGHT, chunk.CHUNK_WIDTH, chunk.CHUNK_HEIGHT, chunk.CHUNK_LENGTH)
+			carved.append(np.frombuffer(blocks, dtype=np.uint16) == 0)
+		return np.concatenate(carved)
+
+	# heights are cached by both generators first, so only the caves are timed
+	for generator in (exact, coarse):
+		for position in positions:
+			generator.get_column(position[0] * chunk.CHUNK_WIDTH, position[2] * chunk.CHUNK_LENGTH, chunk.CHUNK_WIDTH, chunk.CHUNK_LENGTH)
+
+	exact_seconds, exact_air = timed(carve, exact)
+	coarse_seconds, coarse_air = timed(carve, coarse)
+
+	return {
+		"exact_seconds": exact_seconds,
+		"interpolated_seconds": coarse_seconds,
+		"sample_spacing": coarse.cave_sample_spacing,
+		"exact_carved": int(exact_air.sum()),
+		"interpolated_carved": int(coarse_air.sum()),
+		"agreement": float((exact_air == coarse_air).mean()),
+	}
+
+
+def bench_light(world, positions):
+	solver = world.light_solver
+
+	init_seconds, _ = timed(lambda: [solver.initialize_sunlight(position) for position in positions])
+
+	def propagate():
+		steps = 0
+		while solver.low_priority_queue or solver.low_remove_queue:
+			steps += solver.propagate(solver.low_remove_queue, solver.low_priority_queue, 100000)
+		return steps
+
+	propagate_seconds, queued = timed(propagate)
+
+	return {
+		"initialize_seconds": init_seconds,
+		"propagate_seconds": propagate_seconds,
+		"propagation_steps": queued,
+		"chunks_per_second": len(positions) / (init_seconds + propagate_seconds),
+	}
+
+
+def bench_meshing(world, positions, mesher_name, greedy):
+	world.settings.mesher = mesher_name
+	world.settings.greedy_meshing = greedy
+
+	subchunks = [child for position in positions for child in world.chunks[position].subchunks.values()]
+
+	def mesh():
+		for child in subchunks:
+			if mesher_name == "numpy":
+				mesher.update_subchunk_mesh(child, SUBCHUNK_SHAPE)
+			else:
+				child.update_mesh_python()
+
+	seconds, _ = timed(mesh)
+
+	faces = sum((len(child.mesh_indices) + len(child.water_mesh_indices)) // 6 for child in subchunks)
+	emitted = sum(
+		child.mesh_vertex_data.nbytes + child.mesh_indices.nbytes
+		+ child.water_mesh_vertex_data.nbytes + child.water_mesh_indices.nbytes
+		for child in subchunks
+	)
+
+	return {
+		"seconds": seconds,
+		"subchunks_per_second": len(subchunks) / seconds,
+		"faces": faces,
+		"faces_per_second": faces / seconds,
+		"bytes": emitted,
+		"bytes_per_face": emitted / max(faces, 1),
+	}
+
+
+def bench_save(world, positions, seed):
+	# save.Save works relative to the current directory, run it in a scratch one
+	previous_directory = os.getcwd()
+
+	with tempfile.TemporaryDirectory() as directory:
+		os.chdir(directory)
+
+		try:
+			saver = save.Save(world)
+			saver.seed = seed
+
+			# snapshots on the calling thread, then waiting for the writer thread to finish
+			snapshot_seconds, _ = timed(lambda: [saver.save_chunk(position) for position in positions])
+			flush_seconds, _ = timed(saver.flush)
+			save_seconds = snapshot_seconds + flush_seconds
+
+			saved_bytes = sum(os.path.getsize(saved_region.path) for saved_region in saver.regions.values())
+			chunk_bytes = sum(len(saver.encode_chunk(position)) for position in positions)
+
+			originals = {position: world.chunks.pop(position) for position in positions}
+			load_seconds, _ = timed(lambda: [saver.load_chunk(position) for position in positions])
+
+			matches = all(world.chunks[position].blocks == originals[position].blocks for position in positions)
+			saver.close()
+		finally:
+			os.chdir(previous_directory)
+
+	return {
+		"save_seconds": save_seconds,
+		"snapshot_seconds": snapshot_seconds,
+		"load_seconds": load_seconds,
+		"bytes": saved_bytes,
+		"bytes_per_chunk": saved_bytes / len(positions),
+		"encoded_bytes_per_chunk": chunk_bytes / len(positions),
+		"compression": world.settings.save_compression,
+		"round_trip_ok": matches,
+	}
+
+
+def bench_water(world, positions, ticks):
+	try:
+		import water_simulator
+	except ImportError as e:
+		return {"skipped": str(e)}
+
+	# without a GL context create_context fails and the simulator uses its CPU path
+	simulator = water_simulator.WaterSimulatorGPU(world)
+
+	if simulator.gpu_enabled:
+		return {"skipped": "GPU simulation available, only the CPU path is benchmarked"}
+
+	world.settings.mesher = "numpy"
+
+	# drop a water source on top of the ground in the middle of every column
+	rng = random.Random(0)
+	sources = 0
+
+	for cx, cy, cz in positions:
+		x, z = cx * 16 + rng.randrange(16), cz * 16 + rng.randrange(16)
+
+		for y in range(cy * 16 + 15, cy * 16 - 1, -1):
+			if world.get_block_number((x, y, z)) and not world.get_block_number((x, y + 1, z)):
+				if world.is_position_loaded((x, y + 1, z)):
+					simulator.meta.set_water_level((x, y + 1, z), simulator.SOURCE)
+					world.set_block((x, y + 1, z), simulator.WATER_ID)
+					simulator.flow_queue.append((x, y + 1, z))
+					sources += 1
+				break
+
+	seconds, _ = timed(lambda: [simulator.update() for _ in range(ticks)])
+
+	return {"seconds": seconds, "ticks": ticks, "sources": sources, "ticks_per_second": ticks / seconds}
+
+
+def git_version():
+	try:
+		return subprocess.run(
+			["git", "describe", "--always", "--dirty"], capture_output=True, text=True, check=True
+		).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def run(seed, count, water_ticks):
+	texture_manager = headless.HeadlessTextureManager()
+	block_types, block_source = headless.load_block_types(texture_manager)
+
+	world = headless.HeadlessWorld(block_types)
+	generator = terrain_generator.TerrainGenerator(seed=seed)
+	positions = chunk_positions(generator, count)
+
+	results = {"block_types": block_source, "chunks": len(positions)}
+
+	print(f"seed {seed}: generating {len(positions)} chunks")
+	results["generation"] = bench_generation(world, generator, positions)
+
+	print(f"seed {seed}: caves")
+	results["caves"] = bench_caves(seed, positions)
+
+	print(f"seed {seed}: light")
+	results["light"] = bench_light(world, positions)
+
+	results["meshing"] = {}
+	for name, mesher_name, greedy in (("numpy", "numpy", False), ("numpy_greedy", "numpy", True), ("python", "python", False)):
+		print(f"seed {seed}: meshing ({name})")
+		results["meshing"][name] = bench_meshing(world, positions, mesher_name, greedy)
+
+	print(f"seed {seed}: save/load")
+	results["save"] = bench_save(world, positions, seed)
+
+	print(f"seed {seed}: water")
+	results["water"] = bench_water(world, positions, water_ticks)
+
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Headless benchmark of terrain generation, lighting, meshing, saving and water.")
+	parser.add_argument("--chunks", type=int, default=64, help="chunks per seed")
+	parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3])
+	parser.add_argument("--water-ticks", type=int, default=20)
+	parser.add_argument("--output", default="benchmark.json")
+	args = parser.parse_args()
+
+	report = {
+		"version": git_version(),
+		"time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+		"python": sys.version.split()[0],
+		"numpy": np.__version__,
+		"platform": platform.platform(),
+		"results": {str(seed): run(seed, args.chunks, args.water_ticks) for seed in args.seeds},
+	}
+
+	with open(args.output, "w") as f:
+		json.dump(report, f, indent=2)
+
+	print(f"Benchmark written to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
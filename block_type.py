@@ -1,5 +1,6 @@
 import collider
 
+import models  # custom block models, referenced by name in the block data file
 import models.cube  # default model
 
 
@@ -85,3 +86,114 @@ class Block_type:
 
 			else:
 				set_block_face(["right", "left", "top", "bottom", "front", "back"].index(face), texture_index)
+
+
+def load_block_types(texture_manager, path="data/blocks.mcpy"):
+	# parse block type data file, returns the block types indexed by block number (None for unused numbers)
+
+	block_types = [None]
+
+	blocks_data_file = open(path)
+	blocks_data = blocks_data_file.readlines()
+	blocks_data_file.close()
+
+	for block in blocks_data:
+		if block[0] in ["\n", "#"]:  # skip if empty line or comment
+			continue
+
+		number, props = block.split(":", 1)
+		number = int(number)
+
+		# default block
+
+		name = "Unknown"
+		model = models.cube
+		texture = {"all": "unknown"}
+		hardness = 0.0 # Default hardness
+		sound = "stone" # Default sound
+		is_sprite = False
+		sprite_path = None
+		light_level = 0
+
+		# read properties
+
+		for prop in props.split(","):
+			prop = prop.strip()
+			prop = list(filter(None, prop.split(" ", 1)))
+
+			if prop[0] == "sameas":
+				sameas_number = int(prop[1])
+
+				name = block_types[sameas_number].name
+				texture = dict(block_types[sameas_number].block_face_textures)
+				model = block_types[sameas_number].model
+				hardness = block_types[sameas_number].hardness
+				sound = block_types[sameas_number].sound
+				is_sprite = block_types[sameas_number].is_sprite
+				sprite_path = block_types[sameas_number].sprite_path
+				light_level = block_types[sameas_number].light_level
+
+			elif prop[0] == "name":
+				name = eval(prop[1])
+			
+			elif prop[0] == "hardness":
+				hardness = float(prop[1])
+
+			elif prop[0] == "sprite":
+				is_sprite = True
+				sprite_path = eval(prop[1])
+
+			elif prop[0][:7] == "texture":
+				_, side = prop[0].split(".")
+				texture[side] = prop[1].strip()
+
+			elif prop[0] == "model":
+				model = eval(prop[1])
+			
+			elif prop[0] == "light":
+				light_level = int(prop[1])
+
+		# Determine sound based on name if not already set (by sameas)
+		if sound == "stone":
+			sound = "stone" # default
+			lower_name = name.lower()
+			
+			# User specific requests:
+			# Sand -> sand
+			# Toprak (Dirt/Soil/Grass) -> gravel
+			# Oak/Wood/Log -> wood
+			# Stone -> stone
+			
+			if any(s in lower_name for s in ["dirt", "soil", "grass", "gravel"]):
+				sound = "gravel"
+			elif "sand" in lower_name:
+				sound = "sand"
+			elif any(s in lower_name for s in ["wood", "planks", "log", "oak", "chest", "crafting table", "sign", "door", "ladder"]):
+				if "cobblestone" not in lower_name and "stone" not in lower_name:
+					sound = "wood"
+			elif any(s in lower_name for s in ["leaves", "sapling", "flower", "mushroom", "sugar cane", "cactus"]):
+				sound = "grass"
+			elif "snow" in lower_name or "ice" in lower_name:
+				sound = "snow"
+			elif "cloth" in lower_name or "wool" in lower_name:
+				sound = "cloth"
+			elif "coral" in lower_name:
+				sound = "coral"
+			elif "stone" in lower_name or "cobblestone" in lower_name or "ore" in lower_name or "brick" in lower_name:
+				sound = "stone"
+
+		# add block type
+
+		_block_type = Block_type(texture_manager, name, texture, model, hardness, sound, is_sprite, sprite_path, light_level)
+
+		if is_sprite and sprite_path:
+			# Convert "textures/item/stick.png" to "item/stick"
+			tex_name = sprite_path.replace("textures/", "").replace(".png", "")
+			texture_manager.add_texture(tex_name)
+			_block_type.sprite_index = texture_manager.textures.index(tex_name)
+
+		while number >= len(block_types):
+			block_types.append(None)
+		block_types[number] = _block_type
+
+	return block_types
@@ -0,0 +1,85 @@
+"""
+Cave culling: chunks hidden behind solid ground aren't drawn.
+
+Every subchunk knows which of its faces see each other through blocks which
+aren't opaque (mesher.face_visibility, computed with its mesh). Starting at the
+chunk of the camera, a breadth first search walks into the neighbouring
+chunks. It enters a chunk through one face and only leaves it through the faces
+that face sees, and it never goes in a direction opposite to one it already
+took, as a line of sight can't bend back. The chunks it reaches are potentially
+visible, the others can't be seen from the camera's chunk.
+
+The search only depends on the camera's chunk and the loaded chunks' visibility,
+so it is redone when either changes, the frustum is applied to its result
+every frame.
+"""
+
+from collections import deque
+
+import mesher
+
+DIRECTIONS = mesher.FACE_DIRECTIONS
+FACES = len(DIRECTIONS)
+
+# face on the other side, e.g. a chunk left through its +x face is entered through its -x face
+OPPOSITE = (1, 0, 3, 2, 5, 4)
+
+
+def chunk_visibility(chunk):
+	# visibility of chunks with a single subchunk, chunks not meshed yet (or split in several subchunks) hide nothing
+	if len(chunk.subchunks) != 1:
+		return mesher.ALL_FACES_VISIBLE
+
+	visibility = next(iter(chunk.subchunks.values())).visibility
+	return mesher.ALL_FACES_VISIBLE if visibility is None else visibility
+
+
+def potentially_visible(chunks, camera_chunk):
+	"""Positions of the chunks which can be seen from camera_chunk, None if that chunk isn't loaded."""
+	if camera_chunk not in chunks:
+		return None
+
+	visible = {camera_chunk}
+	queue = deque([(camera_chunk, None, 0)]) # (chunk position, face it was entered through, directions taken)
+
+	while queue:
+		position, entry, taken = queue.popleft()
+		visibility = mesher.ALL_FACES_VISIBLE if entry is None else chunk_visibility(chunks[position])
+		x, y, z = position
+
+		for face, (dx, dy, dz) in enumerate(DIRECTIONS):
+			if taken >> OPPOSITE[face] & 1:
+				continue
+
+			if entry is not None and not visibility >> (entry * FACES + face) & 1:
+				continue
+
+			neighbour = (x + dx, y + dy, z + dz)
+
+			if neighbour in visible or neighbour not in chunks:
+				continue
+
+			visible.add(neighbour)
+			queue.append((neighbour, OPPOSITE[face], taken | 1 << face))
+
+	return visible
+
+
+class CaveCuller:
+	def __init__(self):
+		self.camera_chunk = None
+		self.visible = None
+		self.dirty = True
+
+	def invalidate(self):
+		# a chunk was loaded, unloaded or had its visibility changed
+		self.dirty = True
+
+	def update(self, chunks, camera_chunk):
+		"""Potentially visible chunks (None if nothing can be culled), searched again only when needed."""
+		if self.dirty or camera_chunk != self.camera_chunk:
+			self.camera_chunk = camera_chunk
+			self.visible = potentially_visible(chunks, camera_chunk)
+			self.dirty = False
+
+		return self.visible
@@ -1,7 +1,8 @@
-import ctypes
 import math
+import time
+from array import array
 
-import pyglet.gl as gl
+import numpy as np
 
 import subchunk
 
@@ -9,6 +10,35 @@ CHUNK_WIDTH = 16
 CHUNK_HEIGHT = 16
 CHUNK_LENGTH = 16
 
+CHUNK_VOLUME = CHUNK_WIDTH * CHUNK_HEIGHT * CHUNK_LENGTH
+
+# block storage: one flat array of uint16 block numbers, indexed x * 256 + y * 16 + z (like the subchunk light maps)
+BLOCKS_TYPECODE = "H"
+
+
+def block_index(lx, ly, lz):
+	return (lx * CHUNK_HEIGHT + ly) * CHUNK_LENGTH + lz
+
+
+def new_blocks(number=0):
+	return array(BLOCKS_TYPECODE, [number]) * CHUNK_VOLUME
+
+
+# one shared block array per block number for uniform chunks (all air, all stone...), never written to
+_uniform_blocks = {}
+
+
+def uniform_blocks(number):
+	if number not in _uniform_blocks:
+		_uniform_blocks[number] = new_blocks(number)
+
+	return _uniform_blocks[number]
+
+
+def blocks_view(blocks):
+	# zero-copy [x, y, z] NumPy view of a block array, for vectorized code
+	return np.frombuffer(blocks, dtype=np.uint16).reshape(CHUNK_WIDTH, CHUNK_HEIGHT, CHUNK_LENGTH)
+
 
 class Chunk:
 	def __init__(self, world, chunk_position):
@@ -17,13 +47,31 @@ class Chunk:
 		self.modified = False
 		self.chunk_position = chunk_position
 
+		# bumped every time the chunk is meshed on the main thread, mesh_pool drops results of older snapshots.
+		# water_mesh_version is bumped by water-only remeshes too, a pool result then keeps the newer water mesh
+		self.mesh_version = 0
+		self.water_mesh_version = 0
+
 		self.position = (
 			self.chunk_position[0] * CHUNK_WIDTH,
 			self.chunk_position[1] * CHUNK_HEIGHT,
 			self.chunk_position[2] * CHUNK_LENGTH,
 		)
 
-		self.blocks = [[[0 for z in range(CHUNK_LENGTH)] for y in range(CHUNK_HEIGHT)] for x in range(CHUNK_WIDTH)]
+		# uniform is the block number of a chunk made of a single block type, blocks is then shared between all
+		# such chunks and only gets its own copy on the first edit. None once the chunk holds different blocks
+		self.uniform = 0
+		self.blocks = uniform_blocks(0)
+
+		# blocks is also shared while a snapshot of it waits to be saved, the next edit copies it first
+		self.blocks_shared = False
+
+		# time of the last block change, saved with the chunk (stored light maps of its neighbours older than that are stale)
+		self.blocks_stamp = 0.0
+
+		# whether the light map holds the chunk's light yet (computed or restored), the light solver doesn't
+		# compare its neighbours against it before that
+		self.lit = False
 
 		self.subchunks = {}
 
@@ -41,43 +89,94 @@ class Chunk:
 				for z in range(n_sub_z):
 					self.subchunks[(x, y, z)] = subchunk.Subchunk(self, (x, y, z))
 
-		# mesh variables
+		# a chunk is a single subchunk, the light solver works on its light map directly (same indices as blocks)
+		self.light_map = self.subchunks[(0, 0, 0)].light_map
 
-		# Water mesh variables
-		self.water_mesh_vertex_positions = []
-		self.water_mesh_tex_coords = []
-		self.water_mesh_shading_values = []
+		# totals over the subchunk meshes (each subchunk has its own slice of the world's vertex arena)
+		self.mesh_index_counter = 0
 		self.water_mesh_index_counter = 0
-		self.water_mesh_indices = []
-		self.water_mesh_indices_length = 0
-
-		# create VAO and VBO's for Solid blocks
-		self.vao = gl.GLuint(0)
-		gl.glGenVertexArrays(1, self.vao)
-		gl.glBindVertexArray(self.vao)
-
-		self.vertex_position_vbo = gl.GLuint(0)
-		gl.glGenBuffers(1, self.vertex_position_vbo)
-		self.tex_coord_vbo = gl.GLuint(0)
-		gl.glGenBuffers(1, self.tex_coord_vbo)
-		self.shading_values_vbo = gl.GLuint(0)
-		gl.glGenBuffers(1, self.shading_values_vbo)
-		self.ibo = gl.GLuint(0)
-		gl.glGenBuffers(1, self.ibo)
-
-		# create VAO and VBO's for Water blocks
-		self.water_vao = gl.GLuint(0)
-		gl.glGenVertexArrays(1, self.water_vao)
-		gl.glBindVertexArray(self.water_vao)
-
-		self.water_vertex_position_vbo = gl.GLuint(0)
-		gl.glGenBuffers(1, self.water_vertex_position_vbo)
-		self.water_tex_coord_vbo = gl.GLuint(0)
-		gl.glGenBuffers(1, self.water_tex_coord_vbo)
-		self.water_shading_values_vbo = gl.GLuint(0)
-		gl.glGenBuffers(1, self.water_shading_values_vbo)
-		self.water_ibo = gl.GLuint(0)
-		gl.glGenBuffers(1, self.water_ibo)
+
+	def get_block(self, lx, ly, lz):
+		return self.blocks[(lx * CHUNK_HEIGHT + ly) * CHUNK_LENGTH + lz]
+
+	def set_block(self, lx, ly, lz, number):
+		if self.uniform is not None:
+			if number == self.uniform:
+				return
+
+			self.uniform = None
+			self.blocks_shared = True
+
+		if self.blocks_shared:
+			self.blocks = self.blocks[:]
+			self.blocks_shared = False
+
+		self.blocks[(lx * CHUNK_HEIGHT + ly) * CHUNK_LENGTH + lz] = number
+		self.blocks_stamp = time.time()
+
+	def set_blocks(self, blocks):
+		# replace the whole block array (generated or loaded), uniform arrays are swapped for the shared one
+		number = blocks[0]
+		self.blocks_shared = False
+
+		if blocks.count(number) == CHUNK_VOLUME:
+			self.uniform = number
+			self.blocks = uniform_blocks(number)
+		else:
+			self.uniform = None
+			self.blocks = blocks
+
+	def snapshot_blocks(self):
+		# copy-on-write: the returned array stays as it is, later edits go to a copy
+		self.blocks_shared = True
+		return self.blocks
+
+	def blocks_array(self):
+		return blocks_view(self.blocks)
+
+	def has_geometry(self):
+		"""
+		False for chunks whose mesh is known to be empty without meshing them: all air, or a single opaque cube
+		block type with every face against opaque blocks of loaded neighbours (e.g. stone deep underground).
+		"""
+
+		if self.uniform is None:
+			return True
+
+		if self.uniform == 0:
+			return False
+
+		tables = self.world.mesh_tables
+
+		if not (tables.is_cube[self.uniform] and tables.occludes[self.uniform]):
+			return True
+
+		cx, cy, cz = self.chunk_position
+		every = slice(None)
+
+		# (neighbour offset, the neighbour's face touching this chunk)
+		faces = (
+			((1, 0, 0), (0, every, every)),
+			((-1, 0, 0), (CHUNK_WIDTH - 1, every, every)),
+			((0, 1, 0), (every, 0, every)),
+			((0, -1, 0), (every, CHUNK_HEIGHT - 1, every)),
+			((0, 0, 1), (every, every, 0)),
+			((0, 0, -1), (every, every, CHUNK_LENGTH - 1)),
+		)
+
+		for (dx, dy, dz), face in faces:
+			neighbour = self.world.chunks.get((cx + dx, cy + dy, cz + dz))
+
+			if neighbour is None: # unloaded neighbours count as air
+				return True
+
+			if neighbour.uniform is not None:
+				if not tables.opaque[neighbour.uniform]:
+					return True
+			elif not tables.opaque[neighbour.blocks_array()[face]].all():
+				return True
+
+		return False
 
 	def update_subchunk_meshes(self, update_only_water=False):
 		for subchunk_position in self.subchunks:
@@ -119,199 +218,35 @@ class Chunk:
 			try_update_subchunk_mesh((sx, sy, sz - 1))
 
 	def update_mesh(self, update_only_water=False):
-		# combine all the small subchunk meshes into one big chunk mesh
-
-		if not update_only_water:
-			self.mesh_vertex_positions = []
-			self.mesh_tex_coords = []
-			self.mesh_shading_values = []
-			self.mesh_index_counter = 0
-			self.mesh_indices = []
-
-		self.water_mesh_vertex_positions = []
-		self.water_mesh_tex_coords = []
-		self.water_mesh_shading_values = []
-		self.water_mesh_index_counter = 0
-		self.water_mesh_indices = []
+		# upload the subchunk meshes rebuilt since the last call (only those, so an edit only patches the
+		# subchunks it touched), the arena keeps some slack in every slice so that usually happens in place.
+		# update_only_water is kept for the callers, unchanged solid meshes aren't uploaded anyway
 
+		arena = self.world.chunk_arena
 
-		for subchunk_position in self.subchunks:
-			subchunk = self.subchunks[subchunk_position]
-
-			try:
-				if not update_only_water:
-					# Solid Mesh
-					# Calculate vertex offset based on current number of vertices
-					# Vertices are stored as (x,y,z), so divide by 3
-					vertex_offset = len(self.mesh_vertex_positions) // 3
-					
-					self.mesh_vertex_positions.extend(subchunk.mesh_vertex_positions)
-					self.mesh_tex_coords.extend(subchunk.mesh_tex_coords)
-					self.mesh_shading_values.extend(subchunk.mesh_shading_values)
-
-					# Shift indices by the vertex offset
-					mesh_indices = [index + vertex_offset for index in subchunk.mesh_indices]
-					self.mesh_indices.extend(mesh_indices)
-					
-					# Update counter (just used for 'has data' check later)
-					self.mesh_index_counter += len(mesh_indices)
-				
-				# Water Mesh
-				# Water Mesh
-				water_vertex_offset = len(self.water_mesh_vertex_positions) // 3
-				
-				self.water_mesh_vertex_positions.extend(subchunk.water_mesh_vertex_positions)
-				self.water_mesh_tex_coords.extend(subchunk.water_mesh_tex_coords)
-				self.water_mesh_shading_values.extend(subchunk.water_mesh_shading_values)
-				
-				water_indices = [index + water_vertex_offset for index in subchunk.water_mesh_indices]
-				self.water_mesh_indices.extend(water_indices)
-				self.water_mesh_index_counter += len(water_indices)
-			except AttributeError as e:
-				print(f"CRITICAL ERROR in update_mesh: {e}")
-				print(f"Subchunk: {subchunk_position}")
-				if not hasattr(self, 'water_mesh_index_counter'):
-					print("SELF MISSING water_mesh_index_counter")
-				if not hasattr(subchunk, 'water_mesh_index_counter'):
-					print("SUBCHUNK MISSING water_mesh_index_counter")
-				raise e
-
-		# send the full mesh data to the GPU and free the memory used client-side (we don't need it anymore)
-		
-		if not update_only_water:
-			# Solid Mesh
-			self.mesh_indices_length = len(self.mesh_indices)
-			self.send_mesh_data_to_gpu()
-
-			del self.mesh_vertex_positions
-			del self.mesh_tex_coords
-			del self.mesh_shading_values
-			del self.mesh_indices
-		
-		# Water Mesh
-		self.water_mesh_indices_length = len(self.water_mesh_indices)
-		self.send_water_mesh_data_to_gpu()
-		
-		del self.water_mesh_vertex_positions
-		del self.water_mesh_tex_coords
-		del self.water_mesh_shading_values
-		del self.water_mesh_indices
+		self.mesh_index_counter = sum(sub.mesh_index_counter for sub in self.subchunks.values())
+		self.water_mesh_index_counter = sum(sub.water_mesh_index_counter for sub in self.subchunks.values())
 
-	def send_mesh_data_to_gpu(self):  # pass mesh data to gpu
-		if not getattr(self, 'mesh_index_counter', 0):
+		if arena is None:  # headless world (headless.py), the meshes stay client-side
 			return
 
-		gl.glBindVertexArray(self.vao)
-
-		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vertex_position_vbo)
-		gl.glBufferData(
-			gl.GL_ARRAY_BUFFER,
-			ctypes.sizeof(gl.GLfloat * len(self.mesh_vertex_positions)),
-			(gl.GLfloat * len(self.mesh_vertex_positions))(*self.mesh_vertex_positions),
-			gl.GL_STATIC_DRAW,
-		)
+		for sub in self.subchunks.values():
+			if sub.mesh_dirty:
+				sub.mesh = arena.store(sub.mesh, sub.mesh_vertex_data, sub.mesh_indices, self.position)
+				sub.mesh_dirty = False
 
-		gl.glVertexAttribPointer(0, 3, gl.GL_FLOAT, gl.GL_FALSE, 0, 0)
-		gl.glEnableVertexAttribArray(0)
-
-		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.tex_coord_vbo)
-		gl.glBufferData(
-			gl.GL_ARRAY_BUFFER,
-			ctypes.sizeof(gl.GLfloat * len(self.mesh_tex_coords)),
-			(gl.GLfloat * len(self.mesh_tex_coords))(*self.mesh_tex_coords),
-			gl.GL_STATIC_DRAW,
-		)
+			if sub.water_mesh_dirty:
+				sub.water_mesh = arena.store(sub.water_mesh, sub.water_mesh_vertex_data, sub.water_mesh_indices, self.position)
+				sub.water_mesh_dirty = False
 
-		gl.glVertexAttribPointer(1, 3, gl.GL_FLOAT, gl.GL_FALSE, 0, 0)
-		gl.glEnableVertexAttribArray(1)
-
-		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.shading_values_vbo)
-		gl.glBufferData(
-			gl.GL_ARRAY_BUFFER,
-			ctypes.sizeof(gl.GLfloat * len(self.mesh_shading_values)),
-			(gl.GLfloat * len(self.mesh_shading_values))(*self.mesh_shading_values),
-			gl.GL_STATIC_DRAW,
-		)
-
-		gl.glVertexAttribPointer(2, 1, gl.GL_FLOAT, gl.GL_FALSE, 0, 0)
-		gl.glEnableVertexAttribArray(2)
+	def delete(self):
+		arena = self.world.chunk_arena
 
-		gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.ibo)
-		gl.glBufferData(
-			gl.GL_ELEMENT_ARRAY_BUFFER,
-			ctypes.sizeof(gl.GLuint * self.mesh_indices_length),
-			(gl.GLuint * self.mesh_indices_length)(*self.mesh_indices),
-			gl.GL_STATIC_DRAW,
-		)
-		
-	def send_water_mesh_data_to_gpu(self):
-		if not getattr(self, 'water_mesh_index_counter', 0):
+		if arena is None:  # headless world, nothing was uploaded
 			return
 
-		gl.glBindVertexArray(self.water_vao)
-
-		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.water_vertex_position_vbo)
-		gl.glBufferData(
-			gl.GL_ARRAY_BUFFER,
-			ctypes.sizeof(gl.GLfloat * len(self.water_mesh_vertex_positions)),
-			(gl.GLfloat * len(self.water_mesh_vertex_positions))(*self.water_mesh_vertex_positions),
-			gl.GL_STATIC_DRAW,
-		)
-
-		gl.glVertexAttribPointer(0, 3, gl.GL_FLOAT, gl.GL_FALSE, 0, 0)
-		gl.glEnableVertexAttribArray(0)
-
-		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.water_tex_coord_vbo)
-		gl.glBufferData(
-			gl.GL_ARRAY_BUFFER,
-			ctypes.sizeof(gl.GLfloat * len(self.water_mesh_tex_coords)),
-			(gl.GLfloat * len(self.water_mesh_tex_coords))(*self.water_mesh_tex_coords),
-			gl.GL_STATIC_DRAW,
-		)
-
-		gl.glVertexAttribPointer(1, 3, gl.GL_FLOAT, gl.GL_FALSE, 0, 0)
-		gl.glEnableVertexAttribArray(1)
-
-		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.water_shading_values_vbo)
-		gl.glBufferData(
-			gl.GL_ARRAY_BUFFER,
-			ctypes.sizeof(gl.GLfloat * len(self.water_mesh_shading_values)),
-			(gl.GLfloat * len(self.water_mesh_shading_values))(*self.water_mesh_shading_values),
-			gl.GL_STATIC_DRAW,
-		)
-
-		gl.glVertexAttribPointer(2, 1, gl.GL_FLOAT, gl.GL_FALSE, 0, 0)
-		gl.glEnableVertexAttribArray(2)
-
-		gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.water_ibo)
-		gl.glBufferData(
-			gl.GL_ELEMENT_ARRAY_BUFFER,
-			ctypes.sizeof(gl.GLuint * self.water_mesh_indices_length),
-			(gl.GLuint * self.water_mesh_indices_length)(*self.water_mesh_indices),
-			gl.GL_STATIC_DRAW,
-		)
-
-	def draw(self, pass_type='all'):
-		if pass_type in ['all', 'solid']:
-			if getattr(self, 'mesh_index_counter', 0):
-				gl.glBindVertexArray(self.vao)
-				gl.glDrawElements(gl.GL_TRIANGLES, self.mesh_indices_length, gl.GL_UNSIGNED_INT, None)
-				
-		if pass_type in ['all', 'water']:
-			if getattr(self, 'water_mesh_index_counter', 0):
-				gl.glBindVertexArray(self.water_vao)
-				gl.glDrawElements(gl.GL_TRIANGLES, self.water_mesh_indices_length, gl.GL_UNSIGNED_INT, None)
-
-	def delete(self):
-		gl.glDeleteBuffers(1, self.vertex_position_vbo)
-		gl.glDeleteBuffers(1, self.tex_coord_vbo)
-		gl.glDeleteBuffers(1, self.shading_values_vbo)
-		gl.glDeleteBuffers(1, self.ibo)
-		gl.glDeleteVertexArrays(1, self.vao)
-
-		gl.glDeleteBuffers(1, self.water_vertex_position_vbo)
-		gl.glDeleteBuffers(1, self.water_tex_coord_vbo)
-		gl.glDeleteBuffers(1, self.water_shading_values_vbo)
-		gl.glDeleteBuffers(1, self.water_ibo)
-		gl.glDeleteVertexArrays(1, self.water_vao)
-
+		for sub in self.subchunks.values():
+			arena.release(sub.mesh)
+			arena.release(sub.water_mesh)
+			sub.mesh = None
+			sub.water_mesh = None
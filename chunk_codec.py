@@ -0,0 +1,172 @@
+"""
+Binary encoding of saved chunks.
+
+A chunk is stored as:
+
+	magic (b"PC"), format version (1 byte), compression (1 byte), blocks stamp (float64), body
+
+and the body, compressed as the compression byte says:
+
+	run count (uint16), run lengths (uint16 each), run block numbers (uint16 each),
+	water count (uint16), water block indices (uint16 each, x * 256 + y * 16 + z), water levels (uint8 each),
+	light flag (uint8), and if it is 1: light stamp (float64), light map (one byte per block, sky << 4 | block)
+
+all little endian. Runs go over the flat chunk block array in its own order.
+Both run-length coding and decoding are done with NumPy on the whole array.
+
+The blocks stamp is the time of the chunk's last block change, the light stamp
+the time its light map was taken. A stored light map is only used while no
+neighbour changed after it (see Save.light_is_valid). Format version 1 had
+neither the stamps nor the light map.
+
+The version byte leaves room for later formats. Chunks saved before it
+existed (RLE1 streams and raw block dumps) are still read by decode_rle1.
+"""
+
+import zlib
+import lzma
+import struct
+from array import array
+
+import numpy as np
+
+import chunk
+
+MAGIC = b"PC"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<2sBBd")
+
+# compression byte of the header, Save picks one per world
+COMPRESSIONS = {"none": 0, "zlib": 1, "lzma": 2}
+
+WATER_IDS = (8, 9)
+
+
+def encode_runs(values):
+	# (lengths, values) of the runs of equal values in a 1D array
+	starts = np.flatnonzero(values[1:] != values[:-1]) + 1
+	starts = np.concatenate(([0], starts))
+	lengths = np.diff(np.append(starts, len(values)))
+	return lengths, values[starts]
+
+
+def water_blocks(blocks):
+	# flat indices of the water blocks of a chunk block array
+	return np.flatnonzero(np.isin(np.frombuffer(blocks, dtype=np.uint16), WATER_IDS))
+
+
+def encode(blocks, water_indices, water_levels, compression="zlib", blocks_stamp=0.0, light=None, light_stamp=0.0):
+	lengths, values = encode_runs(np.frombuffer(blocks, dtype=np.uint16))
+
+	body = b"".join((
+		np.uint16(len(lengths)).astype("<u2").tobytes(),
+		lengths.astype("<u2").tobytes(),
+		values.astype("<u2").tobytes(),
+		np.uint16(len(water_indices)).astype("<u2").tobytes(),
+		np.asarray(water_indices).astype("<u2").tobytes(),
+		np.asarray(water_levels).astype(np.uint8).tobytes(),
+		struct.pack("<Bd", 1, light_stamp) + bytes(light) if light is not None else b"\x00",
+	))
+
+	method = COMPRESSIONS[compression]
+
+	if method == 1:
+		body = zlib.compress(body)
+	elif method == 2:
+		body = lzma.compress(body)
+
+	return HEADER.pack(MAGIC, FORMAT_VERSION, method, blocks_stamp) + body
+
+
+def is_encoded(data):
+	return data[:2] == MAGIC
+
+
+def blocks_stamp(data):
+	# read from the uncompressed header, 0 for chunks saved before there were stamps
+	if len(data) < HEADER.size or data[2] < 2:
+		return 0.0
+
+	return HEADER.unpack_from(data)[3]
+
+
+def decode(data):
+	"""
+	(blocks, water_indices, water_levels, blocks_stamp, light, light_stamp) of an encoded chunk,
+	light is None if it wasn't stored. Raises ValueError if the chunk can't be read.
+	"""
+	if len(data) < 4 or not is_encoded(data):
+		raise ValueError("not an encoded chunk")
+
+	version, method = data[2], data[3]
+
+	if version == 1:
+		stamp, body = 0.0, bytes(data[4:])
+	elif version == FORMAT_VERSION:
+		stamp, body = HEADER.unpack_from(data)[3], bytes(data[HEADER.size:])
+	else:
+		raise ValueError(f"unknown chunk format version {version}")
+
+	if method == 1:
+		body = zlib.decompress(body)
+	elif method == 2:
+		body = lzma.decompress(body)
+	elif method != 0:
+		raise ValueError(f"unknown chunk compression {method}")
+
+	runs = int.from_bytes(body[0:2], "little")
+	offset = 2
+
+	lengths = np.frombuffer(body, dtype="<u2", count=runs, offset=offset)
+	offset += runs * 2
+	values = np.frombuffer(body, dtype="<u2", count=runs, offset=offset)
+	offset += runs * 2
+
+	flat = np.repeat(values.astype(np.uint16), lengths)
+
+	if len(flat) != chunk.CHUNK_VOLUME:
+		raise ValueError(f"chunk has {len(flat)} blocks instead of {chunk.CHUNK_VOLUME}")
+
+	water_count = int.from_bytes(body[offset : offset + 2], "little")
+	offset += 2
+
+	water_indices = np.frombuffer(body, dtype="<u2", count=water_count, offset=offset)
+	offset += water_count * 2
+	water_levels = np.frombuffer(body, dtype=np.uint8, count=water_count, offset=offset)
+	offset += water_count
+
+	light, light_stamp = None, 0.0
+
+	if version >= 2 and body[offset]:
+		light_stamp = struct.unpack_from("<d", body, offset + 1)[0]
+		light = body[offset + 9 : offset + 9 + chunk.CHUNK_VOLUME]
+
+		if len(light) != chunk.CHUNK_VOLUME:
+			light = None
+
+	blocks = array(chunk.BLOCKS_TYPECODE)
+	blocks.frombytes(flat.tobytes())
+
+	return blocks, water_indices, water_levels, stamp, light, light_stamp
+
+
+def decode_rle1(data):
+	"""
+	Blocks of an old RLE1 chunk (count, block number byte pairs after the magic) and the offset of
+	the water data following the runs, raises ValueError if the runs don't cover the chunk.
+	"""
+
+	pairs = np.frombuffer(data, dtype=np.uint8, count=(len(data) - 4) // 2 * 2, offset=4).reshape(-1, 2)
+	ends = np.cumsum(pairs[:, 0], dtype=np.int64)
+
+	runs = int(np.searchsorted(ends, chunk.CHUNK_VOLUME)) + 1
+
+	if runs > len(pairs) or ends[runs - 1] != chunk.CHUNK_VOLUME:
+		raise ValueError(f"RLE1 runs don't add up to {chunk.CHUNK_VOLUME} blocks")
+
+	flat = np.repeat(pairs[:runs, 1].astype(np.uint16), pairs[:runs, 0])
+
+	blocks = array(chunk.BLOCKS_TYPECODE)
+	blocks.frombytes(flat.tobytes())
+
+	return blocks, 4 + runs * 2
@@ -0,0 +1,36 @@
+#version 330
+
+out vec4 fragment_colour;
+
+uniform sampler2DArray texture_array_sampler;
+uniform usampler3D light_volume; // light maps of the loaded chunks, see light_volume.py
+uniform float alpha_factor;
+uniform float sky_brightness; // day/night, scales the sky light only
+
+in vec3 local_position;
+in vec3 interpolated_tex_coords;
+in float interpolated_shading_value;
+in vec3 light_offset;
+
+void main(void) {
+	vec4 texture_colour = texture(texture_array_sampler, interpolated_tex_coords);
+	
+	// Apply alpha factor to the texture alpha
+	float alpha = texture_colour.a * alpha_factor;
+
+	if (alpha == 0.0) { // discard if texel's alpha component is 0 (texel is transparent)
+		discard;
+	}
+
+	// block centers are on integer coordinates, the volume wraps around (block x, y, z is texel z, y, x)
+	vec3 block = floor(local_position + 0.5 + light_offset);
+	vec3 size = vec3(textureSize(light_volume, 0));
+	uint light = texelFetch(light_volume, ivec3(mod(block.zyx, size)), 0).r;
+
+	// block light (low nibble) and sky light (high nibble) are kept apart until here
+	float block_light = float(light & 0xFu);
+	float sky_light = float(light >> 4u) * sky_brightness;
+	float light_level = max(block_light, sky_light) / 15.0;
+
+	fragment_colour = vec4(texture_colour.rgb * interpolated_shading_value * light_level, alpha);
+}
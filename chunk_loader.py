@@ -0,0 +1,182 @@
+"""
+Chunk loading in a pool of worker processes.
+
+A chunk goes through these stages:
+
+	request    queued nearest first, dropped again if the player moves away before it starts
+	read       the saved bytes are taken on the main thread, a slice of the region's memory map
+	           (or the snapshot still waiting for the save thread)
+	decode     a worker decompresses and decodes them into flat arrays (chunk_codec.decode), or
+	           generates the chunk if it was never saved or can't be read
+	integrate  the main thread adds the chunk to the world, lights it and queues its meshes,
+	           as many chunks per frame as fit in the time budget
+
+Only a bounded number of jobs run at once, so a player moving fast doesn't pile
+up work for chunks that are cancelled again before they are needed.
+"""
+
+import heapq
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import chunk_codec
+import terrain_generator
+
+# terrain generator of the worker process
+_generator = None
+
+
+def _init_worker(seed, cave_sample_spacing):
+	global _generator
+	_generator = terrain_generator.TerrainGenerator(seed=seed, cave_sample_spacing=cave_sample_spacing)
+
+
+def _load_chunk(chunk_position, data):
+	# runs in a worker: ("decoded", what chunk_codec.decode returns) for saved data, ("generated", blocks) otherwise
+	if data is not None:
+		try:
+			return "decoded", chunk_codec.decode(data)
+		except Exception as e:
+			print(f"Failed to load binary chunk {chunk_position}: {e}")
+
+	return "generated", _generator.generate_chunk_blocks(chunk_position)
+
+
+class ChunkLoader:
+	def __init__(self, world, workers):
+		self.world = world
+
+		generator = world.save.terrain_generator
+
+		# spawn rather than fork, the main process holds a GL context
+		self.executor = ProcessPoolExecutor(
+			workers,
+			mp_context=multiprocessing.get_context("spawn"),
+			initializer=_init_worker,
+			initargs=(generator.seed, generator.cave_sample_spacing),
+		)
+
+		# enough to keep every worker busy while the main thread integrates the previous results
+		self.max_in_flight = workers * 2
+
+		self.pending = [] # heap of (priority, sequence, chunk_position)
+		self.pending_priority = {} # chunk_position -> priority of its live heap entry, other entries are stale
+		self.sequence = 0
+
+		self.in_flight = {} # chunk_position -> future
+
+		# chunks cancelled while their job was already running, the job still counts against max_in_flight
+		# and its result is dropped when it finishes
+		self.discarded = set()
+
+	def is_loading(self, chunk_position):
+		if chunk_position in self.in_flight:
+			return chunk_position not in self.discarded
+
+		return chunk_position in self.pending_priority
+
+	def request(self, chunk_position, priority):
+		"""Schedule a chunk to be loaded, lower priority first."""
+		if chunk_position in self.in_flight:
+			# wanted again before its cancelled job finished
+			self.discarded.discard(chunk_position)
+			return
+
+		if self.pending_priority.get(chunk_position, priority + 1) <= priority:
+			return
+
+		self.pending_priority[chunk_position] = priority
+		heapq.heappush(self.pending, (priority, self.sequence, chunk_position))
+		self.sequence += 1
+
+	def reprioritize(self, get_priority):
+		# recompute the priority of every pending request, e.g. when the player moved to another chunk
+		self.pending_priority = {chunk_position: get_priority(chunk_position) for chunk_position in self.pending_priority}
+		self.pending = [(priority, i, chunk_position) for i, (chunk_position, priority) in enumerate(self.pending_priority.items())]
+		heapq.heapify(self.pending)
+		self.sequence = len(self.pending)
+
+	def cancel(self, chunk_position):
+		self.pending_priority.pop(chunk_position, None)
+
+		future = self.in_flight.get(chunk_position)
+		if future is None:
+			return
+
+		# a running job can't be cancelled, it stays in flight until it finishes
+		if future.cancel():
+			del self.in_flight[chunk_position]
+		else:
+			self.discarded.add(chunk_position)
+
+	def cancel_outside(self, wanted):
+		# drop the requests and jobs of chunks no longer in the wanted set
+		for chunk_position in [p for p in self.pending_priority if p not in wanted]:
+			del self.pending_priority[chunk_position]
+
+		for chunk_position in [p for p in self.in_flight if p not in wanted and p not in self.discarded]:
+			self.cancel(chunk_position)
+
+	def update(self, time_budget):
+		"""Integrate finished chunks (at least one, then within time_budget seconds), then start new jobs."""
+		start_time = time.perf_counter()
+		integrated = 0
+
+		for chunk_position, future in list(self.in_flight.items()):
+			if integrated and time.perf_counter() - start_time > time_budget:
+				break
+
+			if not future.done():
+				continue
+
+			del self.in_flight[chunk_position]
+
+			if chunk_position in self.discarded:
+				self.discarded.remove(chunk_position)
+				continue
+
+			if chunk_position in self.world.chunks:
+				continue
+
+			try:
+				kind, result = future.result()
+			except Exception as e:
+				print(f"Load worker failed for chunk {chunk_position}: {e}")
+				self.world.save.load_chunk(chunk_position)
+			else:
+				if kind == "decoded":
+					self.world.save.add_decoded_chunk(chunk_position, result)
+				else:
+					self.world.save.add_generated_chunk(chunk_position, result)
+
+			self.world.chunk_loaded(chunk_position)
+			integrated += 1
+
+		while self.pending and len(self.in_flight) < self.max_in_flight:
+			priority, _, chunk_position = heapq.heappop(self.pending)
+
+			if self.pending_priority.get(chunk_position) != priority:
+				continue
+
+			del self.pending_priority[chunk_position]
+			self.start(chunk_position)
+
+		return integrated
+
+	def start(self, chunk_position):
+		if chunk_position in self.world.chunks:
+			return
+
+		data, legacy_path = self.world.save.read_chunk_data(chunk_position)
+
+		# chunks in the old one-file-per-chunk format are loaded and migrated right away
+		if legacy_path:
+			self.world.save.load_chunk(chunk_position)
+			self.world.chunk_loaded(chunk_position)
+			return
+
+		self.in_flight[chunk_position] = self.executor.submit(_load_chunk, chunk_position, data)
+
+	def shutdown(self):
+		self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,46 @@
+#version 330
+
+// packed chunk vertex format, see mesher.pack_vertices
+layout(location = 0) in uint packed_position;
+layout(location = 1) in uint packed_surface;
+
+out vec3 local_position;
+out vec3 interpolated_tex_coords;
+out float interpolated_shading_value;
+out vec3 light_offset;
+
+uniform mat4 matrix;
+uniform samplerBuffer chunk_origins; // origin of the chunk owning each block of 64 vertices, see vertex_arena.py
+
+// where chunk_frag.glsl samples the light of a face: half a block past the face, in the neighbour it looks at
+// (face number + 1 packed in the vertex), or in the block itself for non-cube models (0)
+const vec3 light_offsets[7] = vec3[7](
+	vec3(0.0, 0.0, 0.0),
+	vec3(0.5, 0.0, 0.0),
+	vec3(-0.5, 0.0, 0.0),
+	vec3(0.0, 0.5, 0.0),
+	vec3(0.0, -0.5, 0.0),
+	vec3(0.0, 0.0, 0.5),
+	vec3(0.0, 0.0, -0.5)
+);
+
+void main(void) {
+	vec3 chunk_origin = texelFetch(chunk_origins, gl_VertexID / 64).xyz;
+
+	vec3 position = vec3(
+		float(packed_position & 0x7FFu) / 64.0,
+		float((packed_position >> 11u) & 0x3FFu) / 32.0,
+		float(packed_position >> 21u) / 64.0
+	) - 1.0 + chunk_origin;
+
+	vec2 uv = vec2(float(packed_surface & 0x1FFu), float((packed_surface >> 9u) & 0x1FFu)) / 16.0;
+	float layer = float((packed_surface >> 18u) & 0xFFu);
+	uint light_face = (packed_surface >> 26u) & 0xFu;
+	float shade = 0.4 + 0.2 * float(packed_surface >> 30u);
+
+	local_position = position;
+	interpolated_tex_coords = vec3(uv, layer);
+	interpolated_shading_value = shade;
+	light_offset = light_offsets[min(light_face, 6u)];
+	gl_Position = matrix * vec4(position, 1.0);
+}
\ No newline at end of file
@@ -1,61 +1,59 @@
-import math
+"""
+View frustum culling.
+
+The frustum is the 6 clip planes of the model view projection matrix the
+chunks are drawn with (Gribb & Hartmann), so pitch, the field of view and the
+third person camera are all taken into account. A box is visible unless it is
+entirely behind one of the planes, tested with its corner furthest along the
+plane normal.
+
+boxes_visible tests many boxes in one NumPy pass (the loaded chunks, mobs,
+dropped items, particles), is_box_visible a single box without NumPy overhead.
+"""
+
+import numpy as np
+
+# planes as (row of the matrix, sign): left, right, bottom, top, near, far
+PLANES = ((0, 1), (0, -1), (1, 1), (1, -1), (2, 1), (2, -1))
+
 
 class Frustum:
 	def __init__(self):
-		self.cam_pos = (0, 0, 0)
-		self.forward = (0, 0, 1)
-		self.fov_cos = math.cos(math.radians(110 / 2)) # Wide FOV for safety
-
-	def update(self, position, rotation):
-		# Rotation: (yaw, pitch)
-		yaw, pitch = rotation
-		
-		# Match Player Movement Logic from player.py lines 103-106
-		# Forward (W key) implies movement along (cos(yaw), sin(yaw))
-		# Camera looks -Z by default, rotated by Yaw.
-		# Adding 90 degrees fixed it previously.
-		
-		# yaw += math.pi / 2 # Adjust for camera forward
-		
-		fx = math.cos(yaw + math.pi / 2)
-		fz = math.sin(yaw + math.pi / 2)
-		
-		# Normalize (2D)
-		l = math.sqrt(fx*fx + fz*fz)
-		if l > 0:
-			fx /= l
-			fz /= l
-			
-		self.cam_pos = position
-		self.forward = (fx, 0, fz)
+		# (a, b, c, d) per plane, a point is inside a plane if a * x + b * y + c * z + d >= 0.
+		# all zeros until the first update, which lets everything through
+		self.planes = np.zeros((6, 4), dtype=np.float64)
+		self.plane_list = [(0.0, 0.0, 0.0, 0.0)] * 6
+
+	def update(self, mvp_matrix):
+		# matrix.Matrix data is column major (data[column][row]), the planes are built from its rows
+		rows = np.array(mvp_matrix.data, dtype=np.float64).T
+
+		planes = np.array([rows[3] + sign * rows[row] for row, sign in PLANES])
+		planes /= np.linalg.norm(planes[:, :3], axis=1)[:, None]
+
+		self.planes = planes
+		self.plane_list = [tuple(plane) for plane in planes.tolist()]
+
+	def boxes_visible(self, mins, maxs):
+		"""Visibility of n axis aligned boxes given as (n, 3) arrays of min and max corners, returns n bools."""
+		mins = np.asarray(mins, dtype=np.float64).reshape(-1, 3)
+		maxs = np.asarray(maxs, dtype=np.float64).reshape(-1, 3)
+
+		normals = self.planes[:, :3]
+
+		# corner of every box furthest along every plane normal, (n, 6, 3)
+		corners = np.where(normals > 0, maxs[:, None, :], mins[:, None, :])
+		distances = (corners * normals).sum(axis=2) + self.planes[:, 3]
+
+		return (distances >= 0).all(axis=1)
 
 	def is_box_visible(self, min_x, min_y, min_z, max_x, max_y, max_z):
-		# Simple Directional Check
-		# Check Block Center
-		cx = (min_x + max_x) * 0.5
-		cz = (min_z + max_z) * 0.5
-		
-		# Vector to chunk
-		dx = cx - self.cam_pos[0]
-		dz = cz - self.cam_pos[2]
-		
-		dist_sq = dx*dx + dz*dz
-		
-		# Always draw close chunks (radius 8 blocks ~ 0.5 chunk)
-		if dist_sq < 16*16:
-			return True
-			
-		# Normalize direction
-		dist = math.sqrt(dist_sq)
-		dx /= dist
-		dz /= dist
-		
-		# Dot Product
-		dot = dx * self.forward[0] + dz * self.forward[2]
-		
-		# Check against FOV Cone
-		# If dot > cos(angle), it's in front
-		if dot > self.fov_cos:
-			return True
-			
-		return False
+		for a, b, c, d in self.plane_list:
+			x = max_x if a > 0 else min_x
+			y = max_y if b > 0 else min_y
+			z = max_z if c > 0 else min_z
+
+			if a * x + b * y + c * z + d < 0:
+				return False
+
+		return True
@@ -684,13 +684,7 @@ class InventoryRenderer:
 		else:
 			m.scale(size * 0.35, size * 0.35, size * 0.35) 
 
-		# Flatten matrix
-		flat_matrix = []
-		for i in range(4):
-			for j in range(4):
-				flat_matrix.append(m.data[i][j])
-		
-		gl.glUniformMatrix4fv(self.icon_model_loc, 1, gl.GL_FALSE, (gl.GLfloat * 16)(*flat_matrix))
+		gl.glUniformMatrix4fv(self.icon_model_loc, 1, gl.GL_FALSE, m.pointer)
 		
 		data = []
 		num_verts = 0
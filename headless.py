@@ -0,0 +1,132 @@
+"""
+A world without a window: the parts of world.World that chunks, meshing,
+lighting, saving and water need, and the block types loaded without textures.
+Used by benchmark.py and pregen.py.
+"""
+
+import os
+
+import block_type
+import block_metadata
+import light_solver
+import mesher
+import models
+import terrain_generator
+
+BLOCK_DATA_PATH = "data/blocks.mcpy"
+
+
+class HeadlessTextureManager:
+	# only keeps texture names, the texture layer numbers are all the mesher needs
+	def __init__(self):
+		self.textures = []
+
+	def add_texture(self, texture):
+		if texture not in self.textures:
+			self.textures.append(texture)
+
+	def generate_mipmaps(self):
+		pass
+
+
+class HeadlessSettings:
+	def __init__(self, mesher="numpy", greedy_meshing=False):
+		self.render_distance = 4
+		self.mesher = mesher
+		self.greedy_meshing = greedy_meshing
+		self.mesh_workers = 0
+		self.save_compression = "zlib"
+
+
+class HeadlessWorld:
+	"""The parts of world.World used by chunks, meshing, lighting, saving and water, without any GL."""
+
+	def __init__(self, block_types):
+		self.settings = HeadlessSettings()
+		self.block_types = block_types
+		self.mesh_tables = mesher.MeshTables(block_types)
+		self.chunk_arena = None
+
+		self.chunks = {}
+		self.block_metadata = block_metadata.BlockMetadata()
+		self.light_solver = light_solver.LightSolver(self)
+		self.mesh_update_set = set()
+
+	def spawn_pigs_in_chunk(self, chunk_position):
+		pass
+
+	def get_chunk_position(self, position):
+		x, y, z = position
+		return (int(x) >> 4, int(y) >> 4, int(z) >> 4)
+
+	def get_local_position(self, position):
+		x, y, z = position
+		return (int(x) & 15, int(y) & 15, int(z) & 15)
+
+	def get_block_number(self, position):
+		chunk_position = self.get_chunk_position(position)
+
+		if chunk_position not in self.chunks:
+			return 0
+
+		lx, ly, lz = self.get_local_position(position)
+		return self.chunks[chunk_position].get_block(lx, ly, lz)
+
+	def is_opaque_block(self, position):
+		block_type = self.block_types[self.get_block_number(position)]
+		return bool(block_type) and not block_type.transparent
+
+	def is_position_loaded(self, position):
+		return self.get_chunk_position(position) in self.chunks
+
+	def light_changed(self, chunk):
+		# no light volume, the light stays in the light maps
+		pass
+
+	def visibility_changed(self, chunk_position):
+		# no cave culling
+		pass
+
+	def set_block(self, position, number):
+		# water ticks only, meshes are rebuilt by the water simulator itself
+		chunk_position = self.get_chunk_position(position)
+
+		if chunk_position not in self.chunks:
+			return
+
+		lx, ly, lz = self.get_local_position(position)
+		self.chunks[chunk_position].set_block(lx, ly, lz, number)
+		self.chunks[chunk_position].modified = True
+
+
+def load_block_types(texture_manager, fallback=True):
+	"""
+	(block types, where they came from): the real block data if it is there, otherwise a stand-in for every
+	block the terrain generator places, or (None, None) without fallback.
+	"""
+
+	if os.path.exists(BLOCK_DATA_PATH):
+		return block_type.load_block_types(texture_manager, BLOCK_DATA_PATH), BLOCK_DATA_PATH
+
+	if not fallback:
+		return None, None
+
+	block_types = [None]
+	special_models = {"water": models.liquid, "oak_leaves": models.leaves}
+
+	for name, number in terrain_generator.TerrainGenerator(seed=0).block_map.items():
+		if not number:
+			continue
+
+		while number >= len(block_types):
+			block_types.append(None)
+
+		block_types[number] = block_type.Block_type(
+			texture_manager, name, {"all": name}, special_models.get(name, models.cube)
+		)
+
+	# flowing water
+	block_types.extend([None] * (10 - len(block_types)))
+	block_types[9] = block_types[8]
+
+	return block_types, "fallback"
@@ -343,11 +343,7 @@ class ItemGUI(pyglet.window.Window):
         final_mvp = m_item * m_final
         
         self.shader.use()
-        flat_mvp = []
-        for i in range(4):
-            for j in range(4):
-                flat_mvp.append(final_mvp.data[i][j])
-        gl.glUniformMatrix4fv(self.matrix_loc, 1, gl.GL_FALSE, (gl.GLfloat * 16)(*flat_mvp))
+        gl.glUniformMatrix4fv(self.matrix_loc, 1, gl.GL_FALSE, final_mvp.pointer)
         
         gl.glActiveTexture(gl.GL_TEXTURE0)
         gl.glBindTexture(gl.GL_TEXTURE_2D_ARRAY, self.texture_manager.texture_array)
@@ -1,307 +1,501 @@
-import math
-from collections import deque
+from collections import Counter, deque
+
+import numpy as np
+
+# Nodes are (chunk, index) with index = x * 256 + y * 16 + z into the chunk's block array and light map
+# (sky << 4 | block). Light spreads with a breadth-first flood fill (see LIGHT_SYSTEM_DESIGN.md):
+# the add queues hold lit nodes whose light still has to spread to their neighbours, the remove queues
+# (node, level it had) pairs of nodes that were darkened and whose neighbours lit by them have to follow.
+
+BLOCK, SKY = 0, 1
+
+# per channel: shift of its nibble, mask of the other one
+SHIFTS = (0, 4)
+KEEP_MASKS = (0xF0, 0x0F)
+
+# (dx, dy, dz) of the six neighbours, DOWN is the one sky light of level 15 goes through without fading
+DIRECTIONS = ((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1))
+DOWN = 3
+
+
+def _neighbour_tables():
+	# NEIGHBOURS[d][i] index of the neighbour of i in direction d (wrapped into the neighbour chunk when it
+	# crosses the border), CROSSES[d][i] 1 if it does
+	neighbours, crosses = [], []
+
+	for dx, dy, dz in DIRECTIONS:
+		indices, crossing = [], bytearray(4096)
+
+		for i in range(4096):
+			x, y, z = i >> 8, (i >> 4) & 15, i & 15
+			nx, ny, nz = x + dx, y + dy, z + dz
+
+			if not (0 <= nx < 16 and 0 <= ny < 16 and 0 <= nz < 16):
+				crossing[i] = 1
+
+			indices.append(((nx & 15) << 8) | ((ny & 15) << 4) | (nz & 15))
+
+		neighbours.append(indices)
+		crosses.append(bytes(crossing))
+
+	return neighbours, crosses
+
+
+NEIGHBOURS, CROSSES = _neighbour_tables()
+
+# FACE_INDICES[d] the indices of the border layer of a chunk facing direction d, opposite faces (d and d ^ 1)
+# list the nodes next to each other across the border in the same order
+FACE_INDICES = [np.flatnonzero(np.frombuffer(crossing, dtype=np.uint8)) for crossing in CROSSES]
+
+# PADDED_LAYERS[d] the layer of an (18, 18, 18) box around a chunk in direction d, FACING_LAYERS[d] the layer
+# of the neighbour in direction d facing the chunk
+PADDED_LAYERS = [
+	tuple((17 if d > 0 else 0) if d else slice(1, 17) for d in direction) for direction in DIRECTIONS
+]
+FACING_LAYERS = [
+	tuple((0 if d > 0 else 15) if d else slice(None) for d in direction) for direction in DIRECTIONS
+]
+
+
+def brightest_neighbour(padded):
+	# highest value of the six neighbours of each node inside an (18, 18, 18) box
+	inner = slice(1, 17)
+	return np.maximum.reduce([
+		padded[2:, inner, inner], padded[:-2, inner, inner],
+		padded[inner, 2:, inner], padded[inner, :-2, inner],
+		padded[inner, inner, 2:], padded[inner, inner, :-2],
+	])
+
+
+# LINKS[i] the six (direction, neighbour index, crosses) of i, one lookup per node in propagate
+LINKS = [tuple((direction, NEIGHBOURS[direction][i], CROSSES[direction][i]) for direction in range(6)) for i in range(4096)]
+
 
 class LightSolver:
 	def __init__(self, world):
 		self.world = world
-		
+
 		# Rule: Split Priority Queues
-		self.high_priority_queue = deque() # For Block Break/Place
-		self.low_priority_queue = deque()  # For Chunk Load / Sunlight Init
-		
-		# To ensure "Each block processing only ONCE per tick" (Rule 2)
-		self.queued_locations = set()
+		# high for block edits, emptied every tick, low for chunk loads, worked through with a budget
+		self.high_priority_queue = deque() # (chunk, index, channel) to spread
+		self.high_remove_queue = deque() # (chunk, index, channel, old level) to darken around
+		self.low_priority_queue = deque()
+		self.low_remove_queue = deque()
+
+		# queued low priority nodes per chunk, a chunk without any has settled light (Save only stores settled light maps)
+		self.pending_chunks = Counter()
 
 		# Rule 3: Dirty Chunks Collection
 		self.dirty_chunks = set()
-		
-		self.directions = [
-			(1, 0, 0), (-1, 0, 0),
-			(0, 1, 0), (0, -1, 0),
-			(0, 0, 1), (0, 0, -1)
-		]
-
-	def add_to_queue(self, x, y, z, channel, priority='high'):
-		if (x, y, z, channel) not in self.queued_locations:
-			if priority == 'high':
-				self.high_priority_queue.append((x, y, z, channel))
-			else:
-				self.low_priority_queue.append((x, y, z, channel))
-			
-			self.queued_locations.add((x, y, z, channel))
-
-	def get_light(self, x, y, z, channel):
-		# Optimized access
-		if not self.world.is_position_loaded((x, y, z)):
-			return 15 if channel == 1 else 0 # Boundary assumption: Sky is bright, Block is dark
-		
-		val = self.world.get_light((x, y, z))
-		return val[channel]
-
-	def set_light(self, x, y, z, val, channel):
-		# Rule 4: Local Flood Fill (only loaded chunks)
-		if not self.world.is_position_loaded((x, y, z)):
-			return
-			
-		l_vals = list(self.world.get_light((x, y, z)))
-		if l_vals[channel] != val:
-			l_vals[channel] = val
-			self.world.set_light((x, y, z), l_vals[0], l_vals[1])
-			
-			# Rule 3: Collect dirty chunks (don't update mesh yet)
-			cp = self.world.get_chunk_position((x, y, z))
-			self.dirty_chunks.add(cp)
+
+		# per block number: 1 if light doesn't go through it, and the light it gives off
+		self.opaque = bytearray(65536)
+		self.emission = bytearray(65536)
+
+		for number, block_type in enumerate(world.block_types):
+			if block_type:
+				self.opaque[number] = not block_type.transparent
+				self.emission[number] = block_type.light_level
+
+	def add_node(self, chunk, index, channel, priority='high'):
+		if priority == 'high':
+			self.high_priority_queue.append((chunk, index, channel))
+		else:
+			self.low_priority_queue.append((chunk, index, channel))
+			self.pending_chunks[chunk.chunk_position] += 1
+
+	def remove_node(self, chunk, index, channel, level, priority='high'):
+		if priority == 'high':
+			self.high_remove_queue.append((chunk, index, channel, level))
+		else:
+			self.low_remove_queue.append((chunk, index, channel, level))
+			self.pending_chunks[chunk.chunk_position] += 1
+
+	def node_done(self, chunk_position):
+		self.pending_chunks[chunk_position] -= 1
+		if not self.pending_chunks[chunk_position]:
+			del self.pending_chunks[chunk_position]
+
+	def has_pending(self, chunk_position):
+		# block edits aren't counted per chunk, while any is queued every chunk counts as pending
+		return chunk_position in self.pending_chunks or bool(self.high_priority_queue or self.high_remove_queue)
+
+	def busy(self):
+		return bool(self.high_priority_queue or self.high_remove_queue or self.low_priority_queue or self.low_remove_queue)
+
+	def neighbour_chunk(self, chunk, direction):
+		cx, cy, cz = chunk.chunk_position
+		dx, dy, dz = DIRECTIONS[direction]
+		return self.world.chunks.get((cx + dx, cy + dy, cz + dz))
 
 	def toggle_light(self, position, old_block_type, new_block_type):
 		"""
 		Rule 1: Event-Driven Trigger
 		"""
 		x, y, z = position
-		
+		chunk = self.world.chunks.get((x >> 4, y >> 4, z >> 4))
+		if chunk is None:
+			return
+
+		index = ((x & 15) << 8) | ((y & 15) << 4) | (z & 15)
+		light = chunk.light_map
+
 		old_emit = old_block_type.light_level if old_block_type else 0
 		new_emit = new_block_type.light_level if new_block_type else 0
-		
+
 		old_trans = old_block_type.transparent if old_block_type else True
 		new_trans = new_block_type.transparent if new_block_type else True
-		
-		# Blocks always High Priority
-		priority = 'high'
-		
+
 		# 1. Block Light Logic
-		# Rule 5: Wake Neighbors on any change
 		if old_emit != new_emit or old_trans != new_trans:
-			self.add_to_queue(x, y, z, 0, priority)
-			for dx, dy, dz in self.directions:
-				self.add_to_queue(x+dx, y+dy, z+dz, 0, priority)
-				
+			level = light[index] & 15
+			if level:
+				light[index] &= 0xF0
+				self.remove_node(chunk, index, BLOCK, level)
+
+			if new_emit:
+				light[index] = (light[index] & 0xF0) | new_emit
+				self.add_node(chunk, index, BLOCK)
+
+			if new_trans:
+				self.wake_neighbours(chunk, index, BLOCK)
+
 		# 2. Sky Light Logic
-		# Rule 6: Column Based Updates
 		if old_trans != new_trans:
-			self.update_sky_column(x, y, z, new_trans, priority)
-		
-		# For Block Updates, we might want to process immediately a small batch?
-		# But instructions say "Process Queue every tick: High then Low".
-		pass
-
-	def update_sky_column(self, x, y, z, is_transparent, priority='high'):
-		# Rule 6: Sky Light Column Refresh
-		# If a block acts as an obstruction (placing solid) or opening (breaking solid).
-		
-		# Check light above
-		light_above = self.get_light(x, y+1, z, 1)
-		
-		if is_transparent:
-			# Opening: If above is 15, we propagate down 15.
-			if light_above == 15:
-				# Propagate down efficiently
-				cur_y = y
-				while cur_y >= 0:
-					if self.world.is_opaque_block((x, cur_y, z)):
-						break
-					
-					self.set_light(x, cur_y, z, 15, 1)
-					self.add_to_queue(x, cur_y, z, 1, priority) # Add to queue to spread sideways
-					
-					# Also wake neighbors of column to refill them
-					for dx, dy, dz in self.directions:
-						if dx == 0 and dz == 0: continue # Skip vertical neighbors
-						self.add_to_queue(x+dx, cur_y+dy, z+dz, 1, priority)
-						
-					cur_y -= 1
+			if not new_trans:
+				level = light[index] >> 4
+				if level:
+					light[index] &= 0x0F
+					self.remove_node(chunk, index, SKY, level)
+			elif y & 15 == 15 and self.neighbour_chunk(chunk, 2) is None:
+				# open sky above an unloaded chunk
+				light[index] |= 0xF0
+				self.add_node(chunk, index, SKY)
 			else:
-				# Just wake self to calculate from neighbors
-				self.add_to_queue(x, y, z, 1, priority)
-				for dx, dy, dz in self.directions:
-					self.add_to_queue(x+dx, y+dy, z+dz, 1, priority)
+				self.wake_neighbours(chunk, index, SKY)
 
-		else:
-			# Closing/Obstruction
-			# We blocked the light. 
-			# The block itself is opaque, so light inside is 0 (handled by standard logic).
-			# But blocks BELOW need to be updated.
-			# They were likely 15 (if air). We need to wipe them or wake them.
-			
-			# We iterate down and "Darken" the column, letting neighbors refill it later if needed.
-			cur_y = y - 1
-			while cur_y >= 0:
-				if self.world.is_opaque_block((x, cur_y, z)):
-					break
-				
-				# If it was fully lit sky, it's now invalid. 
-				# Set to 0 and let BFS refill it from sides if possible.
-				if self.get_light(x, cur_y, z, 1) == 15:
-					self.set_light(x, cur_y, z, 0, 1)
-					self.add_to_queue(x, cur_y, z, 1, priority)
-					
-					# Wake neighbors to recalculate
-					for dx, dy, dz in self.directions:
-						self.add_to_queue(x+dx, cur_y+dy, z+dz, 1, priority)
-				else:
-					# If not 15, it might be correct or not, just wake it.
-					self.add_to_queue(x, cur_y, z, 1, priority)
-					
-				cur_y -= 1
-				
-		# Wake self/neighbors for standard update
-		self.add_to_queue(x, y, z, 1, priority)
-		for dx, dy, dz in self.directions:
-			self.add_to_queue(x+dx, y+dy, z+dz, 1, priority)
+		self.dirty_chunks.add(chunk.chunk_position)
+
+	def wake_neighbours(self, chunk, index, channel, priority='high'):
+		# lit neighbours spread into the node again, e.g. after it became transparent
+		shift = SHIFTS[channel]
+
+		for direction in range(6):
+			neighbour = chunk
+			if CROSSES[direction][index]:
+				neighbour = self.neighbour_chunk(chunk, direction)
+				if neighbour is None:
+					continue
+
+			neighbour_index = NEIGHBOURS[direction][index]
+			if (neighbour.light_map[neighbour_index] >> shift) & 15:
+				self.add_node(neighbour, neighbour_index, channel, priority)
 
 	def process_queue(self, budget=500):
 		# Rule: Prioritize HIGH queue (Unlimited budget for interactivity)
-		
-		# 1. Process ALL High Priority Tasks (Responsiveness Guarantee)
-		# Safety cap just in case of infinite loops, but realistically "unlimited"
-		high_safety_limit = 10000 
-		h_count = 0
-		while self.high_priority_queue and h_count < high_safety_limit:
-			x, y, z, channel = self.high_priority_queue.popleft()
-			self.queued_locations.discard((x, y, z, channel))
-			self.solve_node(x, y, z, channel, priority='high')
-			h_count += 1
-			
+		# block edits only touch the few thousand nodes around them, so they are always finished right away.
+		# A block placed or broken relights in well under a millisecond, a torch (about 2000 nodes lit or
+		# darkened) takes a few milliseconds, the cost of one Python loop iteration per node
+		h_count = self.propagate(self.high_remove_queue, self.high_priority_queue, None)
+
 		# 2. Process LOW Priority Tasks (Budgeted)
-		l_processed = 0
-		# Resume budget usage where we left off? 
-		# Or separate budgets? 
-		# Let's say high priority is free, low is budgeted.
-		
-		while self.low_priority_queue and l_processed < budget:
-			x, y, z, channel = self.low_priority_queue.popleft()
-			self.queued_locations.discard((x, y, z, channel))
-			self.solve_node(x, y, z, channel, priority='low')
-			l_processed += 1
-			
+		l_processed = self.propagate(self.low_remove_queue, self.low_priority_queue, budget)
+
 		# Process Dirty Chunks
 		if h_count > 0 or l_processed > 0:
 			self.update_dirty_chunks()
-			
+
 		# Return True if there is still WORK to be done (Low priority left)
-		return len(self.low_priority_queue) > 0
+		return bool(self.low_priority_queue or self.low_remove_queue)
 
-	def solve_node(self, x, y, z, channel, priority='low'):
-		if not self.world.is_position_loaded((x, y, z)):
-			return
-			
-		# Calculate correct value based on surroundings (Automata Rule)
-		current_val = self.get_light(x, y, z, channel)
-		
-		# 1. Emission (Self)
-		emission = 0
-		if channel == 0: # Block Light
-			block_num = self.world.get_block_number((x, y, z))
-			if block_num:
-				bt = self.world.block_types[block_num]
-				if bt: emission = bt.light_level
-				
-		# 2. Propagation (Neighbors)
-		max_neighbor = 0
-		for dx, dy, dz in self.directions:
-			nx, ny, nz = x+dx, y+dy, z+dz
-			
-			n_light = self.get_light(nx, ny, nz, channel)
-			
-			# Rule 6 Logic Check: Sky propagation 15->15 down
-			if channel == 1 and dy == 1 and n_light == 15: # If neighbor is ABOVE
-				# Vertical sky propagation
-				if n_light == 15:
-					max_neighbor = max(max_neighbor, 16) # 16-1 = 15
+	def propagate(self, remove_queue, add_queue, budget):
+		# removals first, so the adds they queue see the darkened nodes. Returns the number of nodes processed
+		processed = 0
+
+		chunks = self.world.chunks
+		opaque = self.opaque
+		emission = self.emission
+		dirty_chunks = self.dirty_chunks
+		pending_chunks = self.pending_chunks
+		neighbour_chunk = self.neighbour_chunk
+		links = LINKS
+
+		# only the low priority queues are counted per chunk, the high ones are always emptied right away
+		counted = add_queue is self.low_priority_queue
+		remove_append = remove_queue.append
+		add_append = add_queue.append
+
+		# chunks don't unload while the queues are worked through, each one is only looked up once in a row
+		loaded = None
+
+		while remove_queue and (budget is None or processed < budget):
+			chunk, index, channel, level = remove_queue.popleft()
+			processed += 1
+
+			if counted:
+				self.node_done(chunk.chunk_position)
+
+			if chunk is not loaded:
+				if chunks.get(chunk.chunk_position) is not chunk: # unloaded since
 					continue
-			
-			max_neighbor = max(max_neighbor, n_light)
-		
-		calculated_val = max_neighbor - 1
-		calculated_val = max(calculated_val, emission)
-		
-		# Opacity check: If opaque, light is 0 (unless emission)
-		if self.world.is_opaque_block((x, y, z)):
-			calculated_val = emission # Emissive blocks can be opaque (e.g. Jack o Lantern)
-		
-		# Apply Constraints
-		if calculated_val < 0: calculated_val = 0
-		if calculated_val > 15: calculated_val = 15
-		
-		# Update Logic
-		if current_val != calculated_val:
-			self.set_light(x, y, z, calculated_val, channel)
-			
-			# Rule 5: Wake Neighbors
-			for dx, dy, dz in self.directions:
-				self.add_to_queue(x+dx, y+dy, z+dz, channel, priority)
+				loaded = chunk
+
+			shift = SHIFTS[channel]
+			keep = KEEP_MASKS[channel]
+			sky_down = channel == SKY and level == 15
+
+			for direction, neighbour_index, crosses in links[index]:
+				neighbour = chunk
+				if crosses:
+					neighbour = neighbour_chunk(chunk, direction)
+					if neighbour is None:
+						continue
+
+				neighbour_light = neighbour.light_map
+				current = (neighbour_light[neighbour_index] >> shift) & 15
+
+				if not current:
+					continue
+
+				if current < level or (sky_down and direction == DOWN):
+					# lit by the removed light, goes dark too
+					neighbour_light[neighbour_index] &= keep
+					remove_append((neighbour, neighbour_index, channel, current))
+					dirty_chunks.add(neighbour.chunk_position)
+					if counted:
+						pending_chunks[neighbour.chunk_position] += 1
+
+					if channel == BLOCK:
+						emit = emission[neighbour.blocks[neighbour_index]]
+						if emit:
+							neighbour_light[neighbour_index] |= emit
+							add_append((neighbour, neighbour_index, channel))
+							if counted:
+								pending_chunks[neighbour.chunk_position] += 1
+				else:
+					# lit by something else, it fills the darkened area again
+					add_append((neighbour, neighbour_index, channel))
+					if counted:
+						pending_chunks[neighbour.chunk_position] += 1
+
+		while add_queue and (budget is None or processed < budget):
+			chunk, index, channel = add_queue.popleft()
+			processed += 1
+
+			if counted:
+				self.node_done(chunk.chunk_position)
+
+			if chunk is not loaded:
+				if chunks.get(chunk.chunk_position) is not chunk:
+					continue
+				loaded = chunk
+
+			shift = SHIFTS[channel]
+			level = (chunk.light_map[index] >> shift) & 15
+
+			if level <= 1:
+				continue
+
+			keep = KEEP_MASKS[channel]
+
+			# Rule 6: sky light goes straight down without fading
+			sky_down = channel == SKY and level == 15
+			faded = level - 1
+
+			for direction, neighbour_index, crosses in links[index]:
+				neighbour = chunk
+				if crosses:
+					neighbour = neighbour_chunk(chunk, direction)
+					if neighbour is None:
+						continue
+
+				if opaque[neighbour.blocks[neighbour_index]]:
+					continue
+
+				new_level = 15 if sky_down and direction == DOWN else faded
+
+				neighbour_light = neighbour.light_map
+				value = neighbour_light[neighbour_index]
+				if (value >> shift) & 15 < new_level:
+					neighbour_light[neighbour_index] = (value & keep) | (new_level << shift)
+					add_append((neighbour, neighbour_index, channel))
+					dirty_chunks.add(neighbour.chunk_position)
+					if counted:
+						pending_chunks[neighbour.chunk_position] += 1
+
+		return processed
 
 	def update_dirty_chunks(self):
-		# Collect valid chunk objects
-		for cx, cy, cz in self.dirty_chunks:
-			if (cx, cy, cz) in self.world.chunks:
-				# Mark this chunk dirty
-				self.world.mark_chunk_dirty((cx*16, cy*16, cz*16))
-				# Mark neighbors? Usually mesh builds look at neighbors. 
-				# Ideally yes.
-				for dx, dy, dz in self.directions:
-					self.world.mark_chunk_dirty(((cx+dx)*16, (cy+dy)*16, (cz+dz)*16))
-					
+		# meshes don't hold light, only the light of the changed chunks is handed to the GPU (see light_volume.py)
+		for chunk_position in self.dirty_chunks:
+			chunk = self.world.chunks.get(chunk_position)
+			if chunk is not None:
+				self.world.light_changed(chunk)
+
 		self.dirty_chunks.clear()
 
 	def initialize_sunlight(self, chunk_position):
-		# Initial sunlight fill logic
-		# Rule 6: Column Logic applied to initialization
-		cx, cy, cz = chunk_position
-		base_x = cx * 16
-		start_y = cy * 16
-		end_y = start_y + 16
-		base_z = cz * 16
-		
-		# Check above chunk
-		above_loaded = self.world.is_position_loaded((base_x, end_y, base_z))
-		
-		for lx in range(16):
-			for lz in range(16):
-				gx, gy, gz = base_x + lx, end_y - 1, base_z + lz
-				
-				# Logic:
-				# If above is load, check light.
-				# If not loaded, assume 15.
-				start_light = 0
-				if not above_loaded:
-					start_light = 15
-				else:
-					start_light = self.get_light(gx, end_y, gz, 1) # Get light at bottom of chunk above
-				
-				if start_light == 15:
-					# Propagate 15 down manually through this new column
-					cur_y = end_y - 1
-					while cur_y >= start_y:
-						if self.world.is_opaque_block((gx, cur_y, gz)):
-							break
-						self.set_light(gx, cur_y, gz, 15, 1)
-						self.add_to_queue(gx, cur_y, gz, 1, 'low') # Add to spread sideways
-						cur_y -= 1
-				elif start_light > 0:
-					# Propagate faded light
-					self.set_light(gx, end_y-1, gz, start_light-1, 1)
-					self.add_to_queue(gx, end_y-1, gz, 1, 'low')
-		
-		# Rule 5 (Sort of): Stitching
-		# Add boundary blocks of loaded neighbors to queue
-		neighbors = [
-           (1, 0, 15, 0), (-1, 0, 0, 15),
-           (0, 1, 15, 0), (0, -1, 0, 15)
-        ] # (dx, dz, my_border, neig_border) logic simplified
-		
-		for dx, dz, _, _ in neighbors:
-			ncx, ncz = cx + dx, cz + dz
-			if self.world.is_position_loaded((ncx*16, 0, ncz*16)):
-				pass
-		
-		# Trigger self & neighbor borders
-		# Add the outer shell of this chunk to queue.
-		for y in range(start_y, end_y):
-			for i in range(16):
-				# Front/Back/Left/Right faces
-				self.add_to_queue(base_x + i, y, base_z, 1, 'low')
-				self.add_to_queue(base_x + i, y, base_z + 15, 1, 'low')
-				self.add_to_queue(base_x, y, base_z + i, 1, 'low')
-				self.add_to_queue(base_x + 15, y, base_z + i, 1, 'low')
-		
-		# INCREMENTAL: Do not process immediately.
+		# Light of a newly loaded chunk, computed for the whole chunk at once: sky light down the open columns
+		# and spread sideways inside the chunk, then only the border nodes where light crosses from or into a
+		# loaded neighbour, and the chunk's light sources, are left to the queue
+		chunk = self.world.chunks.get(chunk_position)
+		if chunk is None:
+			return
+
+		light_flat = np.frombuffer(chunk.light_map, dtype=np.uint8)
+		light = light_flat.reshape(16, 16, 16) # x, y, z
+		blocks = chunk.blocks_array().ravel()
+		transparent = (np.frombuffer(self.opaque, dtype=np.uint8)[blocks] == 0).reshape(16, 16, 16)
+
+		above = self.neighbour_chunk(chunk, 2)
+
+		# sky light entering each column from above: the open sky, or the bottom layer of the chunk above
+		if above is None:
+			entering = np.full((16, 16), 15, dtype=np.uint8)
+		else:
+			entering = np.frombuffer(above.light_map, dtype=np.uint8).reshape(16, 16, 16)[:, 0, :] >> 4
+
+		# Rule 6: 15 goes down a column to its first opaque block, lower levels fade by one into the top block
+		open_below_sky = np.logical_and.accumulate(transparent[:, ::-1, :], axis=1)[:, ::-1, :]
+		sky = np.where(open_below_sky & (entering == 15)[:, None, :], 15, 0).astype(np.uint8)
+
+		faded = (entering > 1) & (entering < 15) & transparent[:, 15, :]
+		sky[:, 15, :] = np.where(faded, entering - 1, sky[:, 15, :])
+
+		# spread inside the chunk, one block further per pass
+		for _ in range(14):
+			spread = np.zeros_like(sky)
+			np.maximum(spread[1:], sky[:-1], out=spread[1:])
+			np.maximum(spread[:-1], sky[1:], out=spread[:-1])
+			np.maximum(spread[:, 1:], sky[:, :-1], out=spread[:, 1:])
+			np.maximum(spread[:, :-1], sky[:, 1:], out=spread[:, :-1])
+			np.maximum(spread[:, :, 1:], sky[:, :, :-1], out=spread[:, :, 1:])
+			np.maximum(spread[:, :, :-1], sky[:, :, 1:], out=spread[:, :, :-1])
+
+			spread = np.where(transparent, spread - (spread > 0), 0).astype(np.uint8)
+			if not (spread > sky).any():
+				break
+
+			np.maximum(sky, spread, out=sky)
+
+		np.maximum(sky, light >> 4, out=sky)
+		light[...] = (light & 0x0F) | (sky << 4)
+
+		# light sources
+		for index in np.flatnonzero(np.frombuffer(self.emission, dtype=np.uint8)[blocks]).tolist():
+			light_flat[index] = (light_flat[index] & 0xF0) | self.emission[chunk.blocks[index]]
+			self.add_node(chunk, index, BLOCK, 'low')
+
+		# e.g. the chunk below was lit as if the sky was open above it
+		chunk.lit = True
+		self.darken_neighbours(chunk)
+
+		# INCREMENTAL: the border nodes are processed with the rest of the low priority queue
+		self.stitch_borders(chunk)
+
+	def lit_neighbour(self, chunk, direction):
+		neighbour = self.neighbour_chunk(chunk, direction)
+		return neighbour if neighbour is not None and neighbour.lit else None
+
+	def darken_neighbours(self, chunk):
+		# the lit neighbours of a chunk which was just loaded may have been lit by what used to be there
+		for direction in range(6):
+			neighbour = self.lit_neighbour(chunk, direction)
+			if neighbour is not None:
+				self.darken_unsupported(neighbour)
+
+	def darken_unsupported(self, chunk):
+		# Nodes brighter than their neighbours and light sources allow (lit before a nearby chunk changed or
+		# loaded, e.g. a saved light map, or sky light under a chunk loaded above) go dark, with the nodes they
+		# lit, and are filled again by the queue. Unloaded or unlit neighbours could hold any light, they count as full
+		light = np.frombuffer(chunk.light_map, dtype=np.uint8).reshape(16, 16, 16)
+		blocks = chunk.blocks_array()
+		transparent = np.frombuffer(self.opaque, dtype=np.uint8)[blocks] == 0
+		emission = np.frombuffer(self.emission, dtype=np.uint8)[blocks]
+
+		# the light map inside the facing layers of the neighbours
+		padded = np.full((18, 18, 18), 0xFF, dtype=np.uint8)
+		padded[1:17, 1:17, 1:17] = light
+
+		for direction in range(6):
+			neighbour = self.lit_neighbour(chunk, direction)
+			if neighbour is not None:
+				neighbour_light = np.frombuffer(neighbour.light_map, dtype=np.uint8).reshape(16, 16, 16)
+				padded[PADDED_LAYERS[direction]] = neighbour_light[FACING_LAYERS[direction]]
+
+		sky = (padded >> 4).astype(np.int16)
+		block = (padded & 15).astype(np.int16)
+
+		# Rule 6: 15 from above doesn't fade
+		sky_support = brightest_neighbour(sky) - 1
+		sky_support[sky[1:17, 2:, 1:17] == 15] = 15
+		sky_support[~transparent] = 0
+
+		block_support = np.maximum(brightest_neighbour(block) - 1, emission)
+		block_support[~transparent] = emission[~transparent]
+
+		dark_sky = np.flatnonzero(light >> 4 > sky_support).tolist()
+		dark_block = np.flatnonzero(light & 15 > block_support).tolist()
+
+		light_map = chunk.light_map
+		flat_emission = emission.ravel()
+
+		for index in dark_sky:
+			level = light_map[index] >> 4
+			light_map[index] &= 0x0F
+			self.remove_node(chunk, index, SKY, level, 'low')
+
+		for index in dark_block:
+			level = light_map[index] & 15
+			light_map[index] = (light_map[index] & 0xF0) | flat_emission[index]
+			self.remove_node(chunk, index, BLOCK, level, 'low')
+			if flat_emission[index]:
+				self.add_node(chunk, index, BLOCK, 'low')
+
+		if dark_sky or dark_block:
+			self.dirty_chunks.add(chunk.chunk_position)
+
+	def stitch_borders(self, chunk):
+		# Rule 5: Stitching, only where light crosses the border between the chunk and its loaded neighbours
+		light_flat = np.frombuffer(chunk.light_map, dtype=np.uint8)
+		opaque = np.frombuffer(self.opaque, dtype=np.uint8)
+		transparent_flat = opaque[chunk.blocks_array().ravel()] == 0
+
+		for direction in range(6):
+			neighbour = self.neighbour_chunk(chunk, direction)
+			if neighbour is None:
+				continue
+
+			own_face = FACE_INDICES[direction]
+			neighbour_face = FACE_INDICES[direction ^ 1]
+
+			neighbour_light = np.frombuffer(neighbour.light_map, dtype=np.uint8)[neighbour_face]
+			neighbour_transparent = opaque[neighbour.blocks_array().ravel()[neighbour_face]] == 0
+
+			own_sky = light_flat[own_face] >> 4
+			neighbour_sky = neighbour_light >> 4
+			own_block = light_flat[own_face] & 15
+			neighbour_block = neighbour_light & 15
+
+			# out of this chunk
+			reached = own_sky.astype(np.int16) - 1
+			if direction == DOWN:
+				reached[own_sky == 15] = 15
+			for index in own_face[neighbour_transparent & (reached > neighbour_sky)].tolist():
+				self.add_node(chunk, index, SKY, 'low')
+
+			for index in own_face[neighbour_transparent & (own_block.astype(np.int16) - 1 > neighbour_block)].tolist():
+				self.add_node(chunk, index, BLOCK, 'low')
+
+			# into this chunk
+			own_transparent = transparent_flat[own_face]
+			entering = neighbour_sky.astype(np.int16) - 1
+			if direction == 2:
+				entering[neighbour_sky == 15] = 15
+			for index in neighbour_face[own_transparent & (entering > own_sky)].tolist():
+				self.add_node(neighbour, index, SKY, 'low')
+
+			for index in neighbour_face[own_transparent & (neighbour_block.astype(np.int16) - 1 > own_block)].tolist():
+				self.add_node(neighbour, index, BLOCK, 'low')
 
+		self.dirty_chunks.add(chunk.chunk_position)
@@ -0,0 +1,106 @@
+"""
+Chunk light on the GPU.
+
+The light maps of the loaded chunks are kept in one 3D texture (a clip-map
+around the player) instead of being baked into the chunk meshes, so a light
+change only uploads the light map of the changed chunk with glTexSubImage3D
+and meshes depend on the block geometry alone.
+
+The texture wraps around: block (x, y, z) is stored at texel
+(z mod width, y mod height, x mod depth), the same mod chunk_frag.glsl samples
+it with. The texture covers the loaded area plus a margin in every direction,
+so each loaded chunk has a 16x16x16 slot of its own. A light map is uploaded
+as it is, its x * 256 + y * 16 + z layout being the texel order of a
+(z, y, x) box.
+
+Slots of unloaded chunks are filled with full skylight, what the meshes used
+to get for faces next to unloaded chunks.
+"""
+
+import numpy as np
+import pyglet.gl as gl
+
+# texture unit of the light volume (0 is the block texture array, 1 the chunk origins, see vertex_arena.py)
+LIGHT_TEXTURE_UNIT = 2
+
+CHUNK_SIZE = 16
+
+# chunk layers the texture covers vertically, world.process_chunk_updates loads 5 around the player
+LAYERS = 8
+
+# light of slots without a loaded chunk (sky 15, block 0)
+UNLOADED_LIGHT = 0xF0
+
+
+class LightVolume:
+	def __init__(self, render_distance):
+		# loaded columns plus one on each side for chunks not unloaded yet
+		self.columns = 2 * render_distance + 3
+		self.layers = LAYERS
+
+		self.owners = {} # slot -> chunk_position of the chunk whose light is in it
+
+		self.texture = gl.GLuint(0)
+		gl.glGenTextures(1, self.texture)
+		gl.glBindTexture(gl.GL_TEXTURE_3D, self.texture)
+
+		gl.glTexParameteri(gl.GL_TEXTURE_3D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_NEAREST)
+		gl.glTexParameteri(gl.GL_TEXTURE_3D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_NEAREST)
+		gl.glTexParameteri(gl.GL_TEXTURE_3D, gl.GL_TEXTURE_MAX_LEVEL, 0)
+
+		width = self.columns * CHUNK_SIZE
+		height = self.layers * CHUNK_SIZE
+
+		data = np.full((width, height, width), UNLOADED_LIGHT, dtype=np.uint8)
+
+		gl.glPixelStorei(gl.GL_UNPACK_ALIGNMENT, 1)
+		gl.glTexImage3D(
+			gl.GL_TEXTURE_3D, 0, gl.GL_R8UI, width, height, width, 0,
+			gl.GL_RED_INTEGER, gl.GL_UNSIGNED_BYTE, data.ctypes.data,
+		)
+		gl.glBindTexture(gl.GL_TEXTURE_3D, 0)
+
+		self.unloaded_light = np.full(CHUNK_SIZE ** 3, UNLOADED_LIGHT, dtype=np.uint8)
+
+	def slot(self, chunk_position):
+		cx, cy, cz = chunk_position
+		return (cx % self.columns, cy % self.layers, cz % self.columns)
+
+	def upload_chunk(self, chunk):
+		"""Copy the light map of a chunk to its slot, the chunk takes the slot over from any chunk still in it."""
+		slot = self.slot(chunk.chunk_position)
+		self.owners[slot] = chunk.chunk_position
+		self.write_slot(slot, np.frombuffer(chunk.light_map, dtype=np.uint8))
+
+	def update_chunk(self, chunk):
+		# light changed, only if the chunk owns its slot (a chunk about to unload may have lost it)
+		slot = self.slot(chunk.chunk_position)
+
+		if self.owners.get(slot) == chunk.chunk_position:
+			self.write_slot(slot, np.frombuffer(chunk.light_map, dtype=np.uint8))
+
+	def release(self, chunk_position):
+		slot = self.slot(chunk_position)
+
+		if self.owners.get(slot) == chunk_position:
+			del self.owners[slot]
+			self.write_slot(slot, self.unloaded_light)
+
+	def write_slot(self, slot, light):
+		sx, sy, sz = slot
+
+		gl.glBindTexture(gl.GL_TEXTURE_3D, self.texture)
+		gl.glPixelStorei(gl.GL_UNPACK_ALIGNMENT, 1)
+		gl.glTexSubImage3D(
+			gl.GL_TEXTURE_3D, 0, sz * CHUNK_SIZE, sy * CHUNK_SIZE, sx * CHUNK_SIZE,
+			CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE, gl.GL_RED_INTEGER, gl.GL_UNSIGNED_BYTE, light.ctypes.data,
+		)
+		gl.glBindTexture(gl.GL_TEXTURE_3D, 0)
+
+	def bind(self):
+		gl.glActiveTexture(gl.GL_TEXTURE0 + LIGHT_TEXTURE_UNIT)
+		gl.glBindTexture(gl.GL_TEXTURE_3D, self.texture)
+		gl.glActiveTexture(gl.GL_TEXTURE0)
+
+	def delete(self):
+		gl.glDeleteTextures(1, self.texture)
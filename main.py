@@ -1,6 +1,8 @@
 import ctypes
 import math
+import multiprocessing
 import random
+import numpy as np
 import pyglet
 
 pyglet.options["shadow_window"] = False
@@ -15,6 +17,8 @@ import matrix
 
 import chunk
 import world
+import vertex_arena
+import light_volume
 import collider
 
 import hit
@@ -31,6 +35,9 @@ import os
 import pyglet.media as media
 import item_model
 
+# fraction of the sky light left at midnight
+NIGHT_SKY_BRIGHTNESS = 0.2
+
 class SoundManager:
 	def __init__(self):
 		self.sounds = {}
@@ -122,6 +129,18 @@ class Window(pyglet.window.Window):
 		self.shader_sampler_location = self.shader.find_uniform(b"texture_array_sampler")
 		self.shader_alpha_factor_location = self.shader.find_uniform(b"alpha_factor")
 		self.shader.use()
+
+		# Chunk shader (decodes the packed chunk vertex format, light comes from the world's light volume)
+		self.chunk_shader = shader.Shader("chunk_vert.glsl", "chunk_frag.glsl")
+		self.chunk_shader_matrix_location = self.chunk_shader.find_uniform(b"matrix")
+		self.chunk_shader_sampler_location = self.chunk_shader.find_uniform(b"texture_array_sampler")
+		self.chunk_shader_alpha_factor_location = self.chunk_shader.find_uniform(b"alpha_factor")
+		self.chunk_shader_origins_location = self.chunk_shader.find_uniform(b"chunk_origins")
+		self.chunk_shader_light_location = self.chunk_shader.find_uniform(b"light_volume")
+		self.chunk_shader_sky_brightness_location = self.chunk_shader.find_uniform(b"sky_brightness")
+
+		# Day/night cycle, fraction of a day (0 sunrise, 0.25 noon, 0.5 sunset), only a shader uniform changes with it
+		self.time_of_day = 0.1
 		
 		# Overlay shader
 		self.overlay_shader = shader.Shader("overlay_vert.glsl", "overlay_frag.glsl")
@@ -303,8 +322,8 @@ class Window(pyglet.window.Window):
 		self.world.save.save_player(self.player)
 		
 		# Save Mobs (Active + Persistent)
-		# Create a snapshot of all mobs
-		all_mobs = self.world.persistent_mobs.copy()
+		# Create a snapshot of all mobs (own lists, it is pickled later on the save thread)
+		all_mobs = {cpos: list(mobs) for cpos, mobs in self.world.persistent_mobs.items()}
 		
 		# Add active mobs to the snapshot
 		for m in self.mobs:
@@ -322,7 +341,18 @@ class Window(pyglet.window.Window):
 			
 		self.world.save.save_mobs(all_mobs)
 
+	def sky_brightness(self):
+		# how much of the sky light reaches the blocks, by the height of the sun, never below moonlight
+		if not self.world.settings.day_length:
+			return 1.0
+
+		sun_height = math.sin(self.time_of_day * 2 * math.pi)
+		return min(1.0, max(NIGHT_SKY_BRIGHTNESS, 0.5 + sun_height * 2.5))
+
 	def update(self, delta_time):
+		if self.world.settings.day_length:
+			self.time_of_day = (self.time_of_day + delta_time / self.world.settings.day_length) % 1.0
+
 		# Process Spawn Queue from World
 		if hasattr(self.world, 'spawn_queue'):
 			while self.world.spawn_queue:
@@ -1164,11 +1194,7 @@ class Window(pyglet.window.Window):
 		# Use mob shader for arm (it uses 2D texture)
 		self.steve.shader.use()
 		
-		flat_mvp = []
-		for i in range(4):
-			for j in range(4):
-				flat_mvp.append(mvp.data[i][j])
-		gl.glUniformMatrix4fv(self.steve.matrix_loc, 1, gl.GL_FALSE, (gl.GLfloat * 16)(*flat_mvp))
+		gl.glUniformMatrix4fv(self.steve.matrix_loc, 1, gl.GL_FALSE, mvp.pointer)
 		
 		gl.glActiveTexture(gl.GL_TEXTURE0)
 		gl.glBindTexture(gl.GL_TEXTURE_2D, self.empty_hand_texture.id)
@@ -1186,6 +1212,19 @@ class Window(pyglet.window.Window):
 
 	# input functions
 
+	def on_close(self):
+		if self.world.mesh_pool:
+			self.world.mesh_pool.shutdown()
+
+		if self.world.chunk_loader:
+			self.world.chunk_loader.shutdown()
+
+		# the save thread writes what is left, close waits for it
+		self.auto_save(0)
+		self.world.save.close()
+
+		super().on_close()
+
 	def on_resize(self, width, height):
 		print(f"Resize {width} * {height}")
 		gl.glViewport(0, 0, width, height)
@@ -1728,9 +1767,9 @@ class Window(pyglet.window.Window):
 	def on_draw(self):
 		self.player.update_matrices()
 		
-		# Frustum Culling Update
-		# Changed to simpler CamPos + Rotation logic for reliability
-		self.world.frustum.update(self.player.position, self.player.rotation)
+		# Frustum and cave culling update, from the matrix everything is drawn with
+		eye_position = (self.player.position[0], self.player.position[1] + self.player.eyelevel, self.player.position[2])
+		self.world.update_frustum(self.player.mvp_matrix, eye_position)
 		
 		# Calculate submersion once
 		submersion = self.player.submersion_factor
@@ -1745,13 +1784,15 @@ class Window(pyglet.window.Window):
 		gl.glEnable(gl.GL_DEPTH_TEST)
 		gl.glEnable(gl.GL_CULL_FACE)
 		
+		sky_brightness = self.sky_brightness()
+
 		# Dynamic Clear Color based on submersion
 		if submersion > 0:
 			# Lerp between Sky Color (0.5, 0.69, 1.0) and Water Color (0.1, 0.2, 0.5)
 			# But if we want simple tinting, just Lerp
 			# Let's say max underwater effect is at submersion=1.0
 			
-			sky_r, sky_g, sky_b = 0.5, 0.69, 1.0
+			sky_r, sky_g, sky_b = 0.5 * sky_brightness, 0.69 * sky_brightness, 1.0 * sky_brightness
 			water_r, water_g, water_b = 0.1, 0.2, 0.5
 			
 			r = sky_r * (1.0 - submersion) + water_r * submersion
@@ -1760,17 +1801,26 @@ class Window(pyglet.window.Window):
 			
 			gl.glClearColor(r, g, b, 1.0)
 		else:
-			gl.glClearColor(0.5, 0.69, 1.0, 1.0)
+			gl.glClearColor(0.5 * sky_brightness, 0.69 * sky_brightness, 1.0 * sky_brightness, 1.0)
 			
 		gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
 
-		self.shader.uniform1f(self.shader_alpha_factor_location, 1.0)
+		# Chunks use their own shader for the packed vertex format
+		self.chunk_shader.use()
+		self.chunk_shader.uniform_matrix(self.chunk_shader_matrix_location, self.player.mvp_matrix)
+		gl.glUniform1i(self.chunk_shader_sampler_location, 0)
+		gl.glUniform1i(self.chunk_shader_origins_location, vertex_arena.ORIGINS_TEXTURE_UNIT)
+		gl.glUniform1i(self.chunk_shader_light_location, light_volume.LIGHT_TEXTURE_UNIT)
+		self.chunk_shader.uniform1f(self.chunk_shader_sky_brightness_location, sky_brightness)
+		self.world.light_volume.bind()
+
+		self.chunk_shader.uniform1f(self.chunk_shader_alpha_factor_location, 1.0)
 		self.world.draw('solid')
 		
 		# Draw water blocks with transparency
 		gl.glEnable(gl.GL_BLEND)
 		gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
-		self.shader.uniform1f(self.shader_alpha_factor_location, 0.65) # 0.65 is a good "lightly transparent" value
+		self.chunk_shader.uniform1f(self.chunk_shader_alpha_factor_location, 0.65) # 0.65 is a good "lightly transparent" value
 		
 		# Optional: Water usually doesn't need to cull backfaces if transparent, 
 		# but for performance and to avoid visual noise from overlapping water faces, we can keep it.
@@ -1780,21 +1830,23 @@ class Window(pyglet.window.Window):
 		gl.glEnable(gl.GL_CULL_FACE)
 		
 		gl.glDisable(gl.GL_BLEND)
+		self.shader.use()
 		self.shader.uniform1f(self.shader_alpha_factor_location, 1.0)
 		
 		# Draw Particles
-		self.particle_system.draw(self.player)
+		self.particle_system.draw(self.player, self.world.frustum)
 
 		# Draw Mobs
-		for m in self.mobs:
-			# Frustum Cull Mobs
+		if self.mobs:
+			# Frustum Cull Mobs, all at once
 			# Approx Mob Size: 0.6x1.8x0.6
-			pad = 0.5
-			if self.world.frustum.is_box_visible(
-				m.position[0] - pad, m.position[1], m.position[2] - pad,
-				m.position[0] + pad, m.position[1] + 2.0, m.position[2] + pad
-			):
-				m.draw(self.player.p_matrix, self.player.mv_matrix)
+			positions = np.array([m.position for m in self.mobs], dtype=np.float64)
+			pad = np.array([0.5, 0.0, 0.5])
+			visible = self.world.frustum.boxes_visible(positions - pad, positions + pad + (0.0, 2.0, 0.0))
+
+			for m, is_visible in zip(self.mobs, visible):
+				if is_visible:
+					m.draw(self.player.p_matrix, self.player.mv_matrix)
 			
 		# Draw Player Model (Steve) in 3rd Person
 		if self.player.camera_mode != 0:
@@ -1813,13 +1865,7 @@ class Window(pyglet.window.Window):
 			# Calculate VP Matrix (Projection * View)
 			vp_matrix = self.player.p_matrix * self.player.mv_matrix
 			
-			# Flat list for uniform
-			flat_vp = []
-			for i in range(4):
-				for j in range(4):
-					flat_vp.append(vp_matrix.data[i][j])
-			
-			gl.glUniformMatrix4fv(self.gui.icon_proj_loc, 1, gl.GL_FALSE, (gl.GLfloat * 16)(*flat_vp))
+			gl.glUniformMatrix4fv(self.gui.icon_proj_loc, 1, gl.GL_FALSE, vp_matrix.pointer)
 			gl.glUniform1i(self.gui.icon_tex_loc, 0)
 			
 			gl.glActiveTexture(gl.GL_TEXTURE0)
@@ -1828,21 +1874,16 @@ class Window(pyglet.window.Window):
 			gl.glEnable(gl.GL_DEPTH_TEST)
 			# gl.glDisable(gl.GL_CULL_FACE) # Ensure double sided rendering just in case
 			
-			for item in self.dropped_items:
-				# Frustum Cull Items
-				# Approx Size 0.5
-				if self.world.frustum.is_box_visible(
-					item.position[0] - 0.5, item.position[1] - 0.5, item.position[2] - 0.5,
-					item.position[0] + 0.5, item.position[1] + 0.5, item.position[2] + 0.5
-				):
+			# Frustum Cull Items, all at once
+			# Approx Size 0.5
+			positions = np.array([item.position for item in self.dropped_items], dtype=np.float64)
+			visible = self.world.frustum.boxes_visible(positions - 0.5, positions + 0.5)
+
+			for item, is_visible in zip(self.dropped_items, visible):
+				if is_visible:
 					# Set Model Matrix
 					m = item.get_model_matrix()
-					flat_model = []
-					for i in range(4):
-						for j in range(4):
-							flat_model.append(m.data[i][j])
-							
-					gl.glUniformMatrix4fv(self.gui.icon_model_loc, 1, gl.GL_FALSE, (gl.GLfloat * 16)(*flat_model))
+					gl.glUniformMatrix4fv(self.gui.icon_model_loc, 1, gl.GL_FALSE, m.pointer)
 					
 					# Draw Item
 					gl.glBindVertexArray(item.vao)
@@ -2018,5 +2059,6 @@ class Game:
 
 
 if __name__ == "__main__":
+	multiprocessing.freeze_support() # mesh worker processes in frozen builds
 	game = Game()
 	game.run()
@@ -1,64 +1,77 @@
-import copy
-import math
-
+"""
+4x4 matrices for the OpenGL uniforms.
 
-def copy_matrix(matrix):
-	return copy.deepcopy(matrix)  # we need to use deepcopy since we're dealing with 2D arrays
+A Matrix keeps its 16 floats in a contiguous float32 NumPy array with the layout
+GL expects: data[column][row], so data.ravel() is column major and can be passed
+to glUniformMatrix4fv as it is (pointer), without building a ctypes array per
+call. translate, rotate, scale and the other transforms change data in place,
+so the array (and the pointer to it) of a matrix stays the same for its whole
+life.
 
+multiply_batch multiplies one matrix with a stack of matrices in one NumPy call,
+e.g. a mob's view projection matrix with the local matrices of all its parts.
+"""
 
-clean_matrix = [[0.0] * 4 for _ in range(4)]
-identity_matrix = copy_matrix(clean_matrix)
+import ctypes
+import math
 
-identity_matrix[0][0] = 1.0
-identity_matrix[1][1] = 1.0
-identity_matrix[2][2] = 1.0
-identity_matrix[3][3] = 1.0
+import numpy as np
 
 
-def multiply_matrices(x_matrix, y_matrix):
-	result_matrix = copy_matrix(clean_matrix)
+def identity_data():
+	return np.identity(4, dtype=np.float32)
 
-	for i in range(4):
-		for j in range(4):
-			result_matrix[i][j] = (
-				(x_matrix[0][j] * y_matrix[i][0])
-				+ (x_matrix[1][j] * y_matrix[i][1])
-				+ (x_matrix[2][j] * y_matrix[i][2])
-				+ (x_matrix[3][j] * y_matrix[i][3])
-			)
 
-	return result_matrix
+def multiply_matrices(x_matrix, y_matrix):
+	# x * y of two data arrays, in the data[column][row] layout that is y @ x
+	return np.matmul(y_matrix, x_matrix)
 
 
 class Matrix:
 	def __init__(self, base=None):
 		if isinstance(base, Matrix):
-			self.data = copy_matrix(base.data)
-		elif isinstance(base, list):
-			self.data = copy_matrix(base)
+			self.data = base.data.copy()
+		elif base is not None:
+			self.data = np.array(base, dtype=np.float32).reshape(4, 4)
 		else:
-			self.data = copy_matrix(clean_matrix)
+			self.data = np.zeros((4, 4), dtype=np.float32)
+
+		# for glUniformMatrix4fv, stays valid as no method replaces data
+		self.pointer = self.data.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
 
 	def load_identity(self):
-		self.data = copy_matrix(identity_matrix)
+		self.data[...] = 0.0
+		np.fill_diagonal(self.data, 1.0)
 
 	def __mul__(self, matrix):
 		return Matrix(multiply_matrices(self.data, matrix.data))
 
 	def __imul__(self, matrix):
-		self.data = multiply_matrices(self.data, matrix.data)
+		self.multiply(matrix.data)
+		return self
+
+	def multiply(self, data):
+		# self = self * matrix, matrix given by its data array
+		self.data[...] = multiply_matrices(self.data, data)
+
+	def multiply_batch(self, matrices):
+		"""
+		self * m for every m of matrices, a sequence of Matrix or an (n, 4, 4) array of their data.
+		Returns an (n, 4, 4) float32 array, see batch_pointer to pass one of them to GL.
+		"""
+
+		if not isinstance(matrices, np.ndarray):
+			matrices = np.stack([matrix.data for matrix in matrices]) if len(matrices) else np.zeros((0, 4, 4))
+
+		return np.ascontiguousarray(np.matmul(matrices, self.data), dtype=np.float32)
 
 	def scale(self, x, y, z):
-		for i in range(4):
-			self.data[0][i] *= x
-		for i in range(4):
-			self.data[1][i] *= y
-		for i in range(4):
-			self.data[2][i] *= z
+		self.data[0] *= x
+		self.data[1] *= y
+		self.data[2] *= z
 
 	def translate(self, x, y, z):
-		for i in range(4):
-			self.data[3][i] = self.data[3][i] + (self.data[0][i] * x + self.data[1][i] * y + self.data[2][i] * z)
+		self.data[3] += self.data[0] * x + self.data[1] * y + self.data[2] * z
 
 	def rotate(self, angle, x, y, z):
 		magnitude = math.sqrt(x * x + y * y + z * z)
@@ -83,22 +96,14 @@ class Matrix:
 		ys = y * sin_angle
 		zs = z * sin_angle
 
-		rotation_matrix = copy_matrix(clean_matrix)
-
-		rotation_matrix[0][0] = (one_minus_cos * xx) + cos_angle
-		rotation_matrix[0][1] = (one_minus_cos * xy) - zs
-		rotation_matrix[0][2] = (one_minus_cos * zx) + ys
-
-		rotation_matrix[1][0] = (one_minus_cos * xy) + zs
-		rotation_matrix[1][1] = (one_minus_cos * yy) + cos_angle
-		rotation_matrix[1][2] = (one_minus_cos * yz) - xs
+		rotation_matrix = np.array((
+			((one_minus_cos * xx) + cos_angle, (one_minus_cos * xy) - zs, (one_minus_cos * zx) + ys, 0.0),
+			((one_minus_cos * xy) + zs, (one_minus_cos * yy) + cos_angle, (one_minus_cos * yz) - xs, 0.0),
+			((one_minus_cos * zx) - ys, (one_minus_cos * yz) + xs, (one_minus_cos * zz) + cos_angle, 0.0),
+			(0.0, 0.0, 0.0, 1.0),
+		), dtype=np.float32)
 
-		rotation_matrix[2][0] = (one_minus_cos * zx) - ys
-		rotation_matrix[2][1] = (one_minus_cos * yz) + xs
-		rotation_matrix[2][2] = (one_minus_cos * zz) + cos_angle
-
-		rotation_matrix[3][3] = 1.0
-		self.data = multiply_matrices(self.data, rotation_matrix)
+		self.multiply(rotation_matrix)
 
 	def rotate_2d(self, x, y):
 		self.rotate(x, 0, 1.0, 0)
@@ -109,7 +114,7 @@ class Matrix:
 		deltay = top - bottom
 		deltaz = far - near
 
-		frustum_matrix = copy_matrix(clean_matrix)
+		frustum_matrix = np.zeros((4, 4), dtype=np.float32)
 
 		frustum_matrix[0][0] = 2 * near / deltax
 		frustum_matrix[1][1] = 2 * near / deltay
@@ -121,7 +126,7 @@ class Matrix:
 		frustum_matrix[2][3] = -1.0
 		frustum_matrix[3][2] = -2 * near * far / deltaz
 
-		self.data = multiply_matrices(self.data, frustum_matrix)
+		self.multiply(frustum_matrix)
 
 	def perspective(self, fovy, aspect, near, far):
 		frustum_y = math.tan(math.radians(fovy) / 2)
@@ -134,7 +139,7 @@ class Matrix:
 		deltay = top - bottom
 		deltaz = far - near
 
-		orthographic_matrix = copy_matrix(identity_matrix)
+		orthographic_matrix = identity_data()
 
 		orthographic_matrix[0][0] = 2.0 / deltax
 		orthographic_matrix[3][0] = -(right + left) / deltax
@@ -145,4 +150,9 @@ class Matrix:
 		orthographic_matrix[2][2] = 2.0 / deltax
 		orthographic_matrix[3][2] = -(near + far) / deltaz
 
-		self.data = multiply_matrices(self.data, orthographic_matrix)
+		self.multiply(orthographic_matrix)
+
+
+def batch_pointer(matrices, index):
+	# pointer to one matrix of a multiply_batch result, for glUniformMatrix4fv
+	return matrices[index].ctypes.data_as(ctypes.POINTER(ctypes.c_float))
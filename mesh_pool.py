@@ -0,0 +1,168 @@
+"""
+Chunk meshing in a pool of worker processes.
+
+The main thread only takes a snapshot of each chunk (its blocks and water
+levels plus a one block halo of its neighbours, see mesher.gather_subchunk),
+the workers run mesher.build_mesh on it and send back the packed vertex and
+index buffers (and the face visibility for cave culling), which the main
+thread then uploads to the GPU.
+
+Jobs are started nearest first, are cancelled when their chunk unloads, and
+their result is dropped if the chunk was remeshed on the main thread (after an
+edit) since its snapshot was taken.
+"""
+
+import heapq
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import mesher
+import subchunk
+
+# lookup tables of the worker process, sent once when it starts
+_tables = None
+
+
+def _init_worker(tables):
+	global _tables
+	_tables = tables
+
+
+def _build_chunk_mesh(snapshots, mesh_origin, greedy):
+	# runs in a worker, snapshots are (subchunk_position, origin, blocks, water_levels)
+	return [
+		(
+			subchunk_position,
+			mesher.build_mesh(_tables, blocks, water_levels, origin, mesh_origin, greedy=greedy),
+			mesher.face_visibility(_tables, blocks[1:-1, 1:-1, 1:-1]),
+		)
+		for subchunk_position, origin, blocks, water_levels in snapshots
+	]
+
+
+class MeshPool:
+	def __init__(self, world, workers):
+		self.world = world
+
+		# spawn rather than fork, the main process holds a GL context
+		self.executor = ProcessPoolExecutor(
+			workers,
+			mp_context=multiprocessing.get_context("spawn"),
+			initializer=_init_worker,
+			initargs=(world.mesh_tables,),
+		)
+
+		# keep every worker busy while the main thread uploads the previous results
+		self.max_in_flight = workers * 2
+
+		self.pending = [] # heap of (priority, sequence, chunk_position)
+		self.pending_priority = {} # chunk_position -> priority of its live heap entry, other entries are stale
+		self.sequence = 0
+
+		self.in_flight = {} # chunk_position -> (future, chunk, mesh_version, water_mesh_version)
+
+	def submit(self, chunk_position, priority):
+		"""Schedule a chunk to be meshed, lower priority first. The snapshot is only taken when the job starts."""
+		if self.pending_priority.get(chunk_position, priority + 1) <= priority:
+			return
+
+		self.pending_priority[chunk_position] = priority
+		heapq.heappush(self.pending, (priority, self.sequence, chunk_position))
+		self.sequence += 1
+
+	def reprioritize(self, get_priority):
+		# recompute the priority of every pending job, e.g. when the player moved to another chunk
+		self.pending_priority = {chunk_position: get_priority(chunk_position) for chunk_position in self.pending_priority}
+		self.pending = [(priority, i, chunk_position) for i, (chunk_position, priority) in enumerate(self.pending_priority.items())]
+		heapq.heapify(self.pending)
+		self.sequence = len(self.pending)
+
+	def cancel(self, chunk_position):
+		# the chunk is being unloaded
+		self.pending_priority.pop(chunk_position, None)
+
+		if chunk_position in self.in_flight:
+			future = self.in_flight.pop(chunk_position)[0]
+			future.cancel()
+
+	def update(self, time_budget):
+		"""Upload finished meshes (at least one, then within time_budget seconds), then start new jobs."""
+		start_time = time.perf_counter()
+		applied = 0
+
+		for chunk_position, (future, chunk, version, water_version) in list(self.in_flight.items()):
+			if applied and time.perf_counter() - start_time > time_budget:
+				break
+
+			if not future.done():
+				continue
+
+			del self.in_flight[chunk_position]
+
+			# dropped if the chunk was unloaded (and maybe loaded again) or remeshed since the snapshot
+			if self.world.chunks.get(chunk_position) is not chunk or chunk.mesh_version != version:
+				continue
+
+			try:
+				meshes = future.result()
+			except Exception as e:
+				print(f"Mesh worker failed for chunk {chunk_position}: {e}")
+				chunk.update_subchunk_meshes()
+				chunk.update_mesh()
+				applied += 1
+				continue
+
+			# water remeshed since the snapshot (a water tick), only the solid meshes are still current
+			water_current = chunk.water_mesh_version == water_version
+
+			for subchunk_position, (solid, water), visibility in meshes:
+				mesher.apply_subchunk_mesh(chunk.subchunks[subchunk_position], solid, water if water_current else None)
+				mesher.apply_subchunk_visibility(chunk.subchunks[subchunk_position], visibility)
+
+			chunk.update_mesh()
+			applied += 1
+
+		# chunks which already have a job running wait for it, their new snapshot would be taken too early
+		waiting = []
+
+		while self.pending and len(self.in_flight) < self.max_in_flight:
+			entry = heapq.heappop(self.pending)
+			priority, _, chunk_position = entry
+
+			if self.pending_priority.get(chunk_position) != priority:
+				continue
+
+			if chunk_position in self.in_flight:
+				waiting.append(entry)
+				continue
+
+			del self.pending_priority[chunk_position]
+			self.start(chunk_position)
+
+		for entry in waiting:
+			heapq.heappush(self.pending, entry)
+
+	def start(self, chunk_position):
+		chunk = self.world.chunks.get(chunk_position)
+
+		if chunk is None:
+			return
+
+		# nothing to send to a worker, the empty meshes are set right away
+		if not chunk.has_geometry():
+			chunk.update_subchunk_meshes()
+			chunk.update_mesh()
+			return
+
+		shape = (subchunk.SUBCHUNK_WIDTH, subchunk.SUBCHUNK_HEIGHT, subchunk.SUBCHUNK_LENGTH)
+		snapshots = [
+			(subchunk_position, child.position) + mesher.gather_subchunk(child, shape)
+			for subchunk_position, child in chunk.subchunks.items()
+		]
+
+		future = self.executor.submit(_build_chunk_mesh, snapshots, chunk.position, self.world.settings.greedy_meshing)
+		self.in_flight[chunk_position] = (future, chunk, chunk.mesh_version, chunk.water_mesh_version)
+
+	def shutdown(self):
+		self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,597 @@
+"""
+Vectorized (NumPy) face-culling mesher.
+
+Builds exactly the same mesh as the Python loop in Subchunk.update_mesh_python,
+but works on a whole subchunk at once: the subchunk is copied into a volume
+padded by one block on every side, visible faces are found by comparing the
+volume against itself shifted in each face direction, and the quads are
+gathered from per-block-type vertex templates.
+
+Optionally (greedy), coplanar neighbouring faces of full opaque cubes that share
+a texture layer are merged into bigger quads whose UVs repeat the texture once
+per block.
+
+Meshes hold no light: each face only says where its light is read from (see
+light_volume.py), so they depend on the blocks alone and light changes never
+need a remesh.
+
+Meshes are emitted in the packed chunk vertex format (see pack_vertices and
+chunk_vert.glsl): two uint32 per vertex instead of 7 floats.
+
+The core (build_mesh) only takes plain arrays, gathering them from the world is
+done by the helpers below it.
+"""
+
+import numpy as np
+
+import models.cube
+
+# matches chunk.CHUNK_WIDTH / CHUNK_HEIGHT / CHUNK_LENGTH (world.get_chunk_position uses >> 4)
+CHUNK_SIZE = 16
+
+WATER_IDS = (8, 9)
+
+# Right, Left, Top, Bottom, Front, Back (same order as the model face lists)
+FACE_DIRECTIONS = (
+	(1, 0, 0),
+	(-1, 0, 0),
+	(0, 1, 0),
+	(0, -1, 0),
+	(0, 0, 1),
+	(0, 0, -1),
+)
+
+QUAD_INDICES = np.array([0, 1, 2, 0, 2, 3], dtype=np.int64)
+
+# packed chunk vertex format, two uint32 per vertex (decoded in chunk_vert.glsl):
+#   word 0: x (11 bits, 1/64 block) | y (10 bits, 1/32 block) | z (11 bits, 1/64 block)
+#   word 1: u (9 bits, 1/16) | v (9 bits, 1/16) | texture layer (8 bits) | light face (4 bits) | shade (2 bits)
+# positions are relative to the chunk origin plus one block, so that slightly overhanging models stay positive.
+# x and z are finer than y for the diagonal quads of x-shaped models (at +-0.3536), which 1/16 moved by 0.02 blocks
+# shade encodes the model face shading values 0.4, 0.6, 0.8 and 1.0 as 0 to 3
+# light face is where the shader samples the light: 0 for the block itself, face + 1 for the neighbour the face looks at
+
+POSITION_SCALE = (64, 32, 64)
+POSITION_BITS = (11, 10, 11)
+UV_SCALE = 16
+UV_BITS = 9
+
+# face_visibility of a subchunk without any opaque block, every face sees every face
+ALL_FACES_VISIBLE = (1 << 36) - 1
+
+# neighbours averaged into each corner of a water top face, as (dx, dz)
+WATER_CORNERS = (
+	((1, 0), (0, 1), (1, 1)),
+	((1, 0), (0, -1), (1, -1)),
+	((-1, 0), (0, -1), (-1, -1)),
+	((-1, 0), (0, 1), (-1, 1)),
+)
+
+
+class MeshTables:
+	"""Per block type lookup tables, indexed by block number."""
+
+	def __init__(self, block_types):
+		count = len(block_types)
+
+		self.max_faces = max([len(bt.vertex_positions) for bt in block_types if bt] + [len(FACE_DIRECTIONS)])
+
+		# a neighbour hides a cube face if it is solid (inside the chunk, unknown numbers count as solid)
+		self.occludes = np.zeros(count, dtype=bool)
+		# same test as world.is_opaque_block, used for neighbours outside the chunk
+		self.opaque = np.zeros(count, dtype=bool)
+
+		self.glass = np.zeros(count, dtype=bool)
+		self.is_cube = np.zeros(count, dtype=bool)
+		self.is_water = np.zeros(count, dtype=bool)
+		self.face_count = np.zeros(count, dtype=np.int64)
+
+		self.vertex_positions = np.zeros((count, self.max_faces, 12), dtype=np.float64)
+		self.tex_coords = np.zeros((count, self.max_faces, 12), dtype=np.float64)
+		self.shading_values = np.zeros((count, self.max_faces, 4), dtype=np.float64)
+
+		for number, bt in enumerate(block_types):
+			if number in WATER_IDS:
+				self.is_water[number] = True
+
+			if not bt:
+				self.occludes[number] = number != 0
+				continue
+
+			self.occludes[number] = not bt.transparent
+			self.opaque[number] = not bt.transparent
+			self.glass[number] = bt.glass
+			self.is_cube[number] = bt.is_cube
+
+			faces = len(bt.vertex_positions)
+			self.face_count[number] = faces
+
+			for face in range(faces):
+				self.vertex_positions[number, face] = bt.vertex_positions[face]
+				self.tex_coords[number, face] = bt.tex_coords[face]
+				self.shading_values[number, face] = bt.shading_values[face]
+
+		# which face slots a non-cube model fills
+		self.face_slots = np.arange(self.max_faces)[None, :] < self.face_count[:, None]
+
+		# greedy meshing: only full opaque cubes with the standard cube geometry & UV layout are merged,
+		# faces merge if they have the same greedy key (texture layer and shading)
+
+		cube_positions = np.array(models.cube.vertex_positions, dtype=np.float64)
+		cube_uvs = np.array(models.cube.tex_coords, dtype=np.float64).reshape(6, 4, 3)[:, :, :2]
+
+		self.greedy = np.zeros(count, dtype=bool)
+		self.greedy_key = np.zeros((count, len(FACE_DIRECTIONS)), dtype=np.int64)
+
+		keys = {}
+
+		for number, bt in enumerate(block_types):
+			if not bt or not bt.is_cube or bt.transparent or bt.glass or self.is_water[number]:
+				continue
+
+			faces = len(FACE_DIRECTIONS)
+			uvs = self.tex_coords[number, :faces].reshape(faces, 4, 3)
+
+			if not np.array_equal(self.vertex_positions[number, :faces], cube_positions):
+				continue
+			if not np.array_equal(uvs[:, :, :2], cube_uvs):
+				continue
+
+			self.greedy[number] = True
+
+			for face in range(faces):
+				key = (uvs[face, 0, 2], tuple(self.shading_values[number, face]))
+				self.greedy_key[number, face] = keys.setdefault(key, len(keys))
+
+		# axis the u and v tex coords run along for each face of the cube model
+		self.u_axis, self.v_axis = uv_axes(cube_positions.reshape(6, 4, 3), cube_uvs)
+
+
+def uv_axes(positions, uvs):
+	u_axes = []
+	v_axes = []
+
+	for face in range(len(positions)):
+		for uv, axes in ((0, u_axes), (1, v_axes)):
+			# the axis along which the position changes between the two vertices where only this coordinate changes
+			for i in range(4):
+				for j in range(4):
+					if uvs[face, i, uv] != uvs[face, j, uv] and uvs[face, i, 1 - uv] == uvs[face, j, 1 - uv]:
+						delta = positions[face, i] - positions[face, j]
+						axes.append(int(np.argmax(np.abs(delta))))
+						break
+				else:
+					continue
+				break
+
+	return u_axes, v_axes
+
+
+def water_height(levels):
+	# vectorized version of the "max(0.1, 1.0 - (level / 5.0) ** 1.5) if level else 1.0" used everywhere for water
+	levels = np.asarray(levels, dtype=np.float64)
+	return np.where(levels != 0, np.maximum(0.1, 1.0 - (levels / 5.0) ** 1.5), 1.0)
+
+
+def build_mesh(tables, blocks, water_levels, origin, mesh_origin, update_only_water=False, greedy=False):
+	"""
+	blocks and water_levels are padded volumes (one extra block on every side) indexed [x, y, z],
+	water_levels holds the metadata water level of water blocks.
+	origin is the global position of the first non-padding block, mesh_origin the position vertices are relative to.
+
+	Returns (solid, water) where each is a (vertex_data, indices) pair of uint32 arrays,
+	solid is None when update_only_water is set.
+	"""
+
+	center = blocks[1:-1, 1:-1, 1:-1]
+	size_x, size_y, size_z = center.shape
+
+	# neighbours in the padded border use the world.is_opaque_block test, the rest the in-chunk test
+	occluders = tables.opaque[blocks]
+	occluders[1:-1, 1:-1, 1:-1] = tables.occludes[center]
+
+	is_cube = tables.is_cube[center]
+	is_glass = tables.glass[center]
+
+	emit = np.zeros(center.shape + (tables.max_faces,), dtype=bool)
+	face_light = np.zeros(center.shape + (tables.max_faces,), dtype=np.int64)
+
+	for face, (dx, dy, dz) in enumerate(FACE_DIRECTIONS):
+		shifted = (
+			slice(1 + dx, 1 + dx + size_x),
+			slice(1 + dy, 1 + dy + size_y),
+			slice(1 + dz, 1 + dz + size_z),
+		)
+
+		neighbours = blocks[shifted]
+		hidden = occluders[shifted] | (is_glass & (neighbours == center))
+
+		emit[..., face] = is_cube & ~hidden
+		face_light[..., face] = face + 1
+
+	# non-cube models emit all of their faces, lit by the block itself
+	non_cube = (center != 0) & ~is_cube
+	emit[non_cube] = tables.face_slots[center[non_cube]]
+	face_light[non_cube] = 0
+
+	is_water = tables.is_water[center][..., None]
+
+	solid = None
+	if not update_only_water:
+		solid_emit = emit & ~is_water
+		quads = []
+
+		if greedy:
+			faces = len(FACE_DIRECTIONS)
+			mergeable = solid_emit[..., :faces] & tables.greedy[center][..., None]
+			solid_emit[..., :faces] &= ~mergeable
+			quads.append(merge_faces(tables, center, mergeable, face_light, origin))
+
+		solid = pack_faces([emit_faces(tables, center, solid_emit, face_light, origin)] + quads, mesh_origin)
+
+	water = pack_faces([emit_faces(tables, center, emit & is_water, face_light, origin, blocks, water_levels)], mesh_origin)
+
+	return solid, water
+
+
+def face_visibility(tables, blocks):
+	"""
+	Which faces of a subchunk see each other through its blocks which aren't opaque, for cave culling
+	(see cave_culling.py). blocks is the subchunk's own (unpadded) volume indexed [x, y, z].
+
+	Returns a mask with bit a * 6 + b set when faces a and b (FACE_DIRECTIONS order) are joined by a path of
+	open blocks. Every open block keeps one bit per face it can be reached from, grown a step at a time.
+	"""
+
+	open_cells = ~tables.occludes[blocks]
+
+	if open_cells.all():
+		return ALL_FACES_VISIBLE
+
+	if not open_cells.any():
+		return 0
+
+	faces = len(FACE_DIRECTIONS)
+	borders = face_borders(blocks.shape)
+
+	reach = np.zeros(blocks.shape, dtype=np.uint8)
+	for face, border in enumerate(borders):
+		reach[border] |= open_cells[border].astype(np.uint8) << face
+
+	open_mask = np.where(open_cells, 0xFF, 0).astype(np.uint8)
+
+	while True:
+		grown = reach.copy()
+		grown[1:] |= reach[:-1]
+		grown[:-1] |= reach[1:]
+		grown[:, 1:] |= reach[:, :-1]
+		grown[:, :-1] |= reach[:, 1:]
+		grown[:, :, 1:] |= reach[:, :, :-1]
+		grown[:, :, :-1] |= reach[:, :, 1:]
+		grown &= open_mask
+
+		if np.array_equal(grown, reach):
+			break
+
+		reach = grown
+
+	visibility = 0
+	for face, border in enumerate(borders):
+		seen = int(np.bitwise_or.reduce(reach[border], axis=None))
+
+		for other in range(faces):
+			if seen >> other & 1:
+				visibility |= 1 << (face * faces + other)
+
+	return visibility
+
+
+def face_borders(shape):
+	# the layer of blocks along each face of a volume, in FACE_DIRECTIONS order
+	every = slice(None)
+	return [
+		tuple(every if d == 0 else (shape[axis] - 1 if d > 0 else 0) for axis, d in enumerate(direction))
+		for direction in FACE_DIRECTIONS
+	]
+
+
+def pack_faces(parts, mesh_origin):
+	# concatenate (positions, tex coords, shading values, light faces) parts of whole faces and index them as quads
+	positions = np.concatenate([part[0] for part in parts]).reshape(-1, 3)
+	tex_coords = np.concatenate([part[1] for part in parts]).reshape(-1, 3)
+	shading_values = np.concatenate([part[2] for part in parts]).ravel()
+	light_faces = np.repeat(np.concatenate([part[3] for part in parts]), 4)
+
+	vertex_data = pack_vertices(positions, tex_coords, shading_values, light_faces, mesh_origin)
+
+	indices = ((np.arange(len(positions) // 4, dtype=np.uint32) * 4)[:, None] + QUAD_INDICES.astype(np.uint32)).ravel()
+
+	return vertex_data, indices
+
+
+def pack_vertices(positions, tex_coords, shading_values, light_faces, mesh_origin):
+	"""
+	Pack per-vertex streams into the chunk vertex format, returns an (n, 2) uint32 array.
+	positions & tex_coords are (n, 3) (or flat lists of 3n floats), shading_values & light_faces have n values.
+	"""
+
+	positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+	tex_coords = np.asarray(tex_coords, dtype=np.float64).reshape(-1, 3)
+	shading_values = np.asarray(shading_values, dtype=np.float64)
+	light_faces = np.asarray(light_faces, dtype=np.int64)
+
+	vertex_data = np.zeros((len(positions), 2), dtype=np.uint32)
+
+	shift = 0
+	for axis in range(3):
+		value = np.rint((positions[:, axis] - mesh_origin[axis] + 1) * POSITION_SCALE[axis]).astype(np.int64)
+		vertex_data[:, 0] |= (np.clip(value, 0, (1 << POSITION_BITS[axis]) - 1) << shift).astype(np.uint32)
+		shift += POSITION_BITS[axis]
+
+	uv = np.clip(np.rint(tex_coords[:, :2] * UV_SCALE).astype(np.int64), 0, (1 << UV_BITS) - 1)
+	layer = tex_coords[:, 2].astype(np.int64) & 0xFF
+	shade = np.clip(np.rint(shading_values * 5).astype(np.int64) - 2, 0, 3)
+
+	vertex_data[:, 1] = (
+		uv[:, 0] | (uv[:, 1] << UV_BITS) | (layer << (2 * UV_BITS)) | ((light_faces & 0xF) << 26) | (shade << 30)
+	).astype(np.uint32)
+
+	return vertex_data
+
+
+def empty_mesh():
+	return np.zeros((0, 2), dtype=np.uint32), np.zeros(0, dtype=np.uint32)
+
+
+def emit_faces(tables, center, emit, face_light, origin, blocks=None, water_levels=None):
+	# np.nonzero walks x, y, z, face in C order, which is exactly the order the Python mesher adds faces in
+	xs, ys, zs, faces = np.nonzero(emit)
+	numbers = center[xs, ys, zs]
+	count = len(numbers)
+
+	positions = tables.vertex_positions[numbers, faces].reshape(count, 4, 3)
+
+	if water_levels is not None and count:
+		apply_water_heights(tables, positions, xs, ys, zs, faces, blocks, water_levels)
+
+	ox, oy, oz = origin
+	positions[:, :, 0] += (xs + ox)[:, None]
+	positions[:, :, 1] += (ys + oy)[:, None]
+	positions[:, :, 2] += (zs + oz)[:, None]
+
+	tex_coords = tables.tex_coords[numbers, faces]
+	shading_values = tables.shading_values[numbers, faces]
+
+	return positions.reshape(count, 12), tex_coords, shading_values, face_light[xs, ys, zs, faces]
+
+
+def merge_faces(tables, center, mergeable, face_light, origin):
+	"""
+	Greedy meshing: for each face direction, runs of equal faces along one in-plane axis are found first,
+	then runs with the same start and length on consecutive rows are merged into a single quad.
+	"""
+
+	all_positions = []
+	all_tex_coords = []
+	all_shading_values = []
+	all_light_faces = []
+
+	for face, direction in enumerate(FACE_DIRECTIONS):
+		mask = mergeable[..., face]
+
+		if not mask.any():
+			continue
+
+		normal_axis = direction.index(next(d for d in direction if d))
+		axis_b, axis_a = [axis for axis in range(3) if axis != normal_axis]
+
+		keys = np.where(mask, tables.greedy_key[center, face] + 1, 0)
+		keys = keys.transpose(normal_axis, axis_b, axis_a)
+
+		# runs along axis a
+
+		previous = np.zeros_like(keys)
+		previous[..., 1:] = keys[..., :-1]
+		following = np.zeros_like(keys)
+		following[..., :-1] = keys[..., 1:]
+
+		slices, rows, starts = np.nonzero((keys != 0) & (keys != previous))
+		ends = np.nonzero((keys != 0) & (keys != following))[2]
+
+		widths = ends - starts + 1
+		run_keys = keys[slices, rows, starts]
+
+		# merge runs with the same slice, start, width and key on consecutive rows
+
+		order = np.lexsort((rows, run_keys, widths, starts, slices))
+		slices, rows, starts, widths, run_keys = slices[order], rows[order], starts[order], widths[order], run_keys[order]
+
+		new_quad = np.ones(len(order), dtype=bool)
+		new_quad[1:] = (
+			(slices[1:] != slices[:-1])
+			| (starts[1:] != starts[:-1])
+			| (widths[1:] != widths[:-1])
+			| (run_keys[1:] != run_keys[:-1])
+			| (rows[1:] != rows[:-1] + 1)
+		)
+
+		first = np.nonzero(new_quad)[0]
+		heights = np.diff(np.append(first, len(order)))
+
+		slices, rows, starts, widths = slices[first], rows[first], starts[first], widths[first]
+
+		cells = np.zeros((len(first), 3), dtype=np.int64)
+		cells[:, normal_axis] = slices
+		cells[:, axis_b] = rows
+		cells[:, axis_a] = starts
+
+		numbers = center[cells[:, 0], cells[:, 1], cells[:, 2]]
+		light = face_light[cells[:, 0], cells[:, 1], cells[:, 2], face]
+
+		# stretch the template face of the first block over the whole quad
+
+		positions = tables.vertex_positions[numbers, face].reshape(-1, 4, 3)
+		positions[:, :, axis_a] += (positions[:, :, axis_a] > 0) * (widths - 1)[:, None]
+		positions[:, :, axis_b] += (positions[:, :, axis_b] > 0) * (heights - 1)[:, None]
+		positions += (cells + origin)[:, None, :]
+
+		extents = {axis_a: widths, axis_b: heights}
+
+		tex_coords = tables.tex_coords[numbers, face].reshape(-1, 4, 3)
+		tex_coords[:, :, 0] *= extents[tables.u_axis[face]][:, None]
+		tex_coords[:, :, 1] *= extents[tables.v_axis[face]][:, None]
+
+		all_positions.append(positions.reshape(-1, 12))
+		all_tex_coords.append(tex_coords.reshape(-1, 12))
+		all_shading_values.append(tables.shading_values[numbers, face])
+		all_light_faces.append(light)
+
+	if not all_positions:
+		return np.zeros((0, 12)), np.zeros((0, 12)), np.zeros((0, 4)), np.zeros(0, dtype=np.int64)
+
+	return (
+		np.concatenate(all_positions),
+		np.concatenate(all_tex_coords),
+		np.concatenate(all_shading_values),
+		np.concatenate(all_light_faces),
+	)
+
+
+def apply_water_heights(tables, positions, xs, ys, zs, faces, blocks, water_levels):
+	# lower the y coordinates of water faces according to their level (in place, before translation)
+	px, py, pz = xs + 1, ys + 1, zs + 1
+
+	own_height = water_height(water_levels[px, py, pz])
+
+	top = faces == 2
+	side = ~top
+
+	positions[side, :, 1] = (positions[side, :, 1] + 0.5) * own_height[side][:, None] - 0.5
+
+	if not top.any():
+		return
+
+	tx, ty, tz = px[top], py[top], pz[top]
+
+	for corner, neighbours in enumerate(WATER_CORNERS):
+		height_sum = own_height[top]
+		count = np.ones(len(tx), dtype=np.int64)
+
+		for dx, dz in neighbours:
+			is_water = tables.is_water[blocks[tx + dx, ty, tz + dz]]
+			height_sum = height_sum + np.where(is_water, water_height(water_levels[tx + dx, ty, tz + dz]), 0.0)
+			count += is_water
+
+		positions[top, corner, 1] = (positions[top, corner, 1] + 0.5) * (height_sum / count) - 0.5
+
+
+# gathering volumes from the world
+
+
+def gather_volume(world, position, shape, read, fill, dtype):
+	"""
+	Copy the box of the given global position and shape out of the loaded chunks.
+	read(chunk, x_slice, y_slice, z_slice) returns the chunk-local part of the box, unloaded parts are set to fill.
+	"""
+
+	volume = np.full(shape, fill, dtype=dtype)
+
+	x0, y0, z0 = position
+	x1, y1, z1 = x0 + shape[0], y0 + shape[1], z0 + shape[2]
+
+	for cx in range(x0 // CHUNK_SIZE, (x1 - 1) // CHUNK_SIZE + 1):
+		for cy in range(y0 // CHUNK_SIZE, (y1 - 1) // CHUNK_SIZE + 1):
+			for cz in range(z0 // CHUNK_SIZE, (z1 - 1) // CHUNK_SIZE + 1):
+				chunk = world.chunks.get((cx, cy, cz))
+
+				if chunk is None:
+					continue
+
+				bx, by, bz = cx * CHUNK_SIZE, cy * CHUNK_SIZE, cz * CHUNK_SIZE
+
+				lx0, lx1 = max(x0, bx) - bx, min(x1, bx + CHUNK_SIZE) - bx
+				ly0, ly1 = max(y0, by) - by, min(y1, by + CHUNK_SIZE) - by
+				lz0, lz1 = max(z0, bz) - bz, min(z1, bz + CHUNK_SIZE) - bz
+
+				volume[
+					bx + lx0 - x0 : bx + lx1 - x0,
+					by + ly0 - y0 : by + ly1 - y0,
+					bz + lz0 - z0 : bz + lz1 - z0,
+				] = read(chunk, slice(lx0, lx1), slice(ly0, ly1), slice(lz0, lz1))
+
+	return volume
+
+
+def read_blocks(chunk, xs, ys, zs):
+	return chunk.blocks_array()[xs, ys, zs]
+
+
+def gather_water_levels(world, blocks, position):
+	# water levels of the water blocks in a gathered volume
+	levels = np.zeros(blocks.shape, dtype=np.int64)
+	get_water_level = world.block_metadata.get_water_level
+
+	x0, y0, z0 = position
+
+	for x, y, z in zip(*np.nonzero(np.isin(blocks, WATER_IDS))):
+		levels[x, y, z] = get_water_level((x0 + int(x), y0 + int(y), z0 + int(z)))
+
+	return levels
+
+
+def gather_subchunk(subchunk, shape):
+	"""
+	Snapshot of everything build_mesh needs for a subchunk: its blocks and water levels
+	plus a one block halo of its neighbours, as padded volumes.
+	"""
+
+	world = subchunk.world
+	sx, sy, sz = subchunk.position
+
+	padded_position = (sx - 1, sy - 1, sz - 1)
+	padded_shape = (shape[0] + 2, shape[1] + 2, shape[2] + 2)
+
+	blocks = gather_volume(world, padded_position, padded_shape, read_blocks, 0, np.int64)
+
+	water_levels = gather_water_levels(world, blocks, padded_position)
+
+	return blocks, water_levels
+
+
+def apply_subchunk_mesh(subchunk, solid, water):
+	# the new meshes are uploaded by the next Chunk.update_mesh
+	# None keeps the current mesh
+	if solid is not None:
+		subchunk.mesh_vertex_data, subchunk.mesh_indices = solid
+		subchunk.mesh_dirty = True
+
+	if water is not None:
+		subchunk.water_mesh_vertex_data, subchunk.water_mesh_indices = water
+		subchunk.water_mesh_dirty = True
+
+	subchunk.mesh_index_counter = len(subchunk.mesh_indices)
+	subchunk.water_mesh_index_counter = len(subchunk.water_mesh_indices)
+
+
+def apply_subchunk_visibility(subchunk, visibility):
+	# cave culling only searches again when a visibility actually changed
+	if subchunk.visibility != visibility:
+		subchunk.visibility = visibility
+		subchunk.world.visibility_changed(subchunk.parent.chunk_position)
+
+
+def update_subchunk_mesh(subchunk, shape, update_only_water=False):
+	world = subchunk.world
+	blocks, water_levels = gather_subchunk(subchunk, shape)
+
+	solid, water = build_mesh(
+		world.mesh_tables,
+		blocks,
+		water_levels,
+		subchunk.position,
+		subchunk.parent.position,
+		update_only_water,
+		world.settings.greedy_meshing,
+	)
+
+	apply_subchunk_mesh(subchunk, solid, water)
@@ -68,23 +68,30 @@ class ModelPart:
     def _build_mesh(self, tw, th):
         pass
 
-    def draw(self, parent_mv, shader_matrix_loc):
-        m = matrix.Matrix()
+    def local_matrix(self):
         local = matrix.Matrix()
         local.load_identity()
         local.translate(*self.position)
         if self.rotation[0] != 0: local.rotate(self.rotation[0], 1, 0, 0)
         if self.rotation[1] != 0: local.rotate(self.rotation[1], 0, 1, 0)
         if self.rotation[2] != 0: local.rotate(self.rotation[2], 0, 0, 1)
-        final = parent_mv * local
-        flat_mvp = []
-        for i in range(4):
-            for j in range(4):
-                flat_mvp.append(final.data[i][j])
-        gl.glUniformMatrix4fv(shader_matrix_loc, 1, gl.GL_FALSE, (gl.GLfloat * 16)(*flat_mvp))
+        return local
+
+    def draw(self, parent_mv, shader_matrix_loc):
+        final = parent_mv * self.local_matrix()
+        self.draw_with(final.pointer, shader_matrix_loc)
+
+    def draw_with(self, matrix_pointer, shader_matrix_loc):
+        gl.glUniformMatrix4fv(shader_matrix_loc, 1, gl.GL_FALSE, matrix_pointer)
         gl.glBindVertexArray(self.vao)
         gl.glDrawArrays(gl.GL_TRIANGLES, 0, self.vertex_count)
 
+def draw_parts(parts, parent_mv, shader_matrix_loc):
+    # the matrices of all parts in one batched multiply
+    finals = parent_mv.multiply_batch([part.local_matrix() for part in parts])
+    for index, part in enumerate(parts):
+        part.draw_with(matrix.batch_pointer(finals, index), shader_matrix_loc)
+
 class Mob(entity.Entity):
     def __init__(self, world, position=(0, 0, 0)):
         super().__init__(world)
@@ -408,8 +415,7 @@ class Pig(Mob):
         m.translate(self.position[0], self.position[1], self.position[2])
         m.rotate_2d(-self.rotation[0] - math.pi, 0)
         pv = p * v * m
-        for part in self.parts:
-            part.draw(pv, self.matrix_loc)
+        draw_parts(self.parts, pv, self.matrix_loc)
         
         self.shader.stop()
 
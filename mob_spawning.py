@@ -0,0 +1,61 @@
+"""
+Where mobs spawn when a chunk is generated, kept free of GL so the world
+pre-generator can place them without a window.
+"""
+
+import random
+
+
+def pig_colony(chunk_obj, chunk_position, heights):
+	"""
+	Spawn entries ({'type': 'pig', 'pos': (x, y, z)}) of the pig colony of a newly generated chunk,
+	usually none. heights is the terrain heightmap of the chunk's column.
+	"""
+	spawns = []
+
+	# pigs spawn on the grass surface, skip chunks the terrain surface doesn't go through
+	base_y = chunk_position[1] * 16
+	if not any(base_y <= h - 1 < base_y + 16 for h in heights):
+		return spawns
+
+	# 10% chance to spawn a colony
+	if random.random() < 0.1:
+		cx, cy, cz = chunk_position
+		base_x = cx * 16
+		base_z = cz * 16
+
+		# Determine how many pigs (3 to 7)
+		count = random.randint(3, 7)
+
+		for _ in range(count):
+			# Try 5 times to find a spot for this pig
+			for attempt in range(5):
+				lx = random.randint(0, 15)
+				lz = random.randint(0, 15)
+
+				# Find surface Y, scanning down from the top of the chunk
+				found_y = -1
+
+				for ly in range(15, -1, -1):
+					b = chunk_obj.get_block(lx, ly, lz)
+					if b != 0:
+						# Found top block, pigs only stand on grass (2)
+						if b == 2:
+							found_y = ly + 1
+						break
+
+				if found_y != -1:
+					# Position is global
+					spawn_x = base_x + lx + 0.5
+					spawn_y = base_y + found_y
+					spawn_z = base_z + lz + 0.5
+
+					# Check if inside block (safety)
+					if spawn_y < base_y + 16:
+						spawns.append({
+							'type': 'pig',
+							'pos': (spawn_x, spawn_y, spawn_z)
+						})
+						break
+
+	return spawns
@@ -1,5 +1,6 @@
 import random
 import math
+import numpy as np
 import pyglet.gl as gl
 import matrix
 
@@ -80,8 +81,17 @@ class ParticleSystem:
 			if particle.lifetime <= 0:
 				self.particles.pop(i)
 
-	def draw(self, player):
-		if not self.particles:
+	def draw(self, player, frustum=None):
+		particles = self.particles
+
+		# Frustum Cull Particles, all at once
+		if frustum is not None and particles:
+			positions = np.array([p.position for p in particles], dtype=np.float64)
+			half_sizes = np.array([p.size / 2 for p in particles], dtype=np.float64)[:, None]
+			visible = frustum.boxes_visible(positions - half_sizes, positions + half_sizes)
+			particles = [p for p, is_visible in zip(particles, visible) if is_visible]
+
+		if not particles:
 			return
 			
 		# Rebuild mesh dynamicall every frame 
@@ -102,7 +112,7 @@ class ParticleSystem:
 		# Or just draw axis-aligned cubes? MC particles are often 2D textures on a plane.
 		# Let's do mini-cubes for "premium" feel.
 		
-		for p in self.particles:
+		for p in particles:
 			x, y, z = p.position
 			s = p.size / 2
 			w = p.texture_index
@@ -159,4 +169,4 @@ class ParticleSystem:
 		mvp = player.p_matrix * player.mv_matrix * m
 		self.shader.uniform_matrix(player.shader_matrix_location, mvp)
 		
-		gl.glDrawArrays(gl.GL_QUADS, 0, len(self.particles) * 24)
+		gl.glDrawArrays(gl.GL_QUADS, 0, len(particles) * 24)
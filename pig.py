@@ -300,8 +300,7 @@ class Pig(mob.Mob):
         pv = p * v * m
         
         gl.glDisable(gl.GL_CULL_FACE) # Disable culling for Pig to ensure all manual quads show
-        for part in self.parts:
-            part.draw(pv, self.matrix_loc)
+        mob.draw_parts(self.parts, pv, self.matrix_loc)
         gl.glEnable(gl.GL_CULL_FACE)
         
         self.shader.stop()
@@ -18,6 +18,7 @@ class Player(entity.Entity):
 
 		self.mv_matrix = matrix.Matrix()
 		self.p_matrix = matrix.Matrix()
+		self.mvp_matrix = matrix.Matrix()
 
 		# shaders
 
@@ -214,8 +215,8 @@ class Player(entity.Entity):
 		self.mv_matrix.rotate_2d(self.rotation[0] + math.tau / 4, self.rotation[1])
 		self.mv_matrix.translate(-self.position[0], -self.position[1] - current_eyelevel, -self.position[2])
 
-		# modelviewprojection matrix
-		mvp_matrix = self.p_matrix * self.mv_matrix
+		# modelviewprojection matrix (kept for the chunk shader)
+		self.mvp_matrix = self.p_matrix * self.mv_matrix
 		
 		self.shader.use()
-		self.shader.uniform_matrix(self.shader_matrix_location, mvp_matrix)
+		self.shader.uniform_matrix(self.shader_matrix_location, self.mvp_matrix)
@@ -0,0 +1,241 @@
+"""
+Pre-generates a square of chunk columns of a world, so players never wait for
+terrain generation there:
+
+	python pregen.py --seed 1234 --center 0 0 --radius 16 --save save
+
+Terrain is generated by TerrainGenerator.generate_chunk_blocks in a pool of
+worker processes. The main process lights the chunks and writes them, light
+included, through save.Save, one row of columns (same chunk x) at a time. A row
+is only written once the rows on both sides are lit, so light crossing chunk
+borders is right. Pig colonies are placed the way the game does it for chunks
+generated for the first time and go to the world's persistent mobs.
+
+A row with all its chunks saved is skipped, so an interrupted run picks up
+where it stopped when started again with the same arguments.
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+import chunk
+import headless
+import mob_spawning
+import save
+import terrain_generator
+
+# rows whose chunks are generated ahead of the row being lit
+LOOKAHEAD_ROWS = 2
+
+generator = None # TerrainGenerator of a worker process
+
+
+def init_worker(seed, cave_sample_spacing):
+	global generator
+	generator = terrain_generator.TerrainGenerator(seed=seed, cave_sample_spacing=cave_sample_spacing)
+
+
+def generate(chunk_position):
+	# (chunk_position, blocks, seconds spent), run in the worker processes
+	start = time.process_time()
+	blocks = generator.generate_chunk_blocks(chunk_position)
+	return chunk_position, blocks, time.process_time() - start
+
+
+class PregenWorld(headless.HeadlessWorld):
+	"""Headless world whose new pig colonies are kept as persistent mobs, like the game stores unloaded ones."""
+
+	def __init__(self, block_types):
+		super().__init__(block_types)
+		self.save = None
+		self.persistent_mobs = {}
+		self.mobs_changed = False
+
+	def spawn_pigs_in_chunk(self, chunk_position):
+		heights, _ = self.save.terrain_generator.get_column(chunk_position[0] * 16, chunk_position[2] * 16)
+
+		for spawn in mob_spawning.pig_colony(self.chunks[chunk_position], chunk_position, heights):
+			self.persistent_mobs.setdefault(chunk_position, []).append({
+				'position': list(spawn['pos']),
+				'rotation': [0, 0, 0],
+				'ai_state': 'idle',
+				'type': spawn['type'],
+			})
+			self.mobs_changed = True
+
+
+class Pregenerator:
+	def __init__(self, world, saver, center, radius, layers):
+		self.world = world
+		self.save = saver
+		self.layers = layers
+
+		cx, cz = center
+		self.rows = list(range(cx - radius, cx + radius + 1))
+		self.columns = list(range(cz - radius, cz + radius + 1))
+
+		self.loaded_rows = [] # rows whose chunks are in the world, in order
+		self.unsaved_rows = set()
+
+		self.saved = 0
+		self.generated = 0
+		self.generation_seconds = 0.0
+
+	def row_positions(self, x):
+		# top down, so sunlight from the chunk above is there when a chunk is lit
+		return [(x, y, z) for z in self.columns for y in reversed(self.layers)]
+
+	def row_done(self, x):
+		with self.save.region_lock:
+			return all(self.save.get_region(position).has_chunk(position) for position in self.row_positions(x))
+
+	def plan(self):
+		# rows left to save, and the rows to generate for them: those and their neighbours, for the light
+		todo = {x for x in self.rows if not self.row_done(x)}
+		needed = [x for x in self.rows if x in todo or x - 1 in todo or x + 1 in todo]
+		return todo, needed
+
+	def add_row(self, x, results):
+		# a gap after the last row, everything loaded so far has all the neighbours it will get
+		if self.loaded_rows and self.loaded_rows[-1] != x - 1:
+			self.save_rows(len(self.loaded_rows))
+
+		for position, blocks, seconds in results:
+			new_chunk = chunk.Chunk(self.world, position)
+			new_chunk.set_blocks(blocks)
+			self.world.chunks[position] = new_chunk
+			self.world.light_solver.initialize_sunlight(position)
+			self.generated += 1
+			self.generation_seconds += seconds
+
+		solver = self.world.light_solver
+		while solver.busy():
+			solver.process_queue(budget=100000)
+
+		self.loaded_rows.append(x)
+
+		# the row before now has both its neighbours
+		if len(self.loaded_rows) >= 2:
+			self.save_rows(len(self.loaded_rows) - 1)
+
+	def save_rows(self, count):
+		# save the first count loaded rows and unload them, later rows are lit already so they don't need them
+		for x in self.loaded_rows[:count]:
+			if x in self.unsaved_rows:
+				self.save_row(x)
+
+			for position in self.row_positions(x):
+				del self.world.chunks[position]
+
+		self.loaded_rows = self.loaded_rows[count:]
+		self.world.light_solver.dirty_chunks.clear()
+		self.world.mesh_update_set.clear()
+
+		if self.world.mobs_changed:
+			self.save.save_mobs({chunk_position: list(mobs) for chunk_position, mobs in self.world.persistent_mobs.items()})
+			self.world.mobs_changed = False
+
+	def save_row(self, x):
+		for position in self.row_positions(x):
+			with self.save.region_lock:
+				if self.save.get_region(position).has_chunk(position): # saved before an interruption
+					continue
+
+			# pigs only spawn in chunks generated for the first time, as in Save.load_chunk
+			if not self.save.is_generated(position):
+				self.world.spawn_pigs_in_chunk(position)
+
+			self.save.writer.submit(("chunk", position), self.save.write_chunk, self.save.snapshot_chunk(position))
+			self.saved += 1
+
+		self.unsaved_rows.discard(x)
+
+	def run(self, pool):
+		todo, needed = self.plan()
+		self.unsaved_rows = set(todo)
+
+		total = len(todo) * len(self.columns) * len(self.layers)
+
+		if len(todo) < len(self.rows):
+			print(f"Resuming: {len(self.rows) - len(todo)} of {len(self.rows)} rows already saved")
+
+		start = time.perf_counter()
+
+		# generation of the next rows runs in the pool while the main process lights and saves
+		jobs = {}
+		for index, x in enumerate(needed):
+			for ahead in needed[index : index + LOOKAHEAD_ROWS + 1]:
+				if ahead not in jobs:
+					jobs[ahead] = pool.map_async(generate, self.row_positions(ahead))
+
+			self.add_row(x, jobs.pop(x).get())
+
+			elapsed = time.perf_counter() - start
+			rate = self.saved / elapsed if elapsed else 0.0
+			print(f"\r{self.saved}/{total} chunks saved, {rate:.1f} chunks/s", end="", flush=True)
+
+		self.save_rows(len(self.loaded_rows))
+		self.save.flush()
+
+		print()
+		return time.perf_counter() - start
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Pre-generate, light and save the chunks of a square area of a world.")
+	parser.add_argument("--seed", type=int, help="seed of a new world, an existing world must have this seed")
+	parser.add_argument("--center", type=int, nargs=2, default=[0, 0], metavar=("X", "Z"), help="center chunk column")
+	parser.add_argument("--radius", type=int, default=8, help="chunk columns on each side of the center")
+	parser.add_argument("--min-y", type=int, default=0, help="lowest chunk layer")
+	parser.add_argument("--max-y", type=int, default=9, help="highest chunk layer")
+	parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+	parser.add_argument("--save", default="save", help="world directory")
+	args = parser.parse_args()
+
+	os.makedirs(args.save, exist_ok=True)
+
+	# stand-in block types would save chunks the game can't load
+	block_types, _ = headless.load_block_types(headless.HeadlessTextureManager(), fallback=False)
+	if block_types is None:
+		print(f"{headless.BLOCK_DATA_PATH} not found, run pregen.py from the game directory")
+		sys.exit(1)
+
+	world = PregenWorld(block_types)
+
+	saver = save.Save(world, args.save, args.seed)
+	world.save = saver
+	world.persistent_mobs = saver.load_mobs()
+
+	if args.seed is not None and saver.seed != args.seed:
+		print(f"{args.save} is a world with seed {saver.seed}, not {args.seed}")
+		saver.close()
+		sys.exit(1)
+
+	layers = range(args.min_y, args.max_y + 1)
+	pregenerator = Pregenerator(world, saver, tuple(args.center), args.radius, layers)
+
+	print(f"Pre-generating {len(pregenerator.rows) ** 2 * len(layers)} chunks around {tuple(args.center)} "
+		f"with {args.workers} workers (seed {saver.seed})")
+
+	# spawned workers, like the mesh pool, so nothing of the main process is inherited
+	context = multiprocessing.get_context("spawn")
+	try:
+		with context.Pool(args.workers, initializer=init_worker, initargs=(saver.seed, saver.cave_sample_spacing)) as pool:
+			seconds = pregenerator.run(pool)
+	finally:
+		# on an interruption too, what was saved so far is kept for the next run
+		saver.close()
+
+	rate = pregenerator.saved / seconds if seconds else 0.0
+	generation_rate = pregenerator.generated / pregenerator.generation_seconds if pregenerator.generation_seconds else 0.0
+
+	print(f"Saved {pregenerator.saved} chunks in {seconds:.1f} s: {rate:.1f} chunks/s, "
+		f"{rate / args.workers:.1f} chunks/s per core")
+	print(f"Generation alone: {generation_rate:.1f} chunks/s per core ({pregenerator.generation_seconds:.1f} CPU seconds)")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,211 @@
+"""
+Region files: many chunks stored in one file.
+
+A region holds REGION_SIZE³ chunks. The file starts with a header: a magic
+number and an offset table with one (first sector, byte length) entry per chunk
+(0, 0 for chunks that were never generated, GENERATED, 0 for chunks generated
+but never changed, which are generated again instead of being saved). The chunk
+data follows in SECTOR_SIZE byte sectors.
+
+A chunk is never written over its old data: it goes to the first free run of
+sectors, or to the end of the file. Its table entry, like generated marks, only
+changes in memory until flush, which syncs the data written since the last
+flush, writes all the new entries, syncs again and only then frees the old
+sectors. A crash before that leaves the previous version of every chunk, and a
+batch of writes costs two syncs. Reads go through a memory map of the whole
+file, so loading a chunk costs no syscalls.
+"""
+
+import os
+import mmap
+import sys
+from array import array
+
+REGION_SIZE = 16 # chunks along each axis
+REGION_CHUNKS = REGION_SIZE ** 3
+
+MAGIC = b"PCR1"
+
+SECTOR_SIZE = 256
+
+# magic in the first sector, then two uint32 per chunk
+TABLE_OFFSET = SECTOR_SIZE
+HEADER_SIZE = TABLE_OFFSET + REGION_CHUNKS * 8
+HEADER_SECTORS = HEADER_SIZE // SECTOR_SIZE
+
+# sector of the table entry of a generated chunk without any saved data
+GENERATED = 0xFFFFFFFF
+
+
+def region_position(chunk_position):
+	cx, cy, cz = chunk_position
+	return (cx // REGION_SIZE, cy // REGION_SIZE, cz // REGION_SIZE)
+
+
+def chunk_index(chunk_position):
+	cx, cy, cz = chunk_position
+	return ((cx % REGION_SIZE) * REGION_SIZE + cy % REGION_SIZE) * REGION_SIZE + cz % REGION_SIZE
+
+
+def sectors_needed(length):
+	return (length + SECTOR_SIZE - 1) // SECTOR_SIZE
+
+
+class Region:
+	def __init__(self, path):
+		self.path = path
+
+		if not os.path.exists(path):
+			with open(path, "wb") as f:
+				f.write(MAGIC)
+				f.truncate(HEADER_SIZE)
+
+		self.file = open(path, "r+b")
+
+		header = self.file.read(HEADER_SIZE)
+
+		if len(header) != HEADER_SIZE or header[:4] != MAGIC:
+			self.file.close()
+			raise ValueError(f"{path} is not a region file")
+
+		# table[2 * i] is the first sector of chunk i, table[2 * i + 1] its length in bytes
+		self.table = array("I")
+		self.table.frombytes(header[TABLE_OFFSET:])
+		if sys.byteorder != "little":
+			self.table.byteswap()
+
+		# one byte per sector of the file, 1 if it is in use
+		file_sectors = sectors_needed(os.path.getsize(path))
+		self.used = bytearray(file_sectors)
+		self.used[:HEADER_SECTORS] = b"\x01" * HEADER_SECTORS
+
+		for index in range(REGION_CHUNKS):
+			sector, length = self.table[2 * index], self.table[2 * index + 1]
+			if length:
+				self.used[sector : sector + sectors_needed(length)] = b"\x01" * sectors_needed(length)
+
+		# table indices written or marked generated since the last flush, their entries aren't in the file yet
+		self.unwritten_entries = set()
+
+		# (first sector, sector count) of data replaced since the last flush, the file's table may still point there
+		self.replaced = []
+		self.unsynced_data = False
+
+		self.map = None
+		self.remap()
+
+	def remap(self):
+		if self.map is not None:
+			self.map.close()
+
+		self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+	def has_chunk(self, chunk_position):
+		return self.table[2 * chunk_index(chunk_position) + 1] != 0
+
+	def is_generated(self, chunk_position):
+		# saved, or marked by mark_generated
+		index = chunk_index(chunk_position)
+		return self.table[2 * index] != 0 or self.table[2 * index + 1] != 0
+
+	def mark_generated(self, chunk_position):
+		# in memory only, see flush
+		if not self.is_generated(chunk_position):
+			index = chunk_index(chunk_position)
+			self.table[2 * index] = GENERATED
+			self.table[2 * index + 1] = 0
+			self.unwritten_entries.add(index)
+
+	def flush(self):
+		# write the table entries changed since the last flush, once the data they point to is on disk
+		if not self.unwritten_entries:
+			return
+
+		if self.unsynced_data:
+			self.sync()
+			self.unsynced_data = False
+
+		for index in sorted(self.unwritten_entries):
+			self.set_entry(index, self.table[2 * index], self.table[2 * index + 1])
+
+		self.unwritten_entries.clear()
+		self.sync()
+
+		# nothing on disk points to the replaced sectors anymore
+		for sector, sectors in self.replaced:
+			self.used[sector : sector + sectors] = bytes(sectors)
+
+		self.replaced.clear()
+
+	def read(self, chunk_position):
+		"""The saved bytes of a chunk, or None if it was never saved."""
+		index = chunk_index(chunk_position)
+		sector, length = self.table[2 * index], self.table[2 * index + 1]
+
+		if not length:
+			return None
+
+		start = sector * SECTOR_SIZE
+
+		if start + length > len(self.map): # the file grew since it was mapped
+			self.remap()
+
+		return self.map[start : start + length]
+
+	def write(self, chunk_position, data):
+		index = chunk_index(chunk_position)
+		sector, length = self.table[2 * index], self.table[2 * index + 1]
+
+		old_sectors = sectors_needed(length) if length else 0
+		new_sectors = sectors_needed(len(data))
+
+		# the old sectors are still marked used, so the new copy never overlaps them
+		new_sector = self.allocate(new_sectors)
+
+		self.file.seek(new_sector * SECTOR_SIZE)
+		self.file.write(data)
+
+		# pad the last sector so the file always ends on a sector boundary
+		self.file.write(bytes(new_sectors * SECTOR_SIZE - len(data)))
+
+		# visible to the memory map, synced by flush
+		self.file.flush()
+		self.unsynced_data = True
+
+		# in memory only, the old sectors stay used until flush wrote the new entry
+		self.table[2 * index] = new_sector
+		self.table[2 * index + 1] = len(data)
+		self.unwritten_entries.add(index)
+
+		if old_sectors:
+			self.replaced.append((sector, old_sectors))
+
+	def allocate(self, sectors):
+		# first fit, or the end of the file
+		sector = self.used.find(bytes(sectors), HEADER_SECTORS)
+
+		if sector == -1:
+			sector = len(self.used)
+			while sector > HEADER_SECTORS and not self.used[sector - 1]:
+				sector -= 1
+
+			self.used.extend(bytes(sector + sectors - len(self.used)))
+
+		self.used[sector : sector + sectors] = b"\x01" * sectors
+		return sector
+
+	def sync(self):
+		self.file.flush()
+		os.fsync(self.file.fileno())
+
+	def set_entry(self, index, sector, length):
+		self.table[2 * index] = sector
+		self.table[2 * index + 1] = length
+
+		self.file.seek(TABLE_OFFSET + index * 8)
+		self.file.write(sector.to_bytes(4, "little") + length.to_bytes(4, "little"))
+
+	def close(self):
+		self.flush()
+		self.map.close()
+		self.file.close()
@@ -1,30 +1,63 @@
 import os
+import pickle
 import struct
+import threading
+import time
 import terrain_generator
 import chunk
+import chunk_codec
+import region
+import save_writer
 import random
+from array import array
+
+# the 26 chunks around a chunk
+NEIGHBOUR_OFFSETS = [
+	(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1) if (dx, dy, dz) != (0, 0, 0)
+]
 
 class Save:
-	def __init__(self, world):
+	def __init__(self, world, path="save", seed=None):
+		# seed is only used when the world is created, an existing world keeps its own
 		self.world = world
-		self.path = "save"
+		self.path = path
 		
 		# Ensure save directory exists
 		if not os.path.exists(self.path):
 			os.makedirs(self.path)
 			
+		# worlds from before a generator setting existed keep generating the way they did
+		new_world = not os.path.exists(f"{self.path}/seed.bin")
+
 		# Load or Create Seed
-		self.seed = self.load_seed()
+		self.seed = self.load_seed(seed)
+
+		# compression of the chunk data, picked when the world is created
+		self.compression = self.load_compression()
+		
+		# cave noise sample spacing, also picked when the world is created since it changes the caves
+		self.cave_sample_spacing = self.load_cave_sample_spacing(new_world)
 		
 		# Initialize generator with the persistent seed
-		self.terrain_generator = terrain_generator.TerrainGenerator(seed=self.seed)
+		self.terrain_generator = terrain_generator.TerrainGenerator(seed=self.seed, cave_sample_spacing=self.cave_sample_spacing)
 		print(f"World Seed: {self.seed}")
 
+		# chunks are stored in region files, opened as needed. The writer thread writes them while the main thread reads
+		self.regions = {}
+		self.region_lock = threading.RLock()
+
+		# chunks, the player and mobs are written in the background
+		self.writer = save_writer.SaveWriter()
+
+		# chunk files of the old format left to migrate, listed once instead of checking every chunk on load
+		self.legacy_chunks = {name for name in os.listdir(self.path) if name.startswith("chunk_") and name.endswith(".bin")}
+
 	def chunk_position_to_path(self, chunk_position):
+		# old one-file-per-chunk format, only read to migrate chunks into region files
 		x, y, z = chunk_position
 		return f"{self.path}/chunk_{x}_{y}_{z}.bin"
 		
-	def load_seed(self):
+	def load_seed(self, seed=None):
 		"""Load seed from file or generate a new one"""
 		seed_path = f"{self.path}/seed.bin"
 		if os.path.exists(seed_path):
@@ -38,7 +71,7 @@ class Save:
 				print(f"Failed to load seed: {e}")
 		
 		# Generate new seed if not found
-		new_seed = random.randint(0, 999999)
+		new_seed = seed if seed is not None else random.randint(0, 999999)
 		try:
 			with open(seed_path, "wb") as f:
 				f.write(struct.pack("q", new_seed))
@@ -47,236 +80,325 @@ class Save:
 			
 		return new_seed
 
+	def load_cave_sample_spacing(self, new_world):
+		"""Load the world's cave sample spacing, worlds without one had exact caves"""
+		path = f"{self.path}/generator.txt"
+		if os.path.exists(path):
+			try:
+				with open(path, "r") as f:
+					return max(1, int(f.read().strip()))
+			except Exception as e:
+				print(f"Failed to load generator settings: {e}")
+
+		spacing = terrain_generator.CAVE_SAMPLE_SPACING if new_world else 1
+
+		try:
+			with open(path, "w") as f:
+				f.write(str(spacing))
+		except Exception as e:
+			print(f"Failed to save generator settings: {e}")
+
+		return spacing
+
+	def load_compression(self):
+		"""Load the world's chunk compression, new worlds take the one from the settings"""
+		path = f"{self.path}/compression.txt"
+		if os.path.exists(path):
+			try:
+				with open(path, "r") as f:
+					compression = f.read().strip()
+					if compression in chunk_codec.COMPRESSIONS:
+						return compression
+			except Exception as e:
+				print(f"Failed to load compression: {e}")
+
+		compression = self.world.settings.save_compression
+		if compression not in chunk_codec.COMPRESSIONS:
+			print(f"Unknown save compression {compression}, using zlib")
+			compression = "zlib"
+
+		try:
+			with open(path, "w") as f:
+				f.write(compression)
+		except Exception as e:
+			print(f"Failed to save compression: {e}")
+
+		return compression
+
 	def load(self):
 		# Ensure save directory exists
 		if not os.path.exists(self.path):
 			os.makedirs(self.path)
 
-	def load_chunk(self, chunk_position):
+	def get_region(self, chunk_position):
+		# callers hold region_lock
+		region_position = region.region_position(chunk_position)
+
+		if region_position not in self.regions:
+			x, y, z = region_position
+			path = f"{self.path}/region_{x}_{y}_{z}.pcr"
+
+			try:
+				self.regions[region_position] = region.Region(path)
+			except Exception as e:
+				# keep the broken file around and start an empty region, its chunks get regenerated
+				print(f"Failed to open region {region_position}: {e}")
+				os.replace(path, path + ".corrupt")
+				self.regions[region_position] = region.Region(path)
+
+		return self.regions[region_position]
+
+	def read_chunk_data(self, chunk_position):
+		# (data, legacy_path), legacy_path is set for chunks still in the old one-file-per-chunk format
+
+		# a snapshot not written yet is newer than what is on disk
+		snapshot = self.pending_snapshot(chunk_position)
+		if snapshot is not None:
+			return self.encode_snapshot(snapshot, "none"), None
+
+		with self.region_lock:
+			data = self.get_region(chunk_position).read(chunk_position)
+
+		if data is not None:
+			return data, None
+
 		chunk_path = self.chunk_position_to_path(chunk_position)
-		
+
+		if os.path.basename(chunk_path) in self.legacy_chunks:
+			with open(chunk_path, "rb") as f:
+				return f.read(), chunk_path
+
+		return None, None
+
+	def load_chunk(self, chunk_position):
 		needs_generation = True
-		
-		# Expected size: 16*16*16
-		# If file size is larger (old format 16*32*16), we should probably discard it or migrate.
-		# Simplest is to regenerate if size mismatch or just ignore old saves.
-		# Given the user request to change height, let's assume we want new generation or migrating.
-		# Let's just delete the file if it's old format? Or fail load and regen.
-		
-		if os.path.exists(chunk_path):
-			try:
-				with open(chunk_path, "rb") as f:
-					# Check for Magic Header for RLE
-					header = f.read(4)
-					is_rle = (header == b'RLE1')
-					
-					if is_rle:
-						# Expected size for height 16 is 16*16*16 = 4096
-						# Old size 16*32*16 = 8192
-						# Just checking total blocks isn't enough if RLE matches but dimensions map wrong?
-						# Wait, we read RLE count.
-						
-						total_blocks = chunk.CHUNK_WIDTH * chunk.CHUNK_HEIGHT * chunk.CHUNK_LENGTH
-						flat_blocks = []
-						
-						while len(flat_blocks) < total_blocks:
-							pair = f.read(2)
-							if not pair or len(pair) < 2:
-								break
-							count = pair[0]
-							block_id = pair[1]
-							flat_blocks.extend([block_id] * count)
-						
-						if len(flat_blocks) != total_blocks:
-							print(f"Chunk {chunk_position} corrupted or old version (Length mismatch: {len(flat_blocks)} vs {total_blocks}). Regenerating.")
-							needs_generation = True
-						else:
-							# Reconstruct
-							clean_blocks = []
-							ptr = 0
-							row_k = chunk.CHUNK_LENGTH
-							height = chunk.CHUNK_HEIGHT
-							width = chunk.CHUNK_WIDTH
-							
-							for x in range(width):
-								col = []
-								for y in range(height):
-									col.append(flat_blocks[ptr : ptr + row_k])
-									ptr += row_k
-								clean_blocks.append(col)
-								
-							new_chunk = chunk.Chunk(self.world, chunk_position)
-							new_chunk.blocks = clean_blocks
-							self.world.chunks[chunk_position] = new_chunk
-							
-							# Read Water Levels
-							water_count_bytes = f.read(4)
-							if water_count_bytes and len(water_count_bytes) == 4:
-								water_count = struct.unpack("I", water_count_bytes)[0]
-								cx, cy, cz = chunk_position
-								base_x = cx * chunk.CHUNK_WIDTH
-								base_z = cz * chunk.CHUNK_LENGTH
-								metadata = self.world.block_metadata
-								set_water = metadata.set_water_level
-								water_bytes = f.read(water_count * 5)
-								for i in range(water_count):
-									off = i * 5
-									lx = water_bytes[off]
-									ly = int.from_bytes(water_bytes[off+1:off+3], 'little')
-									lz = water_bytes[off+3]
-									lvl = water_bytes[off+4]
-									if ly < chunk.CHUNK_HEIGHT: # Safety check
-										set_water((base_x + lx, ly, base_z + lz), lvl)
-									
-							self.world.light_solver.initialize_sunlight(chunk_position)
-							needs_generation = False
-					else:
-						# Backwards compatibility / Raw format
-						# Check file size
-						file_size = os.path.getsize(chunk_path)
-						expected_size = chunk.CHUNK_WIDTH * chunk.CHUNK_HEIGHT * chunk.CHUNK_LENGTH
-						# Rough check (ignoring water metadata which might be appended)
-						
-						if file_size < expected_size:
-							print(f"Chunk {chunk_position} raw size mismatch. Regenerating.")
-							needs_generation = True
-						else:
-							# Legacy load might crash if dimensions changed.
-							# Safe bet: If not RLE, just regenerate to be safe with new height.
-							# Or try to read exactly N bytes
-							f.seek(0)
-							raw_blocks = f.read(expected_size)
-							if len(raw_blocks) == expected_size:
-								clean_blocks = []
-								ptr = 0
-								row_k = chunk.CHUNK_LENGTH
-								for x in range(chunk.CHUNK_WIDTH):
-									col = []
-									for y in range(chunk.CHUNK_HEIGHT):
-										col.append(list(raw_blocks[ptr : ptr + row_k]))
-										ptr += row_k
-									clean_blocks.append(col)
-								
-								new_chunk = chunk.Chunk(self.world, chunk_position)
-								new_chunk.blocks = clean_blocks
-								self.world.chunks[chunk_position] = new_chunk
-								
-								# Water...
-								water_count_bytes = f.read(4)
-								if water_count_bytes and len(water_count_bytes) == 4:
-									water_count = struct.unpack("I", water_count_bytes)[0]
-									cx, cy, cz = chunk_position
-									base_x = cx * chunk.CHUNK_WIDTH
-									base_z = cz * chunk.CHUNK_LENGTH
-									metadata = self.world.block_metadata
-									set_water = metadata.set_water_level
-									water_bytes = f.read(water_count * 5)
-									for i in range(water_count):
-										off = i * 5
-										lx = water_bytes[off]
-										ly = int.from_bytes(water_bytes[off+1:off+3], 'little')
-										lz = water_bytes[off+3]
-										lvl = water_bytes[off+4]
-										if ly < chunk.CHUNK_HEIGHT:
-											set_water((base_x + lx, ly, base_z + lz), lvl)
-								
-								self.world.light_solver.initialize_sunlight(chunk_position)
-								needs_generation = False
-							else:
-								needs_generation = True
 
+		data, legacy_path = self.read_chunk_data(chunk_position)
+
+		if data is not None:
+			try:
+				needs_generation = not self.decode_chunk(chunk_position, data)
 			except Exception as e:
 				print(f"Failed to load binary chunk {chunk_position}: {e}")
 				needs_generation = True
 
 		if needs_generation:
 			# Generate new chunk
-			blocks = self.terrain_generator.generate_chunk_blocks(chunk_position)
+			self.add_generated_chunk(chunk_position, self.terrain_generator.generate_chunk_blocks(chunk_position))
+
+		if legacy_path and chunk_position in self.world.chunks:
+			# migrate the old chunk file into its region, written right away as the file is removed after
+			self.write_chunk(self.snapshot_chunk(chunk_position))
+			os.remove(legacy_path)
+			self.legacy_chunks.discard(os.path.basename(legacy_path))
+
+	def add_generated_chunk(self, chunk_position, blocks):
+		# generation is deterministic, so a chunk is only written once gameplay modifies it
+		if not blocks:
+			return
+
+		self.add_chunk(chunk_position, blocks)
+		
+		# Initialize Sunlight
+		self.world.light_solver.initialize_sunlight(chunk_position)
+		
+		# Spawn Mobs (Pig Colonies), only the first time the chunk is generated
+		if not self.is_generated(chunk_position):
+			self.world.spawn_pigs_in_chunk(chunk_position)
+			self.mark_generated(chunk_position)
+
+	def decode_chunk(self, chunk_position, data):
+		# chunk_codec data, or an old RLE1 stream / raw chunk file. True if the chunk was loaded
+		if chunk_codec.is_encoded(data):
+			self.add_decoded_chunk(chunk_position, chunk_codec.decode(data))
+			return True
+
+		cx, _, cz = chunk_position
+		base_x = cx * chunk.CHUNK_WIDTH
+		base_z = cz * chunk.CHUNK_LENGTH
+
+		set_water = self.world.block_metadata.set_water_level
+
+		if data[:4] == b'RLE1':
+			blocks, offset = chunk_codec.decode_rle1(data)
+		else:
+			# Backwards compatibility / Raw format
+			expected_size = chunk.CHUNK_VOLUME
+			# Rough check (ignoring water metadata which might be appended)
 			
-			if blocks:
-				new_chunk = chunk.Chunk(self.world, chunk_position)
-				new_chunk.blocks = blocks
-				self.world.chunks[chunk_position] = new_chunk
-				
-				# Initialize Sunlight
-				self.world.light_solver.initialize_sunlight(chunk_position)
-				
-				# Spawn Mobs (Pig Colonies)
-				self.world.spawn_pigs_in_chunk(chunk_position)
-				
-				new_chunk.modified = True
+			if len(data) < expected_size:
+				print(f"Chunk {chunk_position} raw size mismatch. Regenerating.")
+				return False
+
+			blocks = array(chunk.BLOCKS_TYPECODE, list(data[:expected_size])) # one byte per block
+			offset = expected_size
+
+		self.add_chunk(chunk_position, blocks)
+
+		# Read Water Levels (old 5 byte entries, with the y of the entry used as is)
+		water_count_bytes = data[offset : offset + 4]
+		if len(water_count_bytes) == 4:
+			water_count = struct.unpack("I", water_count_bytes)[0]
+			water_bytes = data[offset + 4 : offset + 4 + water_count * 5]
+			for i in range(min(water_count, len(water_bytes) // 5)):
+				off = i * 5
+				lx = water_bytes[off]
+				ly = int.from_bytes(water_bytes[off+1:off+3], 'little')
+				lz = water_bytes[off+3]
+				lvl = water_bytes[off+4]
+				if ly < chunk.CHUNK_HEIGHT: # Safety check
+					set_water((base_x + lx, ly, base_z + lz), lvl)
 				
-				# Immediate Save to prevent re-generation lag on next load/restart
-				self.save_chunk(chunk_position)
+		self.world.light_solver.initialize_sunlight(chunk_position)
+		return True
+
+	def add_decoded_chunk(self, chunk_position, decoded):
+		# decoded is what chunk_codec.decode returns
+		blocks, water_indices, water_levels, blocks_stamp, light, light_stamp = decoded
+
+		new_chunk = self.add_chunk(chunk_position, blocks)
+		new_chunk.blocks_stamp = blocks_stamp
+
+		cx, cy, cz = chunk_position
+		base_x = cx * chunk.CHUNK_WIDTH
+		base_y = cy * chunk.CHUNK_HEIGHT
+		base_z = cz * chunk.CHUNK_LENGTH
+
+		set_water = self.world.block_metadata.set_water_level
+
+		for index, level in zip(water_indices.tolist(), water_levels.tolist()):
+			lx, rest = divmod(index, chunk.CHUNK_HEIGHT * chunk.CHUNK_LENGTH)
+			ly, lz = divmod(rest, chunk.CHUNK_LENGTH)
+			set_water((base_x + lx, base_y + ly, base_z + lz), level)
+
+		# the saved light is used as is unless a neighbour changed since, then the chunk is lit again
+		if light is not None and self.light_is_valid(chunk_position, light_stamp):
+			offset = 0
+			for subchunk in new_chunk.subchunks.values():
+				subchunk.light_map[:] = light[offset : offset + len(subchunk.light_map)]
+				offset += len(subchunk.light_map)
+			new_chunk.lit = True
+
+			# the light may be from before a chunk further away changed, and neighbours loaded before it
+			# were lit without it
+			light_solver = self.world.light_solver
+			light_solver.darken_unsupported(new_chunk)
+			light_solver.darken_neighbours(new_chunk)
+			light_solver.stitch_borders(new_chunk)
+		else:
+			self.world.light_solver.initialize_sunlight(chunk_position)
+
+	def add_chunk(self, chunk_position, blocks):
+		new_chunk = chunk.Chunk(self.world, chunk_position)
+		new_chunk.set_blocks(blocks)
+		self.world.chunks[chunk_position] = new_chunk
+		return new_chunk
+
+	def blocks_stamp(self, chunk_position):
+		# time of the last block change of a chunk, wherever it currently is (0 if never saved)
+		if chunk_position in self.world.chunks:
+			return self.world.chunks[chunk_position].blocks_stamp
+
+		snapshot = self.pending_snapshot(chunk_position)
+		if snapshot is not None:
+			return snapshot[4]
+
+		with self.region_lock:
+			data = self.get_region(chunk_position).read(chunk_position)
+
+		return chunk_codec.blocks_stamp(data) if data is not None else 0.0
+
+	def light_is_valid(self, chunk_position, light_stamp):
+		# a saved light map is valid while none of the 26 chunks around it changed after it was taken, changes
+		# further away are caught by darken_unsupported once the chunks in between are loaded
+		cx, cy, cz = chunk_position
+
+		for dx, dy, dz in NEIGHBOUR_OFFSETS:
+			if self.blocks_stamp((cx + dx, cy + dy, cz + dz)) > light_stamp:
+				return False
+
+		return True
+
+	def snapshot_chunk(self, chunk_position):
+		"""
+		Everything needed to encode the chunk later:
+		(chunk_position, blocks, water_indices, water_levels, blocks_stamp, light, light_stamp).
+		The light map is only included once the light solver has no work queued in the chunk.
+		"""
+		chunk_obj = self.world.chunks[chunk_position]
+		blocks = chunk_obj.snapshot_blocks()
+
+		cx, cy, cz = chunk_position
+		base_x = cx * chunk.CHUNK_WIDTH
+		base_y = cy * chunk.CHUNK_HEIGHT
+		base_z = cz * chunk.CHUNK_LENGTH
+
+		get_water_level = self.world.block_metadata.get_water_level
+
+		water_indices = chunk_codec.water_blocks(blocks)
+		water_levels = []
+
+		for index in water_indices.tolist():
+			lx, rest = divmod(index, chunk.CHUNK_HEIGHT * chunk.CHUNK_LENGTH)
+			ly, lz = divmod(rest, chunk.CHUNK_LENGTH)
+			water_levels.append(get_water_level((base_x + lx, base_y + ly, base_z + lz)))
+
+		light = None
+		light_stamp = time.time()
+
+		if not self.world.light_solver.has_pending(chunk_position):
+			light = b"".join(bytes(subchunk.light_map) for subchunk in chunk_obj.subchunks.values())
+
+		return chunk_position, blocks, water_indices, water_levels, chunk_obj.blocks_stamp, light, light_stamp
+
+	def encode_snapshot(self, snapshot, compression):
+		_, blocks, water_indices, water_levels, blocks_stamp, light, light_stamp = snapshot
+		return chunk_codec.encode(blocks, water_indices, water_levels, compression, blocks_stamp, light, light_stamp)
+
+	def encode_chunk(self, chunk_position):
+		return self.encode_snapshot(self.snapshot_chunk(chunk_position), self.compression)
 
 	def save_chunk(self, chunk_position):
+		# only the snapshot is taken here, encoding and writing happen on the writer thread
 		if chunk_position not in self.world.chunks:
 			return
-			
-		chunk_obj = self.world.chunks[chunk_position]
-		chunk_path = self.chunk_position_to_path(chunk_position)
-		
+
+		self.writer.submit(("chunk", chunk_position), self.write_chunk, self.snapshot_chunk(chunk_position))
+		self.world.chunks[chunk_position].modified = False
+
+		self.queue_region_flush()
+
+	def is_generated(self, chunk_position):
+		with self.region_lock:
+			return self.get_region(chunk_position).is_generated(chunk_position)
+
+	def mark_generated(self, chunk_position):
+		# only in memory, the marks are written together by flush_regions
+		with self.region_lock:
+			self.get_region(chunk_position).mark_generated(chunk_position)
+
+	def queue_region_flush(self):
+		# behind the chunks queued so far, a batch of writes costs each region two syncs
+		self.writer.submit_last(("flush regions",), self.flush_regions)
+
+	def flush_regions(self):
+		with self.region_lock:
+			for open_region in self.regions.values():
+				open_region.flush()
+
+	def pending_snapshot(self, chunk_position):
+		# the snapshot of a chunk still waiting for the writer thread, or None
+		args = self.writer.peek(("chunk", chunk_position))
+		return args[0] if args is not None else None
+
+	def write_chunk(self, snapshot):
+		chunk_position = snapshot[0]
+
 		try:
-			with open(chunk_path, "wb") as f:
-				# --- RLE Compression ---
-				f.write(b'RLE1') # Magic Header
-				
-				# Flatten loop for RLE
-				# We compress strictly in x -> y -> z order
-				
-				current_block = -1
-				count = 0
-				
-				# Buffering writes slightly for performance, or write directly? 
-				# Bytearray is faster.
-				rle_data = bytearray()
-				
-				for col in chunk_obj.blocks: # x
-					for row in col: # y
-						for block_id in row: # z
-							if block_id == current_block and count < 255:
-								count += 1
-							else:
-								if count > 0:
-									rle_data.append(count)
-									rle_data.append(current_block)
-								current_block = block_id
-								count = 1
-				
-				# Write final group
-				if count > 0:
-					rle_data.append(count)
-					rle_data.append(current_block)
-					
-				f.write(rle_data)
-				
-				# --- Write Water Levels ---
-				water_entries = bytearray()
-				count = 0
-				
-				cx, cy, cz = chunk_position
-				base_x = cx * chunk.CHUNK_WIDTH
-				base_z = cz * chunk.CHUNK_LENGTH
-				
-				block_metadata_obj = self.world.block_metadata
-				
-				for lx in range(chunk.CHUNK_WIDTH):
-					for ly in range(chunk.CHUNK_HEIGHT):
-						for lz in range(chunk.CHUNK_LENGTH):
-							block_id = chunk_obj.blocks[lx][ly][lz]
-							if block_id == 8 or block_id == 9: # Water
-								lvl = block_metadata_obj.get_water_level((base_x + lx, ly, base_z + lz))
-								# Entry: x(1B), y(2B), z(1B), lvl(1B)
-								water_entries.append(lx)
-								water_entries.extend(ly.to_bytes(2, 'little'))
-								water_entries.append(lz)
-								water_entries.append(lvl)
-								count += 1
-				
-				f.write(struct.pack("I", count))
-				f.write(water_entries)
-				
-				chunk_obj.modified = False
+			data = self.encode_snapshot(snapshot, self.compression)
+
+			with self.region_lock:
+				self.get_region(chunk_position).write(chunk_position, data)
 				
 		except Exception as e:
 			print(f"Failed to save binary chunk {chunk_position}: {e}")
@@ -292,19 +414,31 @@ class Save:
 			if self.world.chunks[chunk_position].modified:
 				self.save_chunk(chunk_position)
 				saved_count += 1
+
+		# generated marks since the last save
+		self.queue_region_flush()
 		print(f"World saved ({saved_count} chunks updated).")
 
+	def flush(self):
+		"""Wait until everything saved so far is written to disk"""
+		self.writer.flush()
+		self.flush_regions()
+
+	def close(self):
+		self.writer.close()
+
+		with self.region_lock:
+			for open_region in self.regions.values():
+				open_region.close()
+			self.regions.clear()
+
 	def save_player(self, player):
-		try:
-			path = f"{self.path}/player.bin"
-			with open(path, "wb") as f:
-				bg_data = struct.pack("ddddd", 
-					player.position[0], player.position[1], player.position[2],
-					player.rotation[0], player.rotation[1]
-				)
-				f.write(bg_data)
-		except Exception as e:
-			print(f"Failed to save player: {e}")
+		path = f"{self.path}/player.bin"
+		bg_data = struct.pack("ddddd", 
+			player.position[0], player.position[1], player.position[2],
+			player.rotation[0], player.rotation[1]
+		)
+		self.writer.submit(("file", path), save_writer.write_file, path, bg_data)
 
 	def load_player(self, player):
 		path = f"{self.path}/player.bin"
@@ -324,16 +458,14 @@ class Save:
 		return False
 
 	def save_mobs(self, mobs_data):
-		import pickle
-		try:
-			path = f"{self.path}/mobs.dat"
-			with open(path, "wb") as f:
-				pickle.dump(mobs_data, f)
-		except Exception as e:
-			print(f"Failed to save mobs: {e}")
+		# pickled on the writer thread, mobs_data must not be changed afterwards
+		path = f"{self.path}/mobs.dat"
+		self.writer.submit(("file", path), self.write_mobs, path, mobs_data)
+
+	def write_mobs(self, path, mobs_data):
+		save_writer.write_file(path, pickle.dumps(mobs_data))
 
 	def load_mobs(self):
-		import pickle
 		path = f"{self.path}/mobs.dat"
 		if not os.path.exists(path):
 			return {}
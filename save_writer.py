@@ -0,0 +1,97 @@
+"""
+Write-behind persistence for Save.
+
+The main thread only takes cheap snapshots (see Chunk.snapshot_blocks) and
+submits a job per thing to write. A background thread then encodes and writes
+them. A job submitted again before it ran replaces the older one, so a chunk
+saved twice in a row is only written once. flush waits until everything
+submitted so far is on disk.
+"""
+
+import os
+import threading
+
+
+def write_file(path, data):
+	# atomic replace, a crash mid-write leaves the previous file intact
+	temp_path = path + ".tmp"
+
+	with open(temp_path, "wb") as f:
+		f.write(data)
+		f.flush()
+		os.fsync(f.fileno())
+
+	os.replace(temp_path, path)
+
+
+class SaveWriter:
+	def __init__(self):
+		self.condition = threading.Condition()
+
+		self.pending = {} # key -> (function, args), in submission order
+		self.current = None # (key, (function, args)) of the job being written
+		self.stopping = False
+
+		self.thread = threading.Thread(target=self.run, name="save-writer", daemon=True)
+		self.thread.start()
+
+	def submit(self, key, function, *args):
+		with self.condition:
+			self.pending[key] = (function, args)
+			self.condition.notify_all()
+
+	def submit_last(self, key, function, *args):
+		# like submit, but a job for key which isn't written yet moves behind everything submitted since
+		with self.condition:
+			self.pending.pop(key, None)
+			self.pending[key] = (function, args)
+			self.condition.notify_all()
+
+	def peek(self, key):
+		"""Arguments of the newest job for key which isn't written yet, or None."""
+		with self.condition:
+			if key in self.pending:
+				return self.pending[key][1]
+
+			if self.current is not None and self.current[0] == key:
+				return self.current[1][1]
+
+			return None
+
+	def run(self):
+		while True:
+			with self.condition:
+				while not self.pending and not self.stopping:
+					self.condition.wait()
+
+				if not self.pending:
+					return
+
+				key = next(iter(self.pending))
+				self.current = (key, self.pending.pop(key))
+
+			function, args = self.current[1]
+
+			try:
+				function(*args)
+			except Exception as e:
+				print(f"Failed to save {key}: {e}")
+
+			with self.condition:
+				self.current = None
+				self.condition.notify_all()
+
+	def flush(self):
+		"""Wait until every job submitted so far has been written."""
+		with self.condition:
+			while self.pending or self.current is not None:
+				self.condition.wait()
+
+	def close(self):
+		self.flush()
+
+		with self.condition:
+			self.stopping = True
+			self.condition.notify_all()
+
+		self.thread.join()
@@ -4,6 +4,13 @@ class Settings:
     def __init__(self):
         self.filename = "settings.txt"
         self.render_distance = 4
+        self.mesher = "numpy" # "numpy" (vectorized) or "python" (original loop), both build the same mesh
+        self.greedy_meshing = False # merge coplanar cube faces into bigger quads (numpy mesher only)
+        self.mesh_workers = 2 # processes building chunk meshes in the background (numpy mesher only), 0 meshes on the main thread
+        self.save_compression = "zlib" # "none", "zlib" or "lzma", chunk compression of newly created worlds
+        self.load_workers = 2 # processes loading and generating chunks in the background, 0 loads one chunk per frame on the main thread
+        self.day_length = 0 # seconds of a whole day and night, 0 keeps it day (e.g. 1200 for a 20 minute day)
+        self.cave_culling = True # skip chunks the camera's chunk can't see through non-opaque blocks
         self.load()
 
     def load(self):
@@ -18,6 +25,20 @@ class Settings:
                         key, value = line.strip().split("=")
                         if key == "render_distance":
                             self.render_distance = int(value)
+                        elif key == "mesher":
+                            self.mesher = value
+                        elif key == "greedy_meshing":
+                            self.greedy_meshing = value == "True"
+                        elif key == "mesh_workers":
+                            self.mesh_workers = int(value)
+                        elif key == "save_compression":
+                            self.save_compression = value
+                        elif key == "load_workers":
+                            self.load_workers = int(value)
+                        elif key == "day_length":
+                            self.day_length = float(value)
+                        elif key == "cave_culling":
+                            self.cave_culling = value == "True"
         except Exception as e:
             print(f"Error loading settings: {e}")
 
@@ -25,5 +46,12 @@ class Settings:
         try:
             with open(self.filename, "w") as f:
                 f.write(f"render_distance={self.render_distance}\n")
+                f.write(f"mesher={self.mesher}\n")
+                f.write(f"greedy_meshing={self.greedy_meshing}\n")
+                f.write(f"mesh_workers={self.mesh_workers}\n")
+                f.write(f"save_compression={self.save_compression}\n")
+                f.write(f"load_workers={self.load_workers}\n")
+                f.write(f"day_length={self.day_length}\n")
+                f.write(f"cave_culling={self.cave_culling}\n")
         except Exception as e:
             print(f"Error saving settings: {e}")
@@ -3,12 +3,13 @@ from cx_Freeze import setup, Executable
 
 # Dependencies are automatically detected, but it might need fine tuning.
 build_exe_options = {
-	"packages": ["os", "json", "ctypes", "pyglet", "math", "random"],
+	"packages": ["os", "json", "ctypes", "pyglet", "math", "random", "multiprocessing", "numpy"],
 	"include_files": [
 		"data/", 
 		"textures/", 
 		"models/",
 		"vert.glsl", "frag.glsl", 
+		"chunk_vert.glsl", "chunk_frag.glsl",
 		"overlay_vert.glsl", "overlay_frag.glsl",
 		"inventory.json"
 	]
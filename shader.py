@@ -68,7 +68,7 @@ class Shader:
 		return gl.glGetUniformLocation(self.program, ctypes.create_string_buffer(name))
 
 	def uniform_matrix(self, location, matrix):
-		gl.glUniformMatrix4fv(location, 1, gl.GL_FALSE, (gl.GLfloat * 16)(*sum(matrix.data, [])))
+		gl.glUniformMatrix4fv(location, 1, gl.GL_FALSE, matrix.pointer)
 
 	def uniform1f(self, location, value):
 		gl.glUniform1f(location, value)
@@ -1,3 +1,7 @@
+import numpy as np
+
+import mesher
+
 SUBCHUNK_WIDTH = 16
 SUBCHUNK_HEIGHT = 16
 SUBCHUNK_LENGTH = 16
@@ -22,40 +26,57 @@ class Subchunk:
 			self.parent.position[2] + self.local_position[2],
 		)
 
-		# mesh variables
-
-		self.mesh_vertex_positions = []
-		self.mesh_tex_coords = []
-		self.mesh_shading_values = []
+		# mesh variables (packed chunk vertex format, see mesher.pack_vertices)
 
+		self.mesh_vertex_data, self.mesh_indices = mesher.empty_mesh()
 		self.mesh_index_counter = 0
-		self.mesh_indices = []
 
 		# Water mesh variables
-		self.water_mesh_vertex_positions = []
-		self.water_mesh_tex_coords = []
-		self.water_mesh_shading_values = []
+		self.water_mesh_vertex_data, self.water_mesh_indices = mesher.empty_mesh()
 		self.water_mesh_index_counter = 0
-		self.water_mesh_indices = []
+
+		# slices of the world's vertex arena holding the meshes (None while empty),
+		# the dirty flags mark meshes rebuilt since they were last uploaded
+		self.mesh = None
+		self.water_mesh = None
+		self.mesh_dirty = False
+		self.water_mesh_dirty = False
+
+		# which faces see each other through non-opaque blocks (see mesher.face_visibility), None until meshed
+		self.visibility = None
 
 		# LIGHT SYSTEM: Packed SkyLight (4 bits) | BlockLight (4 bits)
 		# Default 0 (Darkness). Sunlight initialization will happen elsewhere.
 		self.light_map = bytearray(SUBCHUNK_WIDTH * SUBCHUNK_HEIGHT * SUBCHUNK_LENGTH)
 
 	def update_mesh(self, update_only_water=False):
-		# Setup lists
+		self.parent.water_mesh_version += 1
+
 		if not update_only_water:
-			self.mesh_vertex_positions = []
-			self.mesh_tex_coords = []
-			self.mesh_shading_values = []
-			self.mesh_index_counter = 0
-			self.mesh_indices = []
-
-		self.water_mesh_vertex_positions = []
-		self.water_mesh_tex_coords = []
-		self.water_mesh_shading_values = []
-		self.water_mesh_index_counter = 0
-		self.water_mesh_indices = []
+			self.parent.mesh_version += 1
+			mesher.apply_subchunk_visibility(self, mesher.face_visibility(self.world.mesh_tables, self.blocks_array()))
+
+		# uniform chunks which can't have any visible face (all air, or enclosed in opaque blocks) skip the mesher
+		if not self.parent.has_geometry():
+			mesher.apply_subchunk_mesh(self, None if update_only_water else mesher.empty_mesh(), mesher.empty_mesh())
+			return
+
+		# the NumPy mesher produces exactly the same mesh, the Python one is kept to A/B against it
+		if self.world.settings.mesher == "numpy":
+			mesher.update_subchunk_mesh(self, (SUBCHUNK_WIDTH, SUBCHUNK_HEIGHT, SUBCHUNK_LENGTH), update_only_water)
+		else:
+			self.update_mesh_python(update_only_water)
+
+	def blocks_array(self):
+		# this subchunk's part of the parent's [x, y, z] block array
+		lx, ly, lz = self.local_position
+		return self.parent.blocks_array()[
+			lx : lx + SUBCHUNK_WIDTH, ly : ly + SUBCHUNK_HEIGHT, lz : lz + SUBCHUNK_LENGTH
+		]
+
+	def update_mesh_python(self, update_only_water=False):
+		# Setup lists
+		# Faces are collected as plain vertex streams and packed into the chunk vertex format at the end
 
 		# Local Caching for Speed
 		blocks = self.parent.blocks
@@ -102,15 +123,17 @@ class Subchunk:
 		]
 
 		# Lists to append to (locals are faster)
-		solid_verts = self.mesh_vertex_positions
-		solid_tex = self.mesh_tex_coords
-		solid_shade = self.mesh_shading_values
-		solid_ind = self.mesh_indices
+		solid_verts = []
+		solid_tex = []
+		solid_shade = []
+		solid_light = []
+		solid_ind = []
 		
-		water_verts = self.water_mesh_vertex_positions
-		water_tex = self.water_mesh_tex_coords
-		water_shade = self.water_mesh_shading_values
-		water_ind = self.water_mesh_indices
+		water_verts = []
+		water_tex = []
+		water_shade = []
+		water_light = []
+		water_ind = []
 
 		# Iterate blocks
 		for local_x in range(SUBCHUNK_WIDTH):
@@ -124,7 +147,7 @@ class Subchunk:
 				for local_z in range(SUBCHUNK_LENGTH):
 					parent_lz = lz_offset + local_z
 					
-					block_number = blocks[parent_lx][parent_ly][parent_lz]
+					block_number = blocks[(parent_lx * CHUNK_H + parent_ly) * CHUNK_L + parent_lz]
 
 					if not block_number:
 						continue
@@ -140,6 +163,7 @@ class Subchunk:
 						current_verts = water_verts
 						current_tex = water_tex
 						current_shade = water_shade
+						current_light = water_light
 						current_ind = water_ind
 						# We track counter manually
 						# base_index = self.water_mesh_index_counter 
@@ -151,6 +175,7 @@ class Subchunk:
 						current_verts = solid_verts
 						current_tex = solid_tex
 						current_shade = solid_shade
+						current_light = solid_light
 						current_ind = solid_ind
 						base_index = len(current_verts) // 3
 
@@ -173,7 +198,7 @@ class Subchunk:
 							# Check neighbor
 							# Fast path: Inside chunk
 							if 0 <= nlx < CHUNK_W and 0 <= nly < CHUNK_H and 0 <= nlz < CHUNK_L:
-								n_num = blocks[nlx][nly][nlz]
+								n_num = blocks[(nlx * CHUNK_H + nly) * CHUNK_L + nlz]
 								if n_num:
 									if is_glass and n_num == block_number:
 										visible = False
@@ -221,10 +246,10 @@ class Subchunk:
 										y_ind = c_i * 3 + 1
 										h_sum = max(0.1, 1.0 - (level / 5.0) ** 1.5) if level else 1.0
 										count = 1
-										for np in corners[c_i]:
-											nb = world.get_block_number(np)
+										for neighbour in corners[c_i]:
+											nb = world.get_block_number(neighbour)
 											if nb == 8 or nb == 9:
-												nl = world.block_metadata.get_water_level(np)
+												nl = world.block_metadata.get_water_level(neighbour)
 												h_sum += max(0.1, 1.0 - (nl / 5.0) ** 1.5) if nl else 1.0
 												count += 1
 										
@@ -256,33 +281,9 @@ class Subchunk:
 							current_tex.extend(block_type_data.tex_coords[face_idx])
 							
 							# LIGHTING LOGIC
-							# Calculate neighbor local position relative to subchunk
-							# local_x, local_y, local_z are current block's local coords in subchunk
-							nl_x = local_x + dx
-							nl_y = local_y + dy
-							nl_z = local_z + dz
-							
-							light_level = 0
-							if 0 <= nl_x < 16 and 0 <= nl_y < 16 and 0 <= nl_z < 16:
-								# Neighbor is in this subchunk
-								l_vals = self.get_light(nl_x, nl_y, nl_z)
-								light_level = max(l_vals[0], l_vals[1])
-							else:
-								# Neighbor is outside, ask world (global coords)
-								l_vals = world.get_light((gx + dx, gy + dy, gz + dz))
-								light_level = max(l_vals[0], l_vals[1])
-								
-							if self.mesh_index_counter == 0 and light_level == 0:
-								# Print once per update to avoid spam, but only if dark
-								pass
-
-							light_factor = light_level / 15.0
-							
-							# Apply light_factor to static shading values
-							base_shading = block_type_data.shading_values[face_idx]
-							mod_shading = [s * light_factor for s in base_shading]
-							
-							current_shade.extend(mod_shading)
+							# The shader reads the light of the neighbour this face looks at from the light volume
+							current_shade.extend(block_type_data.shading_values[face_idx])
+							current_light.extend((face_idx + 1,) * 4)
 
 					# End Face Loop
 					
@@ -297,10 +298,10 @@ class Subchunk:
 							v_pos[2::3] = [v + gz for v in v_pos[2::3]]
 							
 							if is_water:
-								current_verts = water_verts; current_tex = water_tex; current_shade = water_shade; current_ind = water_ind
+								current_verts = water_verts; current_tex = water_tex; current_shade = water_shade; current_light = water_light; current_ind = water_ind
 								bi = len(current_verts) // 3
 							else:
-								current_verts = solid_verts; current_tex = solid_tex; current_shade = solid_shade; current_ind = solid_ind
+								current_verts = solid_verts; current_tex = solid_tex; current_shade = solid_shade; current_light = solid_light; current_ind = solid_ind
 								bi = len(current_verts) // 3
 
 							current_verts.extend(v_pos)
@@ -308,17 +309,23 @@ class Subchunk:
 							current_tex.extend(block_type_data.tex_coords[f_i])
 							
 							# LIGHTING LOGIC (Center block)
-							l_vals = self.get_light(local_x, local_y, local_z)
-							light_level = max(l_vals[0], l_vals[1])
-							light_factor = light_level / 15.0
-							
-							base_shading = block_type_data.shading_values[f_i]
-							mod_shading = [s * light_factor for s in base_shading]
-							current_shade.extend(mod_shading)
+							current_shade.extend(block_type_data.shading_values[f_i])
+							current_light.extend((0,) * 4)
+
+		# Pack into the chunk vertex format (positions relative to the chunk origin)
+		solid = None
+		if not update_only_water:
+			solid = (
+				mesher.pack_vertices(solid_verts, solid_tex, solid_shade, solid_light, self.parent.position),
+				np.array(solid_ind, dtype=np.uint32),
+			)
+
+		water = (
+			mesher.pack_vertices(water_verts, water_tex, water_shade, water_light, self.parent.position),
+			np.array(water_ind, dtype=np.uint32),
+		)
 
-		# Finalize counters
-		self.mesh_index_counter = len(self.mesh_indices)
-		self.water_mesh_index_counter = len(self.water_mesh_indices)
+		mesher.apply_subchunk_mesh(self, solid, water)
 
 	def get_light(self, lx, ly, lz):
 		# Returns (block_light, sky_light)
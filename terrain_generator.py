@@ -1,17 +1,31 @@
 import random
 from noise import pnoise2, pnoise3
 import math
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+# columns of COLUMN_SIZE x COLUMN_SIZE blocks (one chunk column) kept in the height cache
+COLUMN_SIZE = 16
+COLUMN_CACHE_SIZE = 1024
+
+BIOMES = ('plains', 'hills', 'mountains')
+
+# cave noise is sampled every CAVE_SAMPLE_SPACING blocks and interpolated in between, 1 samples every block
+CAVE_SAMPLE_SPACING = 4
 
 class TerrainGenerator:
     """
     Generates Minecraft-like terrain using a Biome-based noise system.
     """
     
-    def __init__(self, seed=None):
+    def __init__(self, seed=None, cave_sample_spacing=CAVE_SAMPLE_SPACING):
         if seed is None:
             seed = random.randint(0, 10000)
         
         self.seed = seed
+        self.cave_sample_spacing = cave_sample_spacing
         
         # Global Settings
         self.sea_level = 65
@@ -37,11 +51,79 @@ class TerrainGenerator:
             'gold_ore': 14, 'iron_ore': 15, 'coal_ore': 16,
             'diamond_ore': 56, 'redstone_ore': 73
         }
+
+        # (start_x, start_z, width, length) -> (heights, biomes), least recently used first
+        self.column_cache = OrderedDict()
     
     def get_block_number(self, block_name):
         return self.block_map.get(block_name, 0)
         
+    def cave_noise(self, wx, wy, wz):
+        return pnoise3(
+            (wx + self.seed) / self.cave_scale,
+            (wy + self.seed) / self.cave_scale,
+            (wz + self.seed) / self.cave_scale,
+            octaves=4
+        )
+
     def generate_caves(self, blocks, chunk_pos, start_y, chunk_width, chunk_height, chunk_length):
+        heights, _ = self.get_column(chunk_pos[0] * chunk_width, chunk_pos[2] * chunk_length, chunk_width, chunk_length)
+
+        # caves are only carved between y=5 and 4 blocks under the surface
+        if start_y + chunk_height - 1 < 5 or start_y > max(heights) - 4:
+            return
+
+        if self.cave_sample_spacing > 1:
+            self.generate_caves_interpolated(blocks, chunk_pos, start_y, chunk_width, chunk_height, chunk_length, heights)
+        else:
+            self.generate_caves_exact(blocks, chunk_pos, start_y, chunk_width, chunk_height, chunk_length, heights)
+
+    def generate_caves_interpolated(self, blocks, chunk_pos, start_y, chunk_width, chunk_height, chunk_length, heights):
+        # noise on a lattice every cave_sample_spacing blocks, aligned to world coordinates so neighbouring
+        # chunks share their border samples, trilinearly interpolated for the blocks in between
+        spacing = self.cave_sample_spacing
+        starts = (chunk_pos[0] * chunk_width, start_y, chunk_pos[2] * chunk_length)
+        sizes = (chunk_width, chunk_height, chunk_length)
+
+        lattice_origin = []
+        cells = [] # per axis: lattice cell and position inside it (0..1) of every block
+        for start, size in zip(starts, sizes):
+            origin = start // spacing * spacing
+            offsets = np.arange(start, start + size) - origin
+            lattice_origin.append(origin)
+            cells.append((offsets // spacing, (offsets % spacing) / spacing))
+
+        counts = [int(cell[-1]) + 2 for cell, _ in cells]
+        lattice = np.empty(counts)
+        for i in range(counts[0]):
+            for j in range(counts[1]):
+                for k in range(counts[2]):
+                    lattice[i, j, k] = self.cave_noise(
+                        lattice_origin[0] + i * spacing,
+                        lattice_origin[1] + j * spacing,
+                        lattice_origin[2] + k * spacing,
+                    )
+
+        # interpolate one axis at a time
+        (ix, tx), (iy, ty), (iz, tz) = cells
+        noise = lattice[ix] * (1 - tx)[:, None, None] + lattice[ix + 1] * tx[:, None, None]
+        noise = noise[:, iy] * (1 - ty)[None, :, None] + noise[:, iy + 1] * ty[None, :, None]
+        noise = noise[:, :, iz] * (1 - tz)[None, None, :] + noise[:, :, iz + 1] * tz[None, None, :]
+
+        wy = np.arange(start_y, start_y + chunk_height)[None, :, None]
+        h = np.array(heights).reshape(chunk_width, 1, chunk_length)
+
+        carvable = np.isin(
+            np.arange(max(self.block_map.values()) + 1),
+            [self.get_block_number('stone'), self.get_block_number('dirt'), self.get_block_number('grass')],
+        )
+
+        view = np.frombuffer(blocks, dtype=np.uint16).reshape(chunk_width, chunk_height, chunk_length)
+        carve = (noise > self.cave_threshold) & (wy >= 5) & (wy <= h - 4) & carvable[np.minimum(view, len(carvable) - 1)]
+        view[carve] = 0 # Air
+
+    def generate_caves_exact(self, blocks, chunk_pos, start_y, chunk_width, chunk_height, chunk_length, heights):
+        # one noise sample per block
         stone_id = self.get_block_number('stone')
         dirt_id = self.get_block_number('dirt')
         grass_id = self.get_block_number('grass')
@@ -52,7 +134,7 @@ class TerrainGenerator:
                 wz = chunk_pos[2] * chunk_length + lz
                 
                 # Get surface height to prevent caves from breaching surface too much
-                h = self.get_height(wx, wz)
+                h = heights[lx * chunk_length + lz]
                 
                 for ly in range(chunk_height):
                     wy = start_y + ly
@@ -62,18 +144,19 @@ class TerrainGenerator:
                         continue
                         
                     # 3D Noise for caves
-                    noise_val = pnoise3(
-                        (wx + self.seed) / self.cave_scale,
-                        (wy + self.seed) / self.cave_scale,
-                        (wz + self.seed) / self.cave_scale,
-                        octaves=4
-                    )
+                    noise_val = self.cave_noise(wx, wy, wz)
                     
                     if noise_val > self.cave_threshold:
-                        if blocks[lx][ly][lz] in [stone_id, dirt_id, grass_id]:
-                            blocks[lx][ly][lz] = 0 # Air
+                        index = (lx * chunk_height + ly) * chunk_length + lz
+                        if blocks[index] in [stone_id, dirt_id, grass_id]:
+                            blocks[index] = 0 # Air
 
-    def generate_ores(self, blocks, chunk_pos, start_y, chunk_width, chunk_height, chunk_length):
+    def chunk_random(self, chunk_position):
+        # random generator seeded by the world seed and the chunk, so a chunk always generates the same way
+        cx, cy, cz = chunk_position
+        return random.Random(f"{self.seed}:{cx}:{cy}:{cz}")
+
+    def generate_ores(self, blocks, chunk_pos, start_y, chunk_width, chunk_height, chunk_length, rng):
         # Ore configuration: (name, clusters_per_chunk, vein_size, max_global_y)
         ore_configs = [
             ('coal_ore', 15, 6, 128),     # Common, large veins
@@ -90,30 +173,75 @@ class TerrainGenerator:
             
             for _ in range(clusters):
                 # Pick random spot in chunk
-                lx = random.randint(0, chunk_width - 1)
-                lz = random.randint(0, chunk_length - 1)
-                ly = random.randint(0, chunk_height - 1)
+                lx = rng.randint(0, chunk_width - 1)
+                lz = rng.randint(0, chunk_length - 1)
+                ly = rng.randint(0, chunk_height - 1)
                 
                 wy = start_y + ly
                 if wy > max_y:
                     continue
                 
                 # Only spawn if we hit stone
-                if blocks[lx][ly][lz] == stone_id:
+                if blocks[(lx * chunk_height + ly) * chunk_length + lz] == stone_id:
                     # Spawn a cluster/vein
-                    vein_count = random.randint(1, size)
+                    vein_count = rng.randint(1, size)
                     for _ in range(vein_count):
                         # Move slightly for vein clustering
-                        lx = max(0, min(chunk_width - 1, lx + random.randint(-1, 1)))
-                        ly = max(0, min(chunk_height - 1, ly + random.randint(-1, 1)))
-                        lz = max(0, min(chunk_length - 1, lz + random.randint(-1, 1)))
+                        lx = max(0, min(chunk_width - 1, lx + rng.randint(-1, 1)))
+                        ly = max(0, min(chunk_height - 1, ly + rng.randint(-1, 1)))
+                        lz = max(0, min(chunk_length - 1, lz + rng.randint(-1, 1)))
                         
-                        if blocks[lx][ly][lz] == stone_id:
-                            blocks[lx][ly][lz] = ore_id
+                        index = (lx * chunk_height + ly) * chunk_length + lz
+                        if blocks[index] == stone_id:
+                            blocks[index] = ore_id
+
+    def get_column(self, start_x, start_z, width=COLUMN_SIZE, length=COLUMN_SIZE):
+        """
+        Heights and biomes (indices into BIOMES) of a width x length column of the world, as lists indexed
+        x * length + z. Shared by all chunks of a chunk column, the most recently used columns are cached.
+        """
+        key = (start_x, start_z, width, length)
+        column = self.column_cache.get(key)
+
+        if column is not None:
+            self.column_cache.move_to_end(key)
+            return column
+
+        heights = []
+        biomes = []
+        for world_x in range(start_x, start_x + width):
+            for world_z in range(start_z, start_z + length):
+                height, biome = self.sample_terrain(world_x, world_z)
+                heights.append(height)
+                biomes.append(biome)
+
+        column = (heights, biomes)
+        self.column_cache[key] = column
+
+        if len(self.column_cache) > COLUMN_CACHE_SIZE:
+            self.column_cache.popitem(last=False)
+
+        return column
 
     def get_height(self, world_x, world_z):
+        """
+        Terrain height at a world position (from the column cache).
+        """
+        local_x = world_x % COLUMN_SIZE
+        local_z = world_z % COLUMN_SIZE
+        heights, _ = self.get_column(world_x - local_x, world_z - local_z)
+        return heights[local_x * COLUMN_SIZE + local_z]
+
+    def get_biome(self, world_x, world_z):
+        local_x = world_x % COLUMN_SIZE
+        local_z = world_z % COLUMN_SIZE
+        _, biomes = self.get_column(world_x - local_x, world_z - local_z)
+        return BIOMES[biomes[local_x * COLUMN_SIZE + local_z]]
+
+    def sample_terrain(self, world_x, world_z):
         """
         Calculates terrain height using a biome system: Plains, Hills, Mountains.
+        Returns (height, biome index).
         """
         # --- 1. BIOME SELECTION ---
         # Large smooth noise to decide nature of terrain
@@ -141,6 +269,7 @@ class TerrainGenerator:
         
         if biome_val < 0.4:
             # === PLAINS ===
+            biome = 0
             # Very flat, slight undulation
             # Amplitude approx 4-8 blocks
             amp = 5.0
@@ -152,6 +281,7 @@ class TerrainGenerator:
             
         elif biome_val < 0.7:
             # === HILLS ===
+            biome = 1
             # Rolling terrain, transitional
             # Amplitude approx 15-20 blocks
             amp = 18.0
@@ -161,6 +291,7 @@ class TerrainGenerator:
             
         else:
             # === MOUNTAINS ===
+            biome = 2
             # High amplitude, sharper
             # Nonlinearity: make peaks sharper
             amp = 35.0
@@ -176,16 +307,16 @@ class TerrainGenerator:
         # Add a tiny micro-noise layer for surface variation everywhere?
         # Maybe skip for performance/clean look.
         
-        return int(final_height)
+        return int(final_height), biome
 
-    def generate_tree(self, blocks, x, y, z, chunk_width, chunk_height, chunk_length,
+    def generate_tree(self, blocks, x, y, z, chunk_width, chunk_height, chunk_length, rng,
                      min_height=4, max_height=7, leaf_radius=2):
-        height = random.randint(min_height, max_height)
+        height = rng.randint(min_height, max_height)
         
         # Trunk
         for i in range(height):
             if y + i < chunk_height:
-                blocks[x][y + i][z] = self.get_block_number('oak')
+                blocks[(x * chunk_height + y + i) * chunk_length + z] = self.get_block_number('oak')
         
         # Leaves
         top_y = y + height
@@ -194,18 +325,21 @@ class TerrainGenerator:
                 for dz in range(-leaf_radius, leaf_radius + 1):
                     # Cheaper distance check (Manhattanish or squared)
                     if dx*dx + dy*dy + dz*dz <= leaf_radius*leaf_radius + 1:
-                        if random.random() < 0.7: # Random leaf density
+                        if rng.random() < 0.7: # Random leaf density
                             bx, by, bz = x + dx, top_y + dy, z + dz
                             if (0 <= bx < chunk_width and 
                                 0 <= by < chunk_height and 
                                 0 <= bz < chunk_length):
-                                if blocks[bx][by][bz] == 0:
-                                    blocks[bx][by][bz] = self.get_block_number('oak_leaves')
+                                index = (bx * chunk_height + by) * chunk_length + bz
+                                if blocks[index] == 0:
+                                    blocks[index] = self.get_block_number('oak_leaves')
 
     def generate_chunk_blocks(self, chunk_position, chunk_width=16, chunk_height=16, chunk_length=16):
         cx, cy, cz = chunk_position
+        rng = self.chunk_random(chunk_position)
         
-        blocks = [[[0] * chunk_length for _ in range(chunk_height)] for _ in range(chunk_width)]
+        # flat uint16 block array indexed (x * chunk_height + y) * chunk_length + z, see chunk.new_blocks
+        blocks = array('H', [0]) * (chunk_width * chunk_height * chunk_length)
         
         start_x = cx * chunk_width
         start_y = cy * chunk_height
@@ -213,13 +347,12 @@ class TerrainGenerator:
         
         tree_candidates = []
         has_any_block = False
+
+        heights, _ = self.get_column(start_x, start_z, chunk_width, chunk_length)
         
         for lx in range(chunk_width):
             for lz in range(chunk_length):
-                wx = start_x + lx
-                wz = start_z + lz
-                
-                h = self.get_height(wx, wz)
+                h = heights[lx * chunk_length + lz]
                 # Terrain depth: 80 blocks below the surface
                 h_min = h - 80
                 bedrock_y = h - 81
@@ -237,22 +370,22 @@ class TerrainGenerator:
                         if wy < h - 3: b = 'stone'
                         elif wy < h - 1: b = 'dirt'
                         else: b = surface
-                        blocks[lx][ly][lz] = self.get_block_number(b)
+                        blocks[(lx * chunk_height + ly) * chunk_length + lz] = self.get_block_number(b)
                         has_any_block = True
                         
                     elif wy == bedrock_y:
-                        blocks[lx][ly][lz] = self.get_block_number('bedrock')
+                        blocks[(lx * chunk_height + ly) * chunk_length + lz] = self.get_block_number('bedrock')
                         has_any_block = True
                     
                     # Water
                     elif h <= wy <= self.sea_level:
-                        blocks[lx][ly][lz] = self.get_block_number('water')
+                        blocks[(lx * chunk_height + ly) * chunk_length + lz] = self.get_block_number('water')
                         has_any_block = True
                         
                 # Tree Logic
                 if surface == 'grass' and h > self.sea_level:
                     if start_y <= h < start_y + chunk_height:
-                        if random.random() < 0.01:
+                        if rng.random() < 0.01:
                             tree_candidates.append((lx, h - start_y, lz))
 
         if not has_any_block and not tree_candidates:
@@ -262,17 +395,16 @@ class TerrainGenerator:
         self.generate_caves(blocks, chunk_position, start_y, chunk_width, chunk_height, chunk_length)
 
         # ORE GENERATION
-        self.generate_ores(blocks, chunk_position, start_y, chunk_width, chunk_height, chunk_length)
+        self.generate_ores(blocks, chunk_position, start_y, chunk_width, chunk_height, chunk_length, rng)
 
         for tx, ty, tz in tree_candidates:
-            self.generate_tree(blocks, tx, ty, tz, chunk_width, chunk_height, chunk_length)
+            self.generate_tree(blocks, tx, ty, tz, chunk_width, chunk_height, chunk_length, rng)
             
         return blocks
 
 if __name__ == "__main__":
     try:
         import matplotlib.pyplot as plt
-        import numpy as np
         
         gen = TerrainGenerator(seed=random.randint(0, 9999))
         print(f"Seed: {gen.seed}")
@@ -0,0 +1,53 @@
+import copy
+import os
+import sys
+
+import pytest
+
+# the game's modules are at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chunk
+import headless
+import terrain_generator
+
+
+@pytest.fixture(scope="session")
+def block_types():
+	# the game's block types (or the headless stand-ins), plus a torch as the last block number
+	block_types, _ = headless.load_block_types(headless.HeadlessTextureManager())
+
+	torch = copy.copy(block_types[1])
+	torch.transparent = True
+	torch.light_level = 14
+
+	return list(block_types) + [torch]
+
+
+@pytest.fixture(scope="session")
+def generator():
+	return terrain_generator.TerrainGenerator(seed=3)
+
+
+def settle(world):
+	while world.light_solver.busy():
+		world.light_solver.process_queue(budget=1000000)
+
+
+def generated_world(block_types, generator, positions, edits=()):
+	"""A headless world with the chunks at positions generated, edits ((x, y, z), number) applied, then lit."""
+	world = headless.HeadlessWorld(block_types)
+
+	for position in positions:
+		new_chunk = chunk.Chunk(world, position)
+		new_chunk.set_blocks(generator.generate_chunk_blocks(position))
+		world.chunks[position] = new_chunk
+
+	for (x, y, z), number in edits:
+		world.chunks[(x >> 4, y >> 4, z >> 4)].set_block(x & 15, y & 15, z & 15, number)
+
+	for position in positions:
+		world.light_solver.initialize_sunlight(position)
+
+	settle(world)
+	return world
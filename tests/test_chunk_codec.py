@@ -0,0 +1,80 @@
+from array import array
+
+import numpy as np
+import pytest
+
+import chunk
+import chunk_codec
+
+
+def sample_blocks():
+	# stone below, water and air above, with a few scattered blocks so there are many runs
+	flat = np.zeros(chunk.CHUNK_VOLUME, dtype=np.uint16)
+	blocks = flat.reshape(16, 16, 16)
+	blocks[:, :8, :] = 1
+	blocks[:, 8:10, :] = 8
+	blocks[3, 12, 5] = 300
+	blocks[15, 15, 15] = 2
+
+	return array(chunk.BLOCKS_TYPECODE, flat.tobytes())
+
+
+@pytest.mark.parametrize("compression", sorted(chunk_codec.COMPRESSIONS))
+def test_round_trip(compression):
+	blocks = sample_blocks()
+	water_indices = chunk_codec.water_blocks(blocks)
+	water_levels = np.arange(len(water_indices)) % 8
+	light = bytes(range(256)) * 16
+
+	data = chunk_codec.encode(blocks, water_indices, water_levels, compression, 12.5, light, 13.25)
+
+	assert chunk_codec.is_encoded(data)
+	assert chunk_codec.blocks_stamp(data) == 12.5
+
+	decoded_blocks, decoded_indices, decoded_levels, stamp, decoded_light, light_stamp = chunk_codec.decode(data)
+
+	assert decoded_blocks == blocks
+	assert decoded_indices.tolist() == water_indices.tolist()
+	assert decoded_levels.tolist() == water_levels.tolist()
+	assert stamp == 12.5
+	assert decoded_light == light
+	assert light_stamp == 13.25
+
+
+def test_round_trip_without_light():
+	blocks = array(chunk.BLOCKS_TYPECODE, [1]) * chunk.CHUNK_VOLUME
+
+	data = chunk_codec.encode(blocks, [], [], "zlib", 4.0)
+	decoded_blocks, water_indices, _, stamp, light, light_stamp = chunk_codec.decode(data)
+
+	assert decoded_blocks == blocks
+	assert len(water_indices) == 0
+	assert stamp == 4.0
+	assert light is None
+	assert light_stamp == 0.0
+
+
+def test_decode_rejects_other_data():
+	with pytest.raises(ValueError):
+		chunk_codec.decode(b"RLE1" + bytes(8))
+
+	# runs that don't cover the chunk
+	data = chunk_codec.encode(sample_blocks(), [], [], "none")
+	with pytest.raises(ValueError):
+		chunk_codec.decode(data[:chunk_codec.HEADER.size] + bytes([1, 0, 1, 0, 1, 0, 0, 0, 0]))
+
+
+def test_decode_rle1():
+	# two runs of 2048 blocks, as (count, block number) byte pairs of at most 255 each
+	pairs = []
+	for number in (1, 3):
+		left = 2048
+		while left:
+			count = min(left, 255)
+			pairs += [count, number]
+			left -= count
+
+	blocks, offset = chunk_codec.decode_rle1(b"RLE1" + bytes(pairs) + b"rest")
+
+	assert list(blocks) == [1] * 2048 + [3] * 2048
+	assert offset == 4 + len(pairs)
@@ -0,0 +1,139 @@
+import random
+
+import pytest
+
+import headless
+import save
+from conftest import generated_world, settle
+
+# 4 columns by 5 layers, the torch chunk (0, 4, 0) has loaded neighbours on every side but +z/-z
+RESTORE_AREA = [(x, y, 0) for x in range(-1, 3) for y in range(2, 7)]
+TORCH = (15, 68, 5)
+
+RELIGHT_AREA = [(x, y, z) for x in range(-1, 2) for z in range(-1, 2) for y in range(6, 2, -1)]
+
+
+def light_maps(world, positions):
+	return {position: bytes(world.chunks[position].light_map) for position in positions}
+
+
+def get_light(world, position):
+	# (block light, sky light)
+	x, y, z = position
+	return world.chunks[(x >> 4, y >> 4, z >> 4)].subchunks[(0, 0, 0)].get_light(x & 15, y & 15, z & 15)
+
+
+def edit(world, position, number):
+	x, y, z = position
+	old = world.get_block_number(position)
+
+	world.chunks[(x >> 4, y >> 4, z >> 4)].set_block(x & 15, y & 15, z & 15, number)
+	world.light_solver.toggle_light(position, world.block_types[old], world.block_types[number])
+	settle(world)
+
+
+def saved_world(path, block_types):
+	world = headless.HeadlessWorld(block_types)
+	world.save = save.Save(world, path, seed=5)
+	return world
+
+
+@pytest.mark.parametrize("saved_chunk_first", [False, True])
+def test_saved_light_is_restored(tmp_path, block_types, saved_chunk_first):
+	torch = len(block_types) - 1
+	torch_chunk = (0, 4, 0)
+
+	world = saved_world(str(tmp_path), block_types)
+	for position in RESTORE_AREA:
+		world.save.load_chunk(position)
+	settle(world)
+
+	edit(world, TORCH, torch)
+	assert get_light(world, (16, 68, 5))[0] == 13
+
+	expected = light_maps(world, RESTORE_AREA)
+
+	world.chunks[torch_chunk].modified = True
+	world.save.save()
+	world.save.close()
+
+	# the torch chunk comes back with its saved light, its neighbours are generated again without it
+	loaded = saved_world(str(tmp_path), block_types)
+	others = [position for position in RESTORE_AREA if position != torch_chunk]
+	for position in [torch_chunk] + others if saved_chunk_first else others + [torch_chunk]:
+		loaded.save.load_chunk(position)
+	settle(loaded)
+
+	assert loaded.chunks[torch_chunk].light_map == world.chunks[torch_chunk].light_map
+	assert get_light(loaded, (16, 68, 5))[0] == 13
+	assert light_maps(loaded, RESTORE_AREA) == expected
+	loaded.save.close()
+
+
+def test_incremental_relight_matches_fresh_relight(block_types, generator):
+	torch = len(block_types) - 1
+	world = generated_world(block_types, generator, RELIGHT_AREA)
+	edits = {}
+
+	def apply(position, number):
+		if world.get_block_number(position) != number:
+			edit(world, position, number)
+			edits[position] = number
+
+	# a shaft down into a lit tunnel, covered again, then random blocks, air and torches
+	height = generator.get_height(5, 5)
+	for y in range(height, height - 25, -1):
+		apply((5, y, 5), 0)
+
+	for y in range(height - 20, height - 24, -1):
+		for dx in range(-6, 7):
+			apply((5 + dx, y, 5), 0)
+
+	apply((0, height - 22, 5), torch)
+	apply((5, height - 3, 5), 1)
+
+	rng = random.Random(1)
+	for _ in range(40):
+		position = (rng.randint(-16, 31), rng.randint(48, 110), rng.randint(-16, 31))
+		apply(position, rng.choice([0, 1, torch]))
+
+	apply((0, height - 22, 5), 0)
+
+	fresh = generated_world(block_types, generator, RELIGHT_AREA, edits.items())
+	assert light_maps(world, RELIGHT_AREA) == light_maps(fresh, RELIGHT_AREA)
+
+
+@pytest.mark.parametrize("top_down", [False, True])
+def test_saved_light_below_a_changed_chunk(tmp_path, block_types, top_down):
+	area = [(x, y, z) for x in range(-1, 2) for z in range(-1, 2) for y in range(3, 8)]
+
+	world = saved_world(str(tmp_path), block_types)
+	for position in area:
+		world.save.load_chunk(position)
+	settle(world)
+
+	for position in area:
+		world.chunks[position].modified = True
+	world.save.save()
+	world.save.flush()
+
+	# a roof in (0, 6, 0) over the sky columns down to (0, 4, 0), whose saved light is from before it
+	for x in range(11):
+		for z in range(11):
+			edit(world, (x, 110, z), 1)
+	assert get_light(world, (5, 75, 5)) == (0, 9)
+
+	expected = light_maps(world, area)
+
+	world.chunks[(0, 6, 0)].modified = True
+	world.save.save()
+	world.save.close()
+
+	loaded = saved_world(str(tmp_path), block_types)
+	for position in sorted(area, key=lambda position: position[1], reverse=top_down):
+		loaded.save.load_chunk(position)
+	settle(loaded)
+
+	assert get_light(loaded, (5, 75, 5)) == (0, 9)
+	assert light_maps(loaded, area) == expected
+	loaded.save.close()
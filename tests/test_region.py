@@ -0,0 +1,114 @@
+import os
+
+import pytest
+
+import region
+
+
+def test_round_trip(tmp_path):
+	path = str(tmp_path / "region.pcr")
+	chunks = {(0, 0, 0): b"a" * 600, (1, 2, 3): b"b" * 10, (15, 15, 15): b"c" * region.SECTOR_SIZE}
+
+	saved = region.Region(path)
+	for chunk_position, data in chunks.items():
+		saved.write(chunk_position, data)
+	saved.close()
+
+	loaded = region.Region(path)
+	for chunk_position, data in chunks.items():
+		assert loaded.has_chunk(chunk_position)
+		assert loaded.read(chunk_position) == data
+
+	assert loaded.read((2, 2, 2)) is None
+	assert os.path.getsize(path) % region.SECTOR_SIZE == 0
+	loaded.close()
+
+
+def test_rewrite_goes_to_new_sectors(tmp_path):
+	path = str(tmp_path / "region.pcr")
+	saved = region.Region(path)
+
+	saved.write((0, 0, 0), b"a" * 600)
+	first_sector = saved.table[0]
+
+	# a rewrite never overwrites the sectors the table still points to, even when it would fit them
+	saved.write((0, 0, 0), b"b" * 100)
+	assert saved.table[0] != first_sector
+	assert saved.read((0, 0, 0)) == b"b" * 100
+
+	# the file's table still points to the old sectors until flush, they are free again afterwards
+	saved.write((1, 0, 0), b"c" * 500)
+	assert saved.table[2 * region.chunk_index((1, 0, 0))] != first_sector
+
+	saved.flush()
+	saved.write((2, 0, 0), b"d" * 500)
+	assert saved.table[2 * region.chunk_index((2, 0, 0))] == first_sector
+	saved.close()
+
+	loaded = region.Region(path)
+	assert loaded.read((0, 0, 0)) == b"b" * 100
+	assert loaded.read((1, 0, 0)) == b"c" * 500
+	assert loaded.read((2, 0, 0)) == b"d" * 500
+	loaded.close()
+
+
+def test_writes_are_in_the_file_after_flush(tmp_path):
+	path = str(tmp_path / "region.pcr")
+	saved = region.Region(path)
+
+	saved.write((0, 0, 0), b"a" * 600)
+	saved.flush()
+	saved.write((0, 0, 0), b"b" * 100)
+	saved.write((3, 0, 0), b"c" * 10)
+
+	# readable right away, but the file still holds the previous version
+	assert saved.read((0, 0, 0)) == b"b" * 100
+
+	unflushed = region.Region(path)
+	assert unflushed.read((0, 0, 0)) == b"a" * 600
+	assert not unflushed.has_chunk((3, 0, 0))
+	unflushed.close()
+
+	saved.flush()
+
+	flushed = region.Region(path)
+	assert flushed.read((0, 0, 0)) == b"b" * 100
+	assert flushed.read((3, 0, 0)) == b"c" * 10
+	flushed.close()
+	saved.close()
+
+
+def test_generated_marks_are_written_on_flush(tmp_path):
+	path = str(tmp_path / "region.pcr")
+	saved = region.Region(path)
+
+	saved.mark_generated((4, 5, 6))
+	assert saved.is_generated((4, 5, 6))
+	assert not saved.has_chunk((4, 5, 6))
+
+	unflushed = region.Region(path)
+	assert not unflushed.is_generated((4, 5, 6))
+	unflushed.close()
+
+	saved.flush()
+
+	flushed = region.Region(path)
+	assert flushed.is_generated((4, 5, 6))
+	assert flushed.read((4, 5, 6)) is None
+	flushed.close()
+
+	# close flushes too
+	saved.mark_generated((7, 7, 7))
+	saved.close()
+
+	closed = region.Region(path)
+	assert closed.is_generated((7, 7, 7))
+	closed.close()
+
+
+def test_not_a_region_file(tmp_path):
+	path = tmp_path / "region.pcr"
+	path.write_bytes(b"something else")
+
+	with pytest.raises(ValueError):
+		region.Region(str(path))
@@ -0,0 +1,335 @@
+"""
+GPU memory arena for chunk meshes.
+
+All chunk meshes live in slices of one big vertex buffer and one big index
+buffer (sharing a single VAO) instead of a VAO and buffers per chunk, so
+loading and unloading chunks creates no GL objects, and all visible chunks of
+a pass are drawn with one glMultiDrawElementsBaseVertex call.
+
+Both buffers are split in fixed size blocks handed out by a first fit free
+list, with some slack so that rebuilt meshes are usually overwritten in place.
+When a mesh doesn't fit anywhere, the buffer is compacted (and doubled
+if it is getting full) by copying the live slices into a new buffer.
+
+Chunk vertices are relative to their chunk (see mesher.pack_vertices), as one
+draw call can't change a uniform between chunks, the origin of the chunk owning
+each vertex block is kept in a buffer texture which chunk_vert.glsl reads with
+gl_VertexID / BLOCK_VERTICES (gl_VertexID includes the base vertex).
+"""
+
+import math
+import bisect
+import ctypes
+
+import numpy as np
+import pyglet.gl as gl
+
+# must match chunk_vert.glsl
+BLOCK_VERTICES = 64
+BLOCK_INDICES = 96
+
+VERTEX_SIZE = 8 # two uint32, see mesher.pack_vertices
+INDEX_SIZE = 4
+
+INITIAL_VERTEX_BLOCKS = 4096 # 2 MiB of vertices
+INITIAL_INDEX_BLOCKS = 4096 # 1.5 MiB of indices
+
+# new slices get this fraction of extra blocks, so that a mesh growing a little after an edit
+# can be patched in place with glBufferSubData instead of moving to a new slice
+SLACK = 0.25
+
+# texture unit of the chunk origin buffer texture (unit 0 is the block texture array)
+ORIGINS_TEXTURE_UNIT = 1
+
+
+class FreeList:
+	"""First fit allocator of block ranges, free ranges are kept sorted by start and merged with their neighbours."""
+
+	def __init__(self, capacity, used=0):
+		self.capacity = capacity
+		self.free = [(used, capacity - used)] if used < capacity else []
+
+	def allocate(self, size):
+		for i, (start, free_size) in enumerate(self.free):
+			if free_size < size:
+				continue
+
+			if free_size == size:
+				del self.free[i]
+			else:
+				self.free[i] = (start + size, free_size - size)
+
+			return start
+
+		return None
+
+	def release(self, start, size):
+		if not size:
+			return
+
+		i = bisect.bisect(self.free, (start, size))
+
+		if i < len(self.free) and start + size == self.free[i][0]:
+			size += self.free[i][1]
+			del self.free[i]
+
+		if i > 0 and self.free[i - 1][0] + self.free[i - 1][1] == start:
+			i -= 1
+			start, size = self.free[i][0], self.free[i][1] + size
+			del self.free[i]
+
+		self.free.insert(i, (start, size))
+
+	def free_space(self):
+		return sum(size for _, size in self.free)
+
+
+class Allocation:
+	"""Slices of the arena buffers holding one mesh."""
+
+	def __init__(self, origin):
+		self.origin = origin
+
+		self.vertex_start = 0
+		self.vertex_blocks = 0
+		self.index_start = 0
+		self.index_blocks = 0
+
+		self.index_count = 0
+
+
+class VertexArena:
+	def __init__(self):
+		self.vertex_free_list = FreeList(INITIAL_VERTEX_BLOCKS)
+		self.index_free_list = FreeList(INITIAL_INDEX_BLOCKS)
+
+		self.allocations = set()
+
+		self.vbo = create_buffer(INITIAL_VERTEX_BLOCKS * BLOCK_VERTICES * VERTEX_SIZE)
+		self.ibo = create_buffer(INITIAL_INDEX_BLOCKS * BLOCK_INDICES * INDEX_SIZE)
+
+		# chunk origin of every vertex block (vec4 as RGB32F buffer textures need GL 4.0)
+		self.origins = np.zeros((INITIAL_VERTEX_BLOCKS, 4), dtype=np.float32)
+		self.origin_buffer = create_buffer(self.origins.nbytes)
+
+		self.origin_texture = gl.GLuint(0)
+		gl.glGenTextures(1, self.origin_texture)
+		gl.glBindTexture(gl.GL_TEXTURE_BUFFER, self.origin_texture)
+		gl.glTexBuffer(gl.GL_TEXTURE_BUFFER, gl.GL_RGBA32F, self.origin_buffer)
+		gl.glBindTexture(gl.GL_TEXTURE_BUFFER, 0)
+
+		self.vao = gl.GLuint(0)
+		gl.glGenVertexArrays(1, self.vao)
+		self.bind_buffers()
+
+	def bind_buffers(self):
+		# (re)attach the current buffers to the VAO, both words of a vertex are integer attributes
+		gl.glBindVertexArray(self.vao)
+
+		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+
+		gl.glVertexAttribIPointer(0, 1, gl.GL_UNSIGNED_INT, VERTEX_SIZE, 0)
+		gl.glEnableVertexAttribArray(0)
+
+		gl.glVertexAttribIPointer(1, 1, gl.GL_UNSIGNED_INT, VERTEX_SIZE, VERTEX_SIZE // 2)
+		gl.glEnableVertexAttribArray(1)
+
+		gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+
+		gl.glBindVertexArray(0)
+
+	def store(self, allocation, vertex_data, indices, origin):
+		"""
+		Upload a mesh (packed vertex data & indices relative to its first vertex) replacing allocation's,
+		returns the allocation now holding it (None for an empty mesh).
+		"""
+
+		if not len(indices):
+			self.release(allocation)
+			return None
+
+		vertex_blocks = -(-len(vertex_data) // BLOCK_VERTICES)
+		index_blocks = -(-len(indices) // BLOCK_INDICES)
+
+		if allocation is None:
+			allocation = Allocation(origin)
+			self.allocations.add(allocation)
+
+		allocation.origin = origin
+
+		# keep the slices while the new mesh fits without wasting too much space, the mesh is then
+		# overwritten in place, otherwise it moves to a new slice with some slack
+
+		self.resize(allocation, "vertex", vertex_blocks)
+		self.resize(allocation, "index", index_blocks)
+
+		allocation.index_count = len(indices)
+
+		write_buffer(self.vbo, allocation.vertex_start * BLOCK_VERTICES * VERTEX_SIZE, vertex_data)
+		write_buffer(self.ibo, allocation.index_start * BLOCK_INDICES * INDEX_SIZE, indices)
+
+		self.write_origins(allocation)
+
+		return allocation
+
+	def resize(self, allocation, kind, needed):
+		# make the allocation's vertex or index slice big enough for needed blocks
+		start_name, blocks_name = kind + "_start", kind + "_blocks"
+		start, blocks = getattr(allocation, start_name), getattr(allocation, blocks_name)
+
+		reserved = needed + math.ceil(needed * SLACK)
+
+		if needed <= blocks <= reserved * 2:
+			return
+
+		free_list = self.vertex_free_list if kind == "vertex" else self.index_free_list
+
+		if blocks > reserved:
+			free_list.release(start + reserved, blocks - reserved)
+			setattr(allocation, blocks_name, reserved)
+			return
+
+		# emptied first, allocate may compact the buffer and must not copy the old slice
+		free_list.release(start, blocks)
+		setattr(allocation, blocks_name, 0)
+
+		setattr(allocation, start_name, self.allocate(kind, reserved))
+		setattr(allocation, blocks_name, reserved)
+
+	def release(self, allocation):
+		if allocation is None or allocation not in self.allocations:
+			return
+
+		self.allocations.discard(allocation)
+		self.vertex_free_list.release(allocation.vertex_start, allocation.vertex_blocks)
+		self.index_free_list.release(allocation.index_start, allocation.index_blocks)
+
+	def allocate(self, kind, blocks):
+		free_list = self.vertex_free_list if kind == "vertex" else self.index_free_list
+		start = free_list.allocate(blocks)
+
+		if start is not None:
+			return start
+
+		# no free range is big enough: compact, doubling the buffer if it would be more than 3/4 full
+		used = free_list.capacity - free_list.free_space()
+		capacity = free_list.capacity
+
+		while (used + blocks) * 4 > capacity * 3:
+			capacity *= 2
+
+		self.compact(kind, capacity)
+
+		return getattr(self, kind + "_free_list").allocate(blocks)
+
+	def compact(self, kind, capacity):
+		"""Copy every live slice of one of the buffers to the start of a new buffer of the given capacity (in blocks)."""
+
+		if kind == "vertex":
+			block_size, old_buffer = BLOCK_VERTICES * VERTEX_SIZE, self.vbo
+		else:
+			block_size, old_buffer = BLOCK_INDICES * INDEX_SIZE, self.ibo
+
+		new_buffer = create_buffer(capacity * block_size)
+
+		gl.glBindBuffer(gl.GL_COPY_READ_BUFFER, old_buffer)
+		gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, new_buffer)
+
+		used = 0
+
+		for allocation in sorted(self.allocations, key=lambda a: getattr(a, kind + "_start")):
+			start = getattr(allocation, kind + "_start")
+			blocks = getattr(allocation, kind + "_blocks")
+
+			if blocks:
+				gl.glCopyBufferSubData(
+					gl.GL_COPY_READ_BUFFER, gl.GL_COPY_WRITE_BUFFER, start * block_size, used * block_size, blocks * block_size
+				)
+
+			setattr(allocation, kind + "_start", used)
+			used += blocks
+
+		gl.glBindBuffer(gl.GL_COPY_READ_BUFFER, 0)
+		gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, 0)
+
+		gl.glDeleteBuffers(1, old_buffer)
+
+		if kind == "vertex":
+			self.vbo = new_buffer
+			self.vertex_free_list = FreeList(capacity, used)
+
+			# vertex blocks moved, rewrite all of the origins
+			self.origins = np.zeros((capacity, 4), dtype=np.float32)
+			for allocation in self.allocations:
+				self.origins[allocation.vertex_start : allocation.vertex_start + allocation.vertex_blocks, :3] = allocation.origin
+
+			gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, self.origin_buffer)
+			gl.glBufferData(gl.GL_COPY_WRITE_BUFFER, self.origins.nbytes, self.origins.ctypes.data, gl.GL_DYNAMIC_DRAW)
+			gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, 0)
+		else:
+			self.ibo = new_buffer
+			self.index_free_list = FreeList(capacity, used)
+
+		self.bind_buffers()
+
+	def write_origins(self, allocation):
+		start, end = allocation.vertex_start, allocation.vertex_start + allocation.vertex_blocks
+		self.origins[start:end, :3] = allocation.origin
+		write_buffer(self.origin_buffer, start * self.origins.itemsize * 4, self.origins[start:end])
+
+	def draw(self, allocations):
+		"""Draw the given allocations with a single call, chunk_shader must be in use."""
+
+		allocations = [allocation for allocation in allocations if allocation is not None]
+
+		if not allocations:
+			return
+
+		counts = np.array([allocation.index_count for allocation in allocations], dtype=np.int32)
+		offsets = np.array(
+			[allocation.index_start * BLOCK_INDICES * INDEX_SIZE for allocation in allocations], dtype=np.uintp
+		)
+		base_vertices = np.array(
+			[allocation.vertex_start * BLOCK_VERTICES for allocation in allocations], dtype=np.int32
+		)
+
+		gl.glActiveTexture(gl.GL_TEXTURE0 + ORIGINS_TEXTURE_UNIT)
+		gl.glBindTexture(gl.GL_TEXTURE_BUFFER, self.origin_texture)
+		gl.glActiveTexture(gl.GL_TEXTURE0)
+
+		gl.glBindVertexArray(self.vao)
+		gl.glMultiDrawElementsBaseVertex(
+			gl.GL_TRIANGLES,
+			counts.ctypes.data_as(ctypes.POINTER(gl.GLsizei)),
+			gl.GL_UNSIGNED_INT,
+			offsets.ctypes.data_as(ctypes.POINTER(ctypes.c_void_p)),
+			len(allocations),
+			base_vertices.ctypes.data_as(ctypes.POINTER(gl.GLint)),
+		)
+
+	def delete(self):
+		gl.glDeleteBuffers(1, self.vbo)
+		gl.glDeleteBuffers(1, self.ibo)
+		gl.glDeleteBuffers(1, self.origin_buffer)
+		gl.glDeleteTextures(1, self.origin_texture)
+		gl.glDeleteVertexArrays(1, self.vao)
+
+
+def create_buffer(size):
+	# bound to GL_COPY_WRITE_BUFFER so that creating a buffer never touches the VAO's element array binding
+	buffer = gl.GLuint(0)
+	gl.glGenBuffers(1, buffer)
+
+	gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, buffer)
+	gl.glBufferData(gl.GL_COPY_WRITE_BUFFER, size, None, gl.GL_DYNAMIC_DRAW)
+	gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, 0)
+
+	return buffer
+
+
+def write_buffer(buffer, offset, data):
+	data = np.ascontiguousarray(data)
+
+	gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, buffer)
+	gl.glBufferSubData(gl.GL_COPY_WRITE_BUFFER, offset, data.nbytes, data.ctypes.data)
+	gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, 0)
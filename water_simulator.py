@@ -176,20 +176,17 @@ class WaterSimulatorGPU:
         
         if chunk_pos in self.world.chunks:
             chunk = self.world.chunks[chunk_pos]
-            for x in range(self.chunk_size):
-                for y in range(min(self.world_height, len(chunk.blocks[0]))):
-                    for z in range(self.chunk_size):
-                        block_id = chunk.blocks[x][y][z]
-                        block_data[x, y, z] = block_id
-                        
-                        if block_id == self.WATER_ID:
-                            world_pos = (
-                                chunk_pos[0] * self.chunk_size + x,
-                                chunk_pos[1] * self.world_height + y,
-                                chunk_pos[2] * self.chunk_size + z
-                            )
-                            level = self.meta.get_water_level(world_pos)
-                            water_data[x, y, z] = level
+            blocks = chunk.blocks_array()[:, :self.world_height, :]
+            block_data[:, :blocks.shape[1], :] = blocks
+            
+            for x, y, z in zip(*np.nonzero(blocks == self.WATER_ID)):
+                world_pos = (
+                    chunk_pos[0] * self.chunk_size + int(x),
+                    chunk_pos[1] * self.world_height + int(y),
+                    chunk_pos[2] * self.chunk_size + int(z)
+                )
+                level = self.meta.get_water_level(world_pos)
+                water_data[x, y, z] = level
         
         # Create GPU textures
         water_tex = self.ctx.texture3d(size, 1, water_data.tobytes(), dtype='u1')
@@ -3,6 +3,8 @@ import time
 import random
 from collections import deque
 
+import numpy as np
+
 import save
 import chunk
 import settings
@@ -12,11 +14,15 @@ import texture_manager
 import block_metadata
 import water_simulator
 import light_solver
+import mob_spawning
+import mesher
+import mesh_pool
+import chunk_loader
+import vertex_arena
+import light_volume
 
-# import custom block models
-
-import models
 import frustum
+import cave_culling
 
 
 class World:
@@ -27,9 +33,23 @@ class World:
 		
 		# Frustum Culling
 		self.frustum = frustum.Frustum()
+		self.visible_chunks = [] # loaded chunks inside the frustum, found by update_frustum
+
+		# positions of the loaded chunks and their (mins, maxs) bounds as arrays, rebuilt when chunks load or unload
+		self.chunk_bounds_positions = []
+		self.chunk_bounds = None
+
+		# chunks hidden behind solid ground from the camera's chunk
+		self.cave_culler = cave_culling.CaveCuller()
 		self.last_chunk_pos = None
 		self.target_load_set = set()
 
+		# seconds per frame spent adding chunks loaded in the background to the world
+		self.load_time_budget = 0.004
+
+		# seconds per frame spent uploading meshes built by the mesh pool
+		self.mesh_time_budget = 0.003
+
 		self.block_types = [None]
 		
 		# Load destroy stage textures
@@ -40,110 +60,18 @@ class World:
 
 		# parse block type data file
 
-		blocks_data_file = open("data/blocks.mcpy")
-		blocks_data = blocks_data_file.readlines()
-		blocks_data_file.close()
-
-		for block in blocks_data:
-			if block[0] in ["\n", "#"]:  # skip if empty line or comment
-				continue
-
-			number, props = block.split(":", 1)
-			number = int(number)
-
-			# default block
-
-			name = "Unknown"
-			model = models.cube
-			texture = {"all": "unknown"}
-			hardness = 0.0 # Default hardness
-			sound = "stone" # Default sound
-			is_sprite = False
-			sprite_path = None
-			light_level = 0
-
-			# read properties
-
-			for prop in props.split(","):
-				prop = prop.strip()
-				prop = list(filter(None, prop.split(" ", 1)))
-
-				if prop[0] == "sameas":
-					sameas_number = int(prop[1])
-
-					name = self.block_types[sameas_number].name
-					texture = dict(self.block_types[sameas_number].block_face_textures)
-					model = self.block_types[sameas_number].model
-					hardness = self.block_types[sameas_number].hardness
-					sound = self.block_types[sameas_number].sound
-					is_sprite = self.block_types[sameas_number].is_sprite
-					sprite_path = self.block_types[sameas_number].sprite_path
-					light_level = self.block_types[sameas_number].light_level
+		self.block_types = block_type.load_block_types(self.texture_manager)
 
-				elif prop[0] == "name":
-					name = eval(prop[1])
-				
-				elif prop[0] == "hardness":
-					hardness = float(prop[1])
-
-				elif prop[0] == "sprite":
-					is_sprite = True
-					sprite_path = eval(prop[1])
+		self.texture_manager.generate_mipmaps()
 
-				elif prop[0][:7] == "texture":
-					_, side = prop[0].split(".")
-					texture[side] = prop[1].strip()
+		# lookup tables for the NumPy mesher
+		self.mesh_tables = mesher.MeshTables(self.block_types)
 
-				elif prop[0] == "model":
-					model = eval(prop[1])
-				
-				elif prop[0] == "light":
-					light_level = int(prop[1])
-
-			# Determine sound based on name if not already set (by sameas)
-			if sound == "stone":
-				sound = "stone" # default
-				lower_name = name.lower()
-				
-				# User specific requests:
-				# Sand -> sand
-				# Toprak (Dirt/Soil/Grass) -> gravel
-				# Oak/Wood/Log -> wood
-				# Stone -> stone
-				
-				if any(s in lower_name for s in ["dirt", "soil", "grass", "gravel"]):
-					sound = "gravel"
-				elif "sand" in lower_name:
-					sound = "sand"
-				elif any(s in lower_name for s in ["wood", "planks", "log", "oak", "chest", "crafting table", "sign", "door", "ladder"]):
-					if "cobblestone" not in lower_name and "stone" not in lower_name:
-						sound = "wood"
-				elif any(s in lower_name for s in ["leaves", "sapling", "flower", "mushroom", "sugar cane", "cactus"]):
-					sound = "grass"
-				elif "snow" in lower_name or "ice" in lower_name:
-					sound = "snow"
-				elif "cloth" in lower_name or "wool" in lower_name:
-					sound = "cloth"
-				elif "coral" in lower_name:
-					sound = "coral"
-				elif "stone" in lower_name or "cobblestone" in lower_name or "ore" in lower_name or "brick" in lower_name:
-					sound = "stone"
-
-			# add block type
-
-			_block_type = block_type.Block_type(self.texture_manager, name, texture, model, hardness, sound, is_sprite, sprite_path, light_level)
-
-			if is_sprite and sprite_path:
-				# Convert "textures/item/stick.png" to "item/stick"
-				tex_name = sprite_path.replace("textures/", "").replace(".png", "")
-				self.texture_manager.add_texture(tex_name)
-				_block_type.sprite_index = self.texture_manager.textures.index(tex_name)
-
-			while number >= len(self.block_types):
-				self.block_types.append(None)
-			self.block_types[number] = _block_type
+		# GPU buffers shared by all chunk meshes
+		self.chunk_arena = vertex_arena.VertexArena()
 
-		self.texture_manager.generate_mipmaps()
+		# light of the loaded chunks, sampled by the chunk shader instead of being baked into the meshes
+		self.light_volume = light_volume.LightVolume(self.settings.render_distance)
 
 		# load the world
 
@@ -159,6 +87,16 @@ class World:
 		# Mesh update queue system
 		self.mesh_update_queue = deque()
 		self.mesh_update_set = set() # For fast lookup to avoid duplicates
+
+		# Background meshing (the Python mesher always runs on the main thread)
+		self.mesh_pool = None
+		if self.settings.mesh_workers > 0 and self.settings.mesher == "numpy":
+			self.mesh_pool = mesh_pool.MeshPool(self, self.settings.mesh_workers)
+
+		# Background chunk loading and generation, 0 workers loads one chunk per frame on the main thread
+		self.chunk_loader = None
+		if self.settings.load_workers > 0:
+			self.chunk_loader = chunk_loader.ChunkLoader(self, self.settings.load_workers)
 		
 		# Mob persistence (cx, cy, cz) -> list of mob data
 		self.persistent_mobs = self.save.load_mobs()
@@ -175,59 +113,29 @@ class World:
 		# But pig will need to be imported in main.
 		
 	def spawn_pigs_in_chunk(self, chunk_position):
-		# 10% chance to spawn a colony
-		if random.random() < 0.1:
-			cx, cy, cz = chunk_position
-			
-			# Determine how many pigs (3 to 7)
-			count = random.randint(3, 7)
-			
-			# Attempt to spawn them
-			# We need to find valid ground (Grass)
-			# Randomly pick spots
+		# pig colonies are placed on the grass surface (cached heightmap), pigs are created from the queue by main
+		heights, _ = self.save.terrain_generator.get_column(chunk_position[0] * 16, chunk_position[2] * 16)
+		self.spawn_queue.extend(mob_spawning.pig_colony(self.chunks[chunk_position], chunk_position, heights))
+
+	def register_chunk(self, chunk_position):
+		# a chunk new in self.chunks: its light goes to the light volume, frustum and cave culling see it
+		self.chunk_bounds = None
+		self.cave_culler.invalidate()
+
+		if chunk_position in self.chunks:
+			self.light_volume.upload_chunk(self.chunks[chunk_position])
+
+	def chunk_loaded(self, chunk_position):
+		self.register_chunk(chunk_position)
+
+		if chunk_position in self.chunks:
+			# Queue mesh update for self and neighbors
+			self.enqueue_mesh_update(chunk_position)
 			
-			for _ in range(count):
-				# Try 5 times to find a spot for this pig
-				for attempt in range(5):
-					lx = random.randint(0, 15)
-					lz = random.randint(0, 15)
-					# Find surface Y
-					# Start from top of chunk
-					found_y = -1
-					
-					# Optimization: We know chunk height is 16.
-					# But we need global Y.
-					# cx, cy, cz are chunk indices.
-					base_x = cx * 16
-					base_y = cy * 16
-					base_z = cz * 16
-					
-					for ly in range(15, -1, -1):
-						# We can access chunk directly for speed
-						# But using world.get_block_number handles boundaries safely
-						b = self.chunks[chunk_position].blocks[lx][ly][lz]
-						if b != 0:
-							# Found top block
-							# Check if it is grass (2) and above is air (likely, since we scan from top)
-							if b == 2:
-								# Spawn here at ly + 1
-								found_y = ly + 1
-							break
-					
-					if found_y != -1:
-						# Add to spawn queue
-						# Position is global
-						spawn_x = base_x + lx + 0.5
-						spawn_y = base_y + found_y
-						spawn_z = base_z + lz + 0.5
-						
-						# Check if inside block (safety)
-						if spawn_y < base_y + 16:
-							self.spawn_queue.append({
-								'type': 'pig',
-								'pos': (spawn_x, spawn_y, spawn_z)
-							})
-							break
+			nx, ny, nz = chunk_position
+			for dx, dy, dz in [(-1,0,0), (1,0,0), (0,0,-1), (0,0,1)]:
+				n_pos = (nx + dx, ny + dy, nz + dz)
+				self.enqueue_mesh_update(n_pos)
 
 	def enqueue_mesh_update(self, chunk_position):
 		"""Schedule a chunk for mesh update"""
@@ -262,8 +170,8 @@ class World:
 
 		lx, ly, lz = self.get_local_position(position)
 
-		block_number = self.chunks[chunk_position].blocks[lx][ly][lz]
-		return block_number
+		# inlined chunk.block_index, this is called a lot
+		return self.chunks[chunk_position].blocks[lx * 256 + ly * 16 + lz]
 
 	def is_opaque_block(self, position):
 		# get block type and check if it's opaque or not
@@ -305,6 +213,14 @@ class World:
 		chunk_position = self.get_chunk_position(position)
 		self.enqueue_mesh_update(chunk_position)
 
+	def light_changed(self, chunk):
+		# called by the light solver, no remesh needed
+		self.light_volume.update_chunk(chunk)
+
+	def visibility_changed(self, chunk_position):
+		# a remesh changed which faces of the chunk see each other
+		self.cave_culler.invalidate()
+
 
 	def set_block(self, position, number):  # set number to 0 (air) to remove block
 		x, y, z = position
@@ -315,6 +231,7 @@ class World:
 				return  # no point in creating a whole new chunk if we're not gonna be adding anything
 
 			self.chunks[chunk_position] = chunk.Chunk(self, chunk_position)
+			self.register_chunk(chunk_position)
 
 		# Get old block number before changing
 		old_block = self.get_block_number(position)
@@ -325,7 +242,7 @@ class World:
 
 		lx, ly, lz = self.get_local_position(position)
 
-		self.chunks[chunk_position].blocks[lx][ly][lz] = number
+		self.chunks[chunk_position].set_block(lx, ly, lz, number)
 		self.chunks[chunk_position].modified = True
 		
 		# LIGHT UPDATE
@@ -386,23 +303,47 @@ class World:
 		self.set_block(pos, num)
 
 	def draw(self, pass_type='all'):
-		# Frustum Culling
-		for chunk_position in self.chunks:
-			# Calculate Chunk AABB
-			cx, cy, cz = chunk_position
-			min_x = cx * 16
-			min_y = cy * 16
-			min_z = cz * 16
-			max_x = min_x + 16
-			max_y = min_y + 16
-			max_z = min_z + 16
-			
-			if self.frustum.is_box_visible(min_x, min_y, min_z, max_x, max_y, max_z):
-				self.chunks[chunk_position].draw(pass_type)
+		# the chunks update_frustum found visible are drawn with a single multi-draw call
+		meshes = []
+
+		for chunk_position in self.visible_chunks:
+			if chunk_position not in self.chunks:
+				continue
+
+			for subchunk in self.chunks[chunk_position].subchunks.values():
+				if pass_type in ['all', 'solid']:
+					meshes.append(subchunk.mesh)
+				if pass_type in ['all', 'water']:
+					meshes.append(subchunk.water_mesh)
+
+		self.chunk_arena.draw(meshes)
 
-	def update_frustum(self, mvp_matrix):
+	def get_chunk_bounds(self):
+		# the length check catches chunks added without going through register_chunk
+		if self.chunk_bounds is None or len(self.chunk_bounds_positions) != len(self.chunks):
+			# blocks are centered on their integer coordinates, and models may overhang their block a little
+			self.chunk_bounds_positions = list(self.chunks)
+			mins = np.array(self.chunk_bounds_positions, dtype=np.float64).reshape(-1, 3) * 16 - 1
+			self.chunk_bounds = (mins, mins + 17)
+
+		return self.chunk_bounds_positions, self.chunk_bounds
+
+	def update_frustum(self, mvp_matrix, camera_position=None):
+		# once per frame, tests all loaded chunks at once
 		self.frustum.update(mvp_matrix)
 
+		positions, (mins, maxs) = self.get_chunk_bounds()
+		visible = self.frustum.boxes_visible(mins, maxs)
+		self.visible_chunks = [positions[index] for index in np.flatnonzero(visible)]
+
+		if self.settings.cave_culling and camera_position is not None:
+			# block centers are on integer coordinates
+			camera_chunk = self.get_chunk_position([math.floor(c + 0.5) for c in camera_position])
+			potentially_visible = self.cave_culler.update(self.chunks, camera_chunk)
+
+			if potentially_visible is not None:
+				self.visible_chunks = [position for position in self.visible_chunks if position in potentially_visible]
+
 	def process_chunk_updates(self, position):
 		start_time = time.perf_counter()
 		
@@ -425,6 +366,13 @@ class World:
 					for y in range(cy - 2, cy + 3):
 						self.target_load_set.add((x, y, z))
 
+			if self.mesh_pool:
+				self.mesh_pool.reprioritize(lambda p: (p[0] - cx)**2 + (p[1] - cy)**2 + (p[2] - cz)**2)
+
+			if self.chunk_loader:
+				self.chunk_loader.cancel_outside(self.target_load_set)
+				self.chunk_loader.reprioritize(lambda p: (p[0] - cx)**2 + (p[2] - cz)**2)
+
 		# Identify missing chunks
 		missing_chunks = []
 		# Optimize: Instead of iterating target_set (which can be large), we can check manageable amount?
@@ -437,8 +385,15 @@ class World:
 			if chunk_pos not in self.chunks:
 				missing_chunks.append(chunk_pos)
 
+		if self.chunk_loader:
+			# read, decode and generate in the workers, only integrating the results costs frame time here
+			for chunk_pos in missing_chunks:
+				self.chunk_loader.request(chunk_pos, (chunk_pos[0] - cx)**2 + (chunk_pos[2] - cz)**2)
+
+			self.chunk_loader.update(self.load_time_budget)
+
 		# Sort missing chunks by distance to player (load closest first)
-		if missing_chunks:
+		elif missing_chunks:
 			missing_chunks.sort(key=lambda p: (p[0] - cx)**2 + (p[2] - cz)**2)
 			
 			# Load limited number of chunks per frame to prevent FPS drop
@@ -452,14 +407,7 @@ class World:
 				self.save.load_chunk(chunk_pos)
 				chunks_loaded_count += 1
 				
-				if chunk_pos in self.chunks:
-					# Queue mesh update for self and neighbors
-					self.enqueue_mesh_update(chunk_pos)
-					
-					nx, ny, nz = chunk_pos
-					for dx, dy, dz in [(-1,0,0), (1,0,0), (0,0,-1), (0,0,1)]:
-						n_pos = (nx + dx, ny + dy, nz + dz)
-						self.enqueue_mesh_update(n_pos)
+				self.chunk_loaded(chunk_pos)
 		
 		# Process Mesh Update Queue with Time Budget
 		# Allow 3ms per frame for mesh updates
@@ -470,6 +418,15 @@ class World:
 		# 1000 steps ~ 1-2ms typically
 		self.light_solver.process_queue(budget=1500) 
 		
+		if self.mesh_pool:
+			# Hand the queue to the worker processes, only the GPU upload of their results happens here
+			while self.mesh_update_queue:
+				chunk_pos = self.mesh_update_queue.popleft()
+				self.mesh_update_set.discard(chunk_pos)
+				self.mesh_pool.submit(chunk_pos, (chunk_pos[0] - cx)**2 + (chunk_pos[1] - cy)**2 + (chunk_pos[2] - cz)**2)
+
+			self.mesh_pool.update(self.mesh_time_budget)
+
 		processed_meshes = 0
 		while self.mesh_update_queue:
 			if time.perf_counter() - start_time > time_budget:
@@ -507,13 +464,19 @@ class World:
 				except:
 					pass
 
+			if self.mesh_pool:
+				self.mesh_pool.cancel(chunk_pos)
+
 			# Save before unload if modified
 			if self.chunks[chunk_pos].modified:
 				self.save.save_chunk(chunk_pos)
 			
 			# Clean up GPU resources
 			self.chunks[chunk_pos].delete()
+			self.light_volume.release(chunk_pos)
 			del self.chunks[chunk_pos]
+			self.chunk_bounds = None
+			self.cave_culler.invalidate()
 			
 			chunks_unloaded_count += 1
 
@@ -528,7 +491,7 @@ class World:
 				ly = random.randint(0, chunk.CHUNK_HEIGHT - 1)
 				lz = random.randint(0, chunk.CHUNK_LENGTH - 1)
 				
-				block = c.blocks[lx][ly][lz]
+				block = c.get_block(lx, ly, lz)
 				
 				if block == 3: # Dirt
 					world_pos = (chunk_pos[0]*chunk.CHUNK_WIDTH + lx, 